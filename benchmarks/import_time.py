@@ -0,0 +1,57 @@
+"""Measure how long it takes to import the kazoo client
+
+Each sample imports kazoo in a fresh interpreter, so nothing is shared
+between runs. Run from the root of the repository:
+
+    python benchmarks/import_time.py [--runs 20]
+
+Besides the import itself it reports how long it takes to then generate
+every client method, which is the work deferred until methods are first
+used.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+SAMPLE = """
+import json, time
+start = time.perf_counter()
+import kazoo
+imported = time.perf_counter()
+names = [name for name in dir(kazoo.Client) if not name.startswith("_")]
+for name in names:
+    getattr(kazoo.Client, name)
+generated = time.perf_counter()
+print(json.dumps({"import": imported - start,
+                  "all_methods": generated - imported,
+                  "methods": len(names)}))
+"""
+
+
+def take_sample():
+    output = subprocess.check_output([sys.executable, "-c", SAMPLE])
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    # The first run may write bytecode caches, so it is not counted
+    take_sample()
+    samples = [take_sample() for i in range(args.runs)]
+    print("{0} public client methods, {1} runs".format(
+        samples[0]["methods"], args.runs))
+    for key, label in [("import", "import kazoo"),
+                       ("all_methods", "generate every method")]:
+        times = [sample[key] * 1000 for sample in samples]
+        print("{0:<22} median {1:7.2f}ms  min {2:7.2f}ms".format(
+            label, statistics.median(times), min(times)))
+
+
+if __name__ == "__main__":
+    main()
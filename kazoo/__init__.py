@@ -1,3 +1,13 @@
 from .client import Client
 
 VERSION = "0.2.0"
+
+
+def __getattr__(name):
+    # The async client imports aiohttp, which is slow to import, so it is
+    # only imported when it is used
+    if name == "AsyncClient":
+        from .async_client import AsyncClient
+        return AsyncClient
+    raise AttributeError("module {0!r} has no attribute {1!r}".format(
+        __name__, name))
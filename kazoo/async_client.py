@@ -0,0 +1,296 @@
+import asyncio
+import functools
+import logging
+from kazoo.batch import AsyncBatch, map_calls_async
+from kazoo.client import Client
+from kazoo.download import DownloadTarget
+from kazoo.exceptions import KazooApiAuthenticationError
+from kazoo.ratelimit import RateLimiter
+from kazoo.pagination import iterate_pages_async, iterate_documents_async, \
+    prefetch_pages_async, iterate_time_windows_async
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(__name__)
+
+
+async def _run_steps_async(steps):
+    """Asyncio version of :func:`kazoo.client._run_steps`, awaiting each
+    step
+    """
+    try:
+        step = next(steps)
+        while True:
+            try:
+                result = await step()
+            except BaseException as e:
+                step = steps.throw(e)
+            else:
+                step = steps.send(result)
+    except StopIteration as e:
+        return e.value
+
+
+class AsyncClient(Client):
+    """An asyncio version of :class:`kazoo.Client`
+
+    Every method available on :class:`kazoo.Client` is available here with
+    the same arguments, but returns an awaitable and sends its request
+    through a non-blocking :class:`aiohttp.ClientSession`. This requires the
+    aiohttp package to be installed. ::
+
+        >>>client = kazoo.AsyncClient(api_key="sdfasdfas")
+        >>>await client.authenticate()
+        >>>await client.get_account(acct_id)
+        >>>async for device in client.iter_devices(acct_id):
+        ...    print(device["id"])
+
+    The client should be closed with :meth:`close()` when finished with, or
+    used as an async context manager. ::
+
+        >>>async with kazoo.AsyncClient(api_key="sdfasdfas") as client:
+        ...    await client.authenticate()
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        if aiohttp is None:
+            raise RuntimeError("AsyncClient requires the aiohttp package, "
+                               "install it with 'pip install aiohttp'")
+        super(AsyncClient, self).__init__(*args, **kwargs)
+        self._refresh_task = None
+        # Auth is serialised between the tasks using this client
+        self._auth_lock = asyncio.Lock()
+
+    def _create_session(self, pool_connections, pool_maxsize, pool_block):
+        # An aiohttp session has to be created inside a running event loop
+        # so this is deferred until the first request. aiohttp always waits
+        # for a free connection so pool_block has no equivalent.
+        self._connector_limits = {
+            "limit": pool_connections * pool_maxsize,
+            "limit_per_host": pool_maxsize,
+        }
+        return None
+
+    def _get_session(self):
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(**self._connector_limits)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def close(self):
+        """Close the pooled connections held by this client and stop
+        refreshing its auth token
+        """
+        self._cancel_token_refresh()
+        if self.session is not None:
+            await self.session.close()
+
+    def __enter__(self):
+        raise TypeError("AsyncClient must be closed by awaiting it, use "
+                        "'async with' instead of 'with'")
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def map(self, method, arg_iterable, max_workers=None, ordered=True):
+        """Like :meth:`kazoo.Client.map` but returns an async iterator, with
+        at most 'max_workers' calls in flight at once ::
+
+            >>>async for result in client.map("get_device", device_args):
+            ...    print(result.ok)
+
+        """
+        if isinstance(method, str):
+            method = getattr(self, method)
+        return map_calls_async(method, arg_iterable,
+                               max_workers or self.pool_maxsize,
+                               ordered=ordered)
+
+    def batch(self, max_workers=None):
+        """Return a :class:`kazoo.batch.AsyncBatch` which runs submitted
+        calls as tasks, at most 'max_workers' at once, defaulting to the
+        connection pool size
+        """
+        return AsyncBatch(max_workers or self.pool_maxsize)
+
+    def iter_time_range(self, method, args, created_from, created_to,
+                        window=86400, max_workers=None, page_size=None,
+                        sort_key="timestamp", **kwargs):
+        """Like :meth:`kazoo.Client.iter_time_range` but returns an async
+        iterator, with at most 'max_workers' windows fetched at once
+        """
+        get_params = kwargs.pop("get_params", {})
+
+        def fetch_documents(window_from, window_to):
+            window_params = dict(get_params, created_from=window_from,
+                                 created_to=window_to)
+            return self._iterate_list(method, args, page_size=page_size,
+                                      prefetch=0, get_params=window_params,
+                                      **kwargs)
+
+        return iterate_time_windows_async(fetch_documents, created_from,
+                                          created_to, window,
+                                          max_workers or self.pool_maxsize,
+                                          sort_key=sort_key)
+
+    def _iterate_list(self, list_method, args, page_size=None,
+                      start_key=None, prefetch=None, **kwargs):
+        if isinstance(list_method, str):
+            list_method = getattr(self, list_method)
+        get_params = kwargs.pop("get_params", {})
+        if prefetch is None:
+            prefetch = self.prefetch_pages
+        if kwargs.get("stream"):
+            # A streamed page has to be read before the next can be fetched
+            prefetch = 0
+
+        def fetch_page(page_params):
+            return list_method(*args, get_params={**get_params, **page_params},
+                               **kwargs)
+
+        pages = iterate_pages_async(fetch_page, page_size=page_size,
+                                    start_key=start_key)
+        if prefetch:
+            pages = prefetch_pages_async(pages, prefetch)
+        return iterate_documents_async(pages)
+
+    async def authenticate(self):
+        """Call this before making other api calls to fetch an auth token
+        which will be automatically used for all further requests
+        """
+        async with self._auth_lock:
+            if not self._authenticated:
+                self._set_auth_data(await self._get_auth_data_async())
+            return self.auth_token
+
+    async def _reauthenticate(self, failed_token):
+        """Replace the rejected 'failed_token' and return the new token, see
+        :meth:`kazoo.Client._reauthenticate`
+        """
+        async with self._auth_lock:
+            if self.auth_token == failed_token:
+                if self.token_store is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, self.token_store.discard, self._auth_identity,
+                        failed_token)
+                self._set_auth_data(await self._get_auth_data_async())
+            return self.auth_token
+
+    async def _get_auth_data_async(self):
+        if self.token_store is None:
+            return await self._fetch_auth_data_async()
+        return await self._fetch_stored_auth_data()
+
+    async def _fetch_auth_data_async(self):
+        return await self.auth_request.execute_async(self.base_url,
+                                                     self._get_session(),
+                                                     codec=self.codec)
+
+    async def _fetch_stored_auth_data(self):
+        # The store blocks while another client holds its lock, so it is
+        # used from a worker thread which runs the auth request back on
+        # this loop if it is needed
+        loop = asyncio.get_running_loop()
+
+        def fetch_auth_data():
+            return asyncio.run_coroutine_threadsafe(
+                self._fetch_auth_data_async(), loop).result()
+
+        return await loop.run_in_executor(
+            None, self.token_store.fetch, self._auth_identity,
+            fetch_auth_data)
+
+    def _schedule_token_refresh(self):
+        self._cancel_token_refresh()
+        delay = self._get_token_refresh_delay()
+        if delay is None:
+            return
+        self._refresh_timer = asyncio.get_running_loop().call_later(
+            delay, self._start_token_refresh)
+
+    def _start_token_refresh(self):
+        self._refresh_task = asyncio.ensure_future(
+            self._refresh_token_async())
+
+    async def _refresh_token_async(self):
+        try:
+            await self._reauthenticate(self.auth_token)
+        except Exception as e:
+            logger.error('Refreshing the kazoo auth token failed, it will be '
+                         'replaced once it is rejected: {}'.format(e))
+
+    async def _execute_request(self, request, **kwargs):
+        return await _run_steps_async(self._request_steps(request, kwargs))
+
+    async def _fetch(self, request, url, kwargs):
+        if self.single_flight is None:
+            return await self._execute_with_auth(request, kwargs)
+
+        async def execute():
+            return await self._execute_with_auth(request, kwargs)
+
+        key = self._get_flight_key(url, kwargs)
+        return await self.single_flight.call_async(key, execute)
+
+    async def _execute_download(self, request, dest, resume=False,
+                                **kwargs):
+        target = DownloadTarget(dest, resume=resume)
+        return await self._execute_with_auth(
+            request, kwargs, execute=functools.partial(request.download_async,
+                                                       target=target))
+
+    async def _execute_with_auth(self, request, kwargs, execute=None):
+        if request.auth_required:
+            kwargs["token"] = self.auth_token
+        session = self._get_session()
+        if self.codec is not None:
+            kwargs["codec"] = self.codec
+
+        try:
+            return await self._send(request, session, kwargs, execute)
+        except KazooApiAuthenticationError as e:
+            logger.error('Kazoo authentication failed. Attempting to re-authentication and retry: {}'.format(e))
+            kwargs["token"] = await self._reauthenticate(
+                kwargs.get("token", self.auth_token))
+            return await self._send(request, session, kwargs, execute)
+        except ValueError:
+            return ''
+
+    async def _send(self, request, session, kwargs, execute=None):
+        method = kwargs.get("method") or request.method
+        if execute is None:
+            execute = request.execute_async
+
+        async def send():
+            if self.rate_limiter is not None:
+                delay = self.rate_limiter.reserve(request, kwargs)
+                if delay:
+                    await asyncio.sleep(delay)
+            if self.concurrency_controller is not None:
+                return await self.concurrency_controller.call_async(
+                    request.route,
+                    lambda: execute(self.base_url, session, **kwargs))
+            return await execute(self.base_url, session, **kwargs)
+
+        async def attempt():
+            if self.circuit_breaker is not None:
+                return await self.circuit_breaker.call_async(request.route,
+                                                             send)
+            return await send()
+
+        return await self.retry_policy.call_async(method, attempt)
+
+    async def use_account_rate_limits(self, acct_id=None, scope="account",
+                                      limit_name="total_packets"):
+        """See :meth:`kazoo.Client.use_account_rate_limits`"""
+        response = await self.get_rate_limits(acct_id or self.account_id)
+        self.rate_limiter = RateLimiter.from_rate_limits(
+            response["data"], scope=scope, limit_name=limit_name)
+        return self.rate_limiter
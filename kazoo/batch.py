@@ -0,0 +1,231 @@
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+
+class BatchResult(object):
+    """The outcome of a single call made as part of a batch
+
+    Exactly one of ``result`` and ``error`` is set, ``index`` is the
+    position of the call in the batch and ``args`` the arguments it was
+    called with.
+    """
+
+    def __init__(self, index, args, result=None, error=None):
+        self.index = index
+        self.args = args
+        self.result = result
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return "<BatchResult {0} ok>".format(self.index)
+        return "<BatchResult {0} error={1!r}>".format(self.index, self.error)
+
+
+def _call(index, method, args, kwargs):
+    try:
+        return BatchResult(index, args, result=method(*args, **kwargs))
+    except Exception as e:
+        return BatchResult(index, args, error=e)
+
+
+async def _call_async(index, method, args, kwargs):
+    try:
+        return BatchResult(index, args, result=await method(*args, **kwargs))
+    except Exception as e:
+        return BatchResult(index, args, error=e)
+
+
+def _split_args(item):
+    if isinstance(item, dict):
+        return (), item
+    if isinstance(item, (tuple, list)):
+        return tuple(item), {}
+    return (item,), {}
+
+
+def map_calls(method, arg_iterable, max_workers, ordered=True):
+    """Call ``method`` once for each item of ``arg_iterable`` on a pool of
+    ``max_workers`` threads, yielding a :class:`BatchResult` for each call.
+
+    Items may be a tuple of positional arguments, a dict of keyword
+    arguments or a single positional argument. At most twice
+    ``max_workers`` calls are queued at a time so ``arg_iterable`` can be
+    arbitrarily long.
+    """
+    window = max_workers * 2
+    items = enumerate(arg_iterable)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        def submit_next():
+            for index, item in items:
+                args, kwargs = _split_args(item)
+                return executor.submit(_call, index, method, args, kwargs)
+            return None
+
+        if ordered:
+            pending = deque()
+            while True:
+                while len(pending) < window:
+                    future = submit_next()
+                    if future is None:
+                        break
+                    pending.append(future)
+                if not pending:
+                    return
+                yield pending.popleft().result()
+        else:
+            pending = set()
+            while True:
+                while len(pending) < window:
+                    future = submit_next()
+                    if future is None:
+                        break
+                    pending.add(future)
+                if not pending:
+                    return
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+
+async def map_calls_async(method, arg_iterable, max_concurrency,
+                          ordered=True):
+    """Asyncio version of :func:`map_calls`, ``method`` must return an
+    awaitable and at most ``max_concurrency`` calls are awaited at a time
+    """
+    items = enumerate(arg_iterable)
+
+    def start_next():
+        for index, item in items:
+            args, kwargs = _split_args(item)
+            return asyncio.ensure_future(
+                _call_async(index, method, args, kwargs))
+        return None
+
+    if ordered:
+        pending = deque()
+        while True:
+            while len(pending) < max_concurrency:
+                task = start_next()
+                if task is None:
+                    break
+                pending.append(task)
+            if not pending:
+                return
+            yield await pending.popleft()
+    else:
+        pending = set()
+        while True:
+            while len(pending) < max_concurrency:
+                task = start_next()
+                if task is None:
+                    break
+                pending.add(task)
+            if not pending:
+                return
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+
+class Batch(object):
+    """Collects calls to client methods and runs them concurrently
+
+    Calls are started as soon as they are submitted. ::
+
+        >>>with client.batch(max_workers=8) as batch:
+        ...    for device_id in device_ids:
+        ...        batch.submit(client.get_device, acct_id, device_id)
+        >>>for result in batch.results():
+        ...    print(result.index, result.ok)
+
+    """
+
+    def __init__(self, max_workers):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+
+    def submit(self, method, *args, **kwargs):
+        index = len(self._futures)
+        future = self._executor.submit(_call, index, method, args, kwargs)
+        self._futures.append(future)
+        return future
+
+    def results(self, ordered=True):
+        """Yield a :class:`BatchResult` for each submitted call, either in
+        the order they were submitted or as they complete
+        """
+        if ordered:
+            for future in self._futures:
+                yield future.result()
+        else:
+            pending = set(self._futures)
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncBatch(object):
+    """Asyncio version of :class:`Batch`, each submitted call is started
+    as a task with at most 'max_concurrency' of them awaiting their call at
+    once ::
+
+        >>>async with client.batch(max_workers=8) as batch:
+        ...    for device_id in device_ids:
+        ...        batch.submit(client.get_device, acct_id, device_id)
+        >>>async for result in batch.results():
+        ...    print(result.index, result.ok)
+
+    """
+
+    def __init__(self, max_concurrency):
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks = []
+
+    async def _run(self, index, method, args, kwargs):
+        async with self._semaphore:
+            return await _call_async(index, method, args, kwargs)
+
+    def submit(self, method, *args, **kwargs):
+        index = len(self._tasks)
+        task = asyncio.ensure_future(self._run(index, method, args, kwargs))
+        self._tasks.append(task)
+        return task
+
+    async def results(self, ordered=True):
+        """Yield a :class:`BatchResult` for each submitted call, either in
+        the order they were submitted or as they complete
+        """
+        if ordered:
+            for task in self._tasks:
+                yield await task
+        else:
+            for task in asyncio.as_completed(self._tasks):
+                yield await task
+
+    async def close(self):
+        """Wait for every submitted call to finish"""
+        if self._tasks:
+            await asyncio.wait(self._tasks)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
@@ -0,0 +1,118 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+
+def _url_path(url):
+    return url.split("?", 1)[0].rstrip("/")
+
+
+def get_etag(response):
+    """Return an entity tag for a decoded response, made from the document
+    revision in its envelope, or None if it has no revision
+    """
+    revision = None
+    if isinstance(response, dict):
+        revision = response.get("revision")
+    if not revision:
+        return None
+    return '"{0}"'.format(revision)
+
+
+class ResponseCache(object):
+    """A size bounded cache of GET responses which expire after ``ttl``
+    seconds, the least recently used response being evicted once there are
+    ``maxsize`` of them
+
+    Responses are keyed by an auth identity and the full url they were
+    fetched from, and are copied on the way in and out so callers can
+    modify what they are given. One cache can be shared between clients.
+
+    A response stored with an ``etag`` is kept after it expires so that it
+    can be revalidated with a conditional request, and reused with
+    :meth:`refresh` if it has not changed. With a ``ttl`` of 0 every read
+    is revalidated.
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, identity, url):
+        """Return a copy of the cached response for ``url`` if it has not
+        expired, or None
+        """
+        key = (identity, url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response, etag = entry
+            if expires <= self._clock():
+                if etag is None:
+                    del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+        return copy.deepcopy(response)
+
+    def get_etag(self, identity, url):
+        """Return the etag of the response cached for ``url``, whether or not
+        it has expired
+        """
+        entry = self._entries.get((identity, url))
+        if entry is None:
+            return None
+        return entry[2]
+
+    def refresh(self, identity, url):
+        """Mark the response cached for ``url`` as fresh again, because the
+        server says it is unchanged, and return a copy of it. Returns None
+        if it is no longer cached.
+        """
+        key = (identity, url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, response, etag = entry
+            self._entries[key] = (self._clock() + self.ttl, response, etag)
+            self._entries.move_to_end(key)
+        return copy.deepcopy(response)
+
+    def set(self, identity, url, response, etag=None):
+        response = copy.deepcopy(response)
+        key = (identity, url)
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, response, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, identity, url):
+        """Remove the responses affected by a change to ``url``
+
+        That is the responses for the object itself, anything below it such
+        as its extra views, and the collection it belongs to, whatever their
+        query strings.
+        """
+        path = _url_path(url)
+        collection = path.rsplit("/", 1)[0]
+        with self._lock:
+            for key in list(self._entries):
+                if key[0] != identity:
+                    continue
+                cached_path = _url_path(key[1])
+                if (cached_path == path or cached_path == collection or
+                        cached_path.startswith(path + "/")):
+                    del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,149 @@
+import threading
+import time
+from kazoo.concurrency import is_overload_error
+from kazoo.exceptions import CircuitOpenError
+
+
+class CircuitBreaker(object):
+    """Stops calls to an endpoint which keeps failing
+
+    The breaker starts closed. After ``failure_threshold`` consecutive
+    failures it opens and calls fail straight away with
+    :class:`kazoo.exceptions.CircuitOpenError`. Once ``recovery_timeout``
+    seconds have passed it becomes half open and lets up to
+    ``half_open_max_calls`` probe calls through. A successful probe closes
+    the breaker again and a failed one reopens it.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name=None, failure_threshold=5, recovery_timeout=30,
+                 half_open_max_calls=1, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self._clock = clock
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = None
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            self._check_recovery()
+            return self._state
+
+    def _check_recovery(self):
+        if (self._state == self.OPEN and
+                self._clock() - self._opened_at >= self.recovery_timeout):
+            self._state = self.HALF_OPEN
+            self._probes = 0
+
+    def before_call(self):
+        """Raise :class:`CircuitOpenError` unless a call may be made now,
+        returning whether the call is a half open probe
+        """
+        with self._lock:
+            self._check_recovery()
+            if self._state == self.CLOSED:
+                return False
+            if (self._state == self.HALF_OPEN and
+                    self._probes < self.half_open_max_calls):
+                self._probes += 1
+                return True
+            retry_after = max(0.0, self.recovery_timeout -
+                              (self._clock() - self._opened_at))
+        raise CircuitOpenError(self.name, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if (self._state == self.HALF_OPEN or
+                    self._failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+
+    def _release_probe(self):
+        with self._lock:
+            if self._state == self.HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def _record(self, error):
+        if error is None:
+            self.record_success()
+        elif is_overload_error(error):
+            self.record_failure()
+        else:
+            # The endpoint answered, even if with an error, so it is healthy
+            self.record_success()
+
+    def call(self, func):
+        probe = self.before_call()
+        recorded = False
+        try:
+            result = func()
+        except Exception as e:
+            recorded = True
+            self._record(e)
+            raise
+        else:
+            recorded = True
+            self._record(None)
+            return result
+        finally:
+            # A cancelled or interrupted probe gives its slot back
+            if probe and not recorded:
+                self._release_probe()
+
+    async def call_async(self, func):
+        probe = self.before_call()
+        recorded = False
+        try:
+            result = await func()
+        except Exception as e:
+            recorded = True
+            self._record(e)
+            raise
+        else:
+            recorded = True
+            self._record(None)
+            return result
+        finally:
+            # A cancelled or interrupted probe gives its slot back
+            if probe and not recorded:
+                self._release_probe()
+
+
+class CircuitBreakerRegistry(object):
+    """Keeps a separate :class:`CircuitBreaker` for each endpoint, keyed by
+    request route, so that one failing backend does not stop requests to
+    healthy ones
+    """
+
+    def __init__(self, **breaker_kwargs):
+        self.breaker_kwargs = breaker_kwargs
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get_breaker(self, key):
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = CircuitBreaker(name=key, **self.breaker_kwargs)
+                self._breakers[key] = breaker
+            return breaker
+
+    def call(self, key, func):
+        return self.get_breaker(key).call(func)
+
+    async def call_async(self, key, func):
+        return await self.get_breaker(key).call_async(func)
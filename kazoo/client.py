@@ -1,10 +1,24 @@
+import functools
+import hashlib
 import json
 import requests
+import threading
+import time
 import kazoo.exceptions as exceptions
 import logging
+from requests.adapters import HTTPAdapter
 from kazoo.request_objects import KazooRequest, UsernamePasswordAuthRequest, \
-    ApiKeyAuthRequest
+    ApiKeyAuthRequest, NOT_MODIFIED
 from kazoo.rest_resources import RestResource
+from kazoo.batch import Batch, map_calls
+from kazoo.cache import get_etag
+from kazoo.download import DownloadTarget
+from kazoo.upload import FileBody, DEFAULT_CHUNK_SIZE
+from kazoo.retry import RetryPolicy
+from kazoo.ratelimit import RateLimiter
+from kazoo.tokenstore import get_token_expiry
+from kazoo.pagination import iterate_pages, iterate_documents, \
+    prefetch_pages, iterate_time_windows
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.DEBUG)
@@ -20,6 +34,7 @@ class RestClientMetaClass(type):
 
     def _add_resource_methods(cls, resource_field_name, rest_resource, dct):
         cls._generate_list_func(resource_field_name, rest_resource)
+        cls._generate_iter_func(resource_field_name, rest_resource)
         cls._generate_get_object_func(resource_field_name, rest_resource)
         cls._generate_delete_object_func(resource_field_name, rest_resource)
         cls._generate_update_object_func(resource_field_name, rest_resource)
@@ -38,7 +53,7 @@ class RestClientMetaClass(type):
             func_name,
             resource_field_name,
             required_args,
-            request_type='get_create_object_request',
+            request_type='create',
             requires_data=True)
         setattr(cls, func_name, func)
 
@@ -51,9 +66,26 @@ class RestClientMetaClass(type):
             func_name,
             resource_field_name,
             required_args,
-            request_type='get_list_request')
+            request_type='list')
         setattr(cls, func_name, func)
 
+    def _generate_iter_func(cls, resource_field_name, rest_resource):
+        if "list" not in rest_resource.methods:
+            return
+        list_func_name = rest_resource.method_names["list"]
+        func_name = cls._get_iter_func_name(list_func_name)
+        required_args_str = "".join(
+            "{0},".format(argname) for argname in rest_resource.required_args)
+        func_definition = "def {0}(self, {1} page_size=None, **kwargs): return self._iterate_list(\"{2}\", [{1}], page_size=page_size, **kwargs)".format(
+            func_name, required_args_str, list_func_name)
+        setattr(cls, func_name, cls._compile_func(func_name, func_definition))
+
+    def _get_iter_func_name(cls, list_func_name):
+        for prefix in ["get_", "list_"]:
+            if list_func_name.startswith(prefix):
+                return "iter_" + list_func_name[len(prefix):]
+        return "iter_" + list_func_name
+
     def _generate_get_object_func(cls, resource_field_name, rest_resource):
         if "detail" not in rest_resource.methods:
             return
@@ -64,7 +96,7 @@ class RestClientMetaClass(type):
             func_name,
             resource_field_name,
             required_args,
-            request_type='get_object_request')
+            request_type='object')
         setattr(cls, func_name, func)
 
     def _generate_delete_object_func(cls, resource_field_name, rest_resource):
@@ -77,7 +109,7 @@ class RestClientMetaClass(type):
             func_name,
             resource_field_name,
             required_args,
-            request_type='get_delete_object_request')
+            request_type='delete')
         setattr(cls, func_name, func)
 
     def _generate_update_object_func(cls, resource_field_name, rest_resource):
@@ -90,7 +122,7 @@ class RestClientMetaClass(type):
             func_name,
             resource_field_name,
             required_args,
-            request_type='get_update_object_request',
+            request_type='update',
             requires_data=True)
         setattr(cls, func_name, func)
 
@@ -104,7 +136,7 @@ class RestClientMetaClass(type):
             func_name,
             resource_field_name,
             required_args,
-            request_type='get_partial_update_object_request',
+            request_type='partial_update',
             requires_data=True)
         setattr(cls, func_name, func)
 
@@ -124,7 +156,7 @@ class RestClientMetaClass(type):
             func_name,
             resource_field_name,
             required_args,
-            extra_view_name=extra_view_desc["path"],
+            extra_view_name=func_name,
             requires_data=requires_data)
         setattr(cls, func_name, func)
 
@@ -143,36 +175,71 @@ class RestClientMetaClass(type):
         required_args_str = ",".join(required_args)
         if len(required_args) > 0:
             required_args_str += ","
-        get_request_args = ",".join(["{0}={0}".format(argname)
-                                     for argname in required_args])
-
-        if request_type == 'get_list_request' and get_request_args:
-            get_request_string = "self.{0}.{1}({2}, request_optional_args=optional_args)".format(
-            resource_field_name, request_type, get_request_args)
-
-        elif request_type:
-            get_request_string = "self.{0}.{1}({2})".format(
-                resource_field_name, request_type, get_request_args)
+        execute_args = "".join(["{0}={0},".format(argname)
+                                for argname in required_args])
+
+        # The request is a template shared by every call, the arguments are
+        # passed to it when it is executed
+        if request_type:
+            template_string = "self.{0}.get_request_template(\"{1}\")".format(
+                resource_field_name, request_type)
         else:
-            get_req_templ = "self.{0}.get_extra_view_request(\"{1}\",{2})"
-            get_request_string = get_req_templ.format(
-                resource_field_name, extra_view_name, get_request_args)
+            template_string = "self.{0}.get_extra_view_template(\"{1}\")".format(
+                resource_field_name, extra_view_name)
 
-        if requires_data:
-            func_definition = "def {0}(self, {1} **kwargs): return self._execute_request({2}, data=data, **kwargs)".format(
-                func_name, required_args_str, get_request_string)
+        if request_type == 'list' and required_args:
+            func_definition = "def {0}(self, {1} optional_args=None, **kwargs): return self._execute_request({2}, {3} **self._with_optional_args(optional_args, kwargs))".format(
+                func_name, required_args_str, template_string, execute_args)
         else:
-            if request_type == 'get_list_request' and get_request_args:
-                func_definition = "def {0}(self, {1} optional_args=None, **kwargs): return self._execute_request({2}, **kwargs )".format(
-                    func_name, required_args_str, get_request_string)
+            func_definition = "def {0}(self, {1} **kwargs): return self._execute_request({2}, {3} **kwargs)".format(
+                func_name, required_args_str, template_string, execute_args)
+
+        return cls._compile_func(func_name, func_definition)
+
+    def _compile_func(cls, func_name, func_definition):
+        # Compiling the few hundred generated methods is most of the time
+        # taken to import the client, so each is compiled when first used
+        return _LazyFunction(func_name, func_definition)
+
+
+def _compile_func(func_name, func_definition):
+    func = compile(func_definition, __file__, 'exec')
+    d = {}
+    exec(func, d)
+    return d[func_name]
+
+
+def _run_steps(steps):
+    """Run the steps yielded by :meth:`Client._request_steps`"""
+    try:
+        step = next(steps)
+        while True:
+            try:
+                result = step()
+            except BaseException as e:
+                step = steps.throw(e)
             else:
-                func_definition = "def {0}(self, {1} **kwargs): return self._execute_request({2}, **kwargs)".format(
-                    func_name, required_args_str, get_request_string)
+                step = steps.send(result)
+    except StopIteration as e:
+        return e.value
+
+
+class _LazyFunction(object):
+    """Stands in for a generated method until it is first looked up, when
+    it is compiled and replaces this on the class
+    """
+
+    def __init__(self, func_name, func_definition):
+        self.func_name = func_name
+        self.func_definition = func_definition
 
-        func = compile(func_definition, __file__, 'exec')
-        d = {}
-        exec(func, d)
-        return d[func_name]
+    def __get__(self, instance, owner):
+        func = _compile_func(self.func_name, self.func_definition)
+        for cls in owner.__mro__:
+            if cls.__dict__.get(self.func_name) is self:
+                setattr(cls, self.func_name, func)
+                break
+        return func.__get__(instance, owner)
 
 
 class Client(metaclass=RestClientMetaClass):
@@ -200,6 +267,101 @@ class Client(metaclass=RestClientMetaClass):
         >>>client = kazoo.Client(base_url='http://api.example.com:8000/v1',
                                  api_key="sdfasdfas")
 
+    Every request made by a client goes through a single persistent
+    :class:`requests.Session`, so connections to the api server are kept
+    alive and reused between calls. The connection pool can be tuned with
+    the 'pool_connections' (number of hosts to keep pools for),
+    'pool_maxsize' (connections kept per host) and 'pool_block' (wait for a
+    free connection instead of opening an extra one) arguments. Call
+    :meth:`close()`, or use the client as a context manager, to release the
+    pooled connections. ::
+
+        >>>with kazoo.Client(api_key="sdfasdfas", pool_maxsize=20) as client:
+        ...    client.authenticate()
+
+    Requests which fail temporarily, because they were throttled (429), the
+    api was unavailable (502, 503, 504) or the connection dropped, are
+    retried with exponential backoff and jitter, honouring any Retry-After
+    header. This is controlled by passing a
+    :class:`kazoo.retry.RetryPolicy` as 'retry_policy'. ::
+
+        >>>client = kazoo.Client(api_key="sdfasdfas",
+        ...                      retry_policy=RetryPolicy(max_retries=5))
+
+    Requests can be throttled on the client side by passing a
+    :class:`kazoo.ratelimit.RateLimiter` as 'rate_limiter', which is a token
+    bucket shared by all threads using the client. It can limit all
+    requests, each account's requests or each endpoint's requests, or be
+    built from an account's rate_limits document with
+    :meth:`use_account_rate_limits()`. ::
+
+        >>>client = kazoo.Client(api_key="sdfasdfas",
+        ...                      rate_limiter=RateLimiter(20, scope="account"))
+
+    When making requests from many threads, such as with :meth:`map()`,
+    passing a :class:`kazoo.concurrency.ConcurrencyController` as
+    'concurrency_controller' adapts the number of requests in flight to
+    each endpoint. It grows while latency stays flat and backs off when
+    requests are throttled, fail with 5xx errors or slow down. The worker
+    count then only acts as an upper bound. ::
+
+        >>>client = kazoo.Client(api_key="sdfasdfas", pool_maxsize=32,
+        ...                      concurrency_controller=ConcurrencyController())
+        >>>results = client.map("get_device", device_args, max_workers=32)
+
+    Passing a :class:`kazoo.circuitbreaker.CircuitBreakerRegistry` as
+    'circuit_breaker' stops the client from sending requests to an
+    endpoint which keeps failing. Those calls raise
+    :class:`kazoo.exceptions.CircuitOpenError` straight away until a probe
+    request succeeds after the recovery timeout. ::
+
+        >>>client = kazoo.Client(api_key="sdfasdfas",
+        ...                      circuit_breaker=CircuitBreakerRegistry(
+        ...                          failure_threshold=5, recovery_timeout=30))
+
+    GET responses can be cached by passing a :class:`kazoo.cache.ResponseCache`
+    as 'response_cache'. Cached responses expire after the cache's ttl and
+    the least recently used are evicted once it is full. Any other request
+    made through the client, such as an update, partial update or delete,
+    invalidates the cached responses for that object, the views below it
+    and its collection. Pass 'cache=False' to a method to bypass the cache
+    for that call. ::
+
+        >>>client = kazoo.Client(api_key="sdfasdfas",
+        ...                      response_cache=ResponseCache(maxsize=1000,
+        ...                                                   ttl=30))
+
+    Expired documents which carry a revision are revalidated rather than
+    fetched again, the revision is sent as 'If-None-Match' and if the server
+    responds 304 Not Modified the cached document is reused. A cache with a
+    ttl of 0 revalidates every read.
+
+    Identical GET requests made at the same time, from several threads or
+    tasks, can be collapsed into one by passing a
+    :class:`kazoo.singleflight.SingleFlight` as 'single_flight'. The first
+    request is sent and the others wait for it and share its response. ::
+
+        >>>client = kazoo.Client(api_key="sdfasdfas",
+        ...                      single_flight=SingleFlight())
+
+    Processes on one host can share auth tokens by passing a token store
+    from :mod:`kazoo.tokenstore` as 'token_store'. :meth:`authenticate()`
+    then reuses a stored token for the same credentials, and only one of the
+    processes authenticates when there is none or it has been rejected. ::
+
+        >>>client = kazoo.Client(api_key="sdfasdfas",
+        ...                      token_store=FileTokenStore("/tmp/kazoo"))
+
+    When the auth token is a JWT with an expiry the client fetches a new one
+    in the background 'token_refresh_margin' seconds, 60 by default, before
+    it expires, so requests are not rejected and replayed. Pass None to only
+    replace tokens once they are rejected.
+
+    Request and response bodies are encoded and decoded with orjson if it is
+    installed, or the json module otherwise. Another codec from
+    :mod:`kazoo.codec`, or any object with the same 'dumps' and 'loads'
+    methods, can be passed as 'codec'.
+
     API calls which require data take it in the form of a required argument
     called 'data' which is the last argument to the method. For example ::
 
@@ -243,6 +405,61 @@ class Client(metaclass=RestClientMetaClass):
         POST /account/{account_id}/callflows/{callflow_id} -> client.update_callflow(acct_id, data)
         DELETE /account/{account_id}/callflows/{callflow_id} -> client.delete_callflow(acct_id, callflow_id)
 
+    Every list method also has an 'iter_' counterpart which follows Kazoo's
+    'start_key' pagination lazily and yields the documents one at a time,
+    fetching the next page only once the current one is used up. ::
+
+        >>>for cdr in client.iter_cdrs(acct_id, page_size=500):
+        ...    process(cdr)
+
+    Passing 'prefetch=N' to an iter method, or 'prefetch_pages=N' to the
+    client to make it the default, fetches up to N pages ahead on a
+    background thread while the current page is being processed.
+
+    Large list responses can be parsed as they arrive by passing
+    'stream=True' to a method. It then returns a
+    :class:`kazoo.jsonstream.StreamedResponse` which yields the documents
+    in the page one at a time, so only one is held in memory, and gives
+    the envelope fields such as 'next_start_key' through its 'get' method.
+    Streamed responses are not cached. 'stream=True' also works with the
+    iter methods. ::
+
+        >>>for cdr in client.iter_cdrs(acct_id, stream=True):
+        ...    process(cdr)
+
+    Passing 'fields', a list of field names or dotted paths, to a list or
+    detail method keeps only those fields of each document. Documents are
+    projected one at a time as the response is decoded, so the dropped
+    fields of the whole response are never held at once. Projected
+    responses are not cached. ::
+
+        >>>client.get_devices(acct_id, fields=["id", "name",
+        ...                                    "caller_id.external.number"])
+
+    Passing 'lazy=True' returns the response as a
+    :class:`kazoo.records.Record`, whose fields are read as attributes or
+    items. Each document in a list keeps its JSON text until a field of it
+    is first read, and decoded records share their field names, so a large
+    page takes much less memory than the equivalent dicts. Lazy responses
+    are not cached, 'to_dict' converts a record back to dicts. ::
+
+        >>>for device in client.iter_devices(acct_id, lazy=True):
+        ...    print(device.name)
+
+    Binary files are streamed in chunks rather than held in memory. Media
+    files, fax attachments, user photos and recordings are downloaded to a
+    path or file with the 'download_' methods, which can resume a partial
+    download. Files are uploaded with :meth:`upload_media_file` and
+    :meth:`upload_phone_number_file`, or by passing a
+    :class:`kazoo.upload.FileBody` as 'body' to a method, which is sent
+    along with its 'data' if it has any. ::
+
+        >>>client.download_recording(acct_id, recording_id, "call.mp3",
+        ...                          resume=True)
+        >>>with open("fax.pdf", "rb") as f:
+        ...    client.create_outgoing_fax(acct_id, fax_data,
+        ...                               body=FileBody(f, progress=report))
+
     Some resources do not have all methods available, in which case they are
     not present on the client.
 
@@ -1164,7 +1381,8 @@ class Client(metaclass=RestClientMetaClass):
 
     _rate_limits_resource = RestResource("rate_limits",
                                    "/accounts/{account_id}/rate_limits/{ignored}",
-                                   methods=['lists'],
+                                   methods=['list'],
+                                   method_names={"list": "get_rate_limits"},
                                    extra_views=[{
                                        "name": "update_rate_limits",
                                        "method": "post",
@@ -1509,7 +1727,12 @@ class Client(metaclass=RestClientMetaClass):
         )
 
     def __init__(self, api_key=None, password=None, account_name=None,
-                 username=None, base_url=None):
+                 username=None, base_url=None, pool_connections=10,
+                 pool_maxsize=10, pool_block=False, prefetch_pages=0,
+                 retry_policy=None, rate_limiter=None,
+                 concurrency_controller=None, circuit_breaker=None,
+                 response_cache=None, single_flight=None, token_store=None,
+                 token_refresh_margin=60, codec=None):
         if not api_key and not password:
             raise RuntimeError("You must pass either an api_key or an "
                                "account name/password pair")
@@ -1532,36 +1755,364 @@ class Client(metaclass=RestClientMetaClass):
         self.api_key = api_key
         self._authenticated = False
         self.auth_token = None
+        self._auth_lock = threading.RLock()
+        self.pool_maxsize = pool_maxsize
+        self.prefetch_pages = prefetch_pages
+        if retry_policy is None:
+            retry_policy = RetryPolicy()
+        self.retry_policy = retry_policy
+        self.rate_limiter = rate_limiter
+        self.concurrency_controller = concurrency_controller
+        self.circuit_breaker = circuit_breaker
+        self.response_cache = response_cache
+        self.single_flight = single_flight
+        self.token_store = token_store
+        self.token_refresh_margin = token_refresh_margin
+        self.codec = codec
+        self._refresh_timer = None
+        self._auth_identity = self._get_auth_identity()
+        self.session = self._create_session(pool_connections, pool_maxsize,
+                                            pool_block)
+
+    def _get_auth_identity(self):
+        if isinstance(self.auth_request, ApiKeyAuthRequest):
+            credentials = [self.auth_request.api_key]
+        else:
+            credentials = [self.auth_request.account_name,
+                           self.auth_request.username,
+                           self.auth_request._get_hashed_credentials()]
+        identity = "\n".join([self.base_url] + credentials)
+        return hashlib.sha256(identity.encode()).hexdigest()
+
+    def _create_session(self, pool_connections, pool_maxsize, pool_block):
+        session = requests.Session()
+        for prefix in ["http://", "https://"]:
+            adapter = HTTPAdapter(pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize,
+                                  pool_block=pool_block)
+            session.mount(prefix, adapter)
+        return session
+
+    def close(self):
+        """Close the pooled connections held by this client and stop
+        refreshing its auth token
+        """
+        self._cancel_token_refresh()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def map(self, method, arg_iterable, max_workers=None, ordered=True):
+        """Call a client method once per item of 'arg_iterable' concurrently,
+        yielding a :class:`kazoo.batch.BatchResult` for each call either in
+        order or, with 'ordered=False', as they complete. A failing call is
+        reported on its result rather than aborting the others. ::
+
+            >>>for result in client.map("get_device",
+            ...                         [(acct_id, dev_id) for dev_id in ids]):
+            ...    if result.ok:
+            ...        print(result.result["data"]["name"])
+
+        'method' may be a bound method or a method name. 'max_workers'
+        defaults to the connection pool size.
+        """
+        if isinstance(method, str):
+            method = getattr(self, method)
+        return map_calls(method, arg_iterable,
+                         max_workers or self.pool_maxsize, ordered=ordered)
+
+    def batch(self, max_workers=None):
+        """Return a :class:`kazoo.batch.Batch` which runs submitted calls
+        concurrently on 'max_workers' threads, defaulting to the connection
+        pool size
+        """
+        return Batch(max_workers or self.pool_maxsize)
 
     def authenticate(self):
         """Call this before making other api calls to fetch an auth token
         which will be automatically used for all further requests
         """
-        if not self._authenticated:
-            self.auth_data = self.auth_request.execute(self.base_url)
-            self.auth_token = self.auth_data["auth_token"]
-            self.account_id = self.auth_data['data']["account_id"]
-            self._authenticated = True
-        return self.auth_token
+        with self._auth_lock:
+            if not self._authenticated:
+                self._set_auth_data(self._get_auth_data())
+            return self.auth_token
+
+    def _reauthenticate(self, failed_token):
+        """Replace the rejected 'failed_token' and return the new token
+
+        When a token expires every request in flight is rejected with it,
+        the first caller authenticates while the others wait and then use
+        the token it fetched.
+        """
+        with self._auth_lock:
+            if self.auth_token == failed_token:
+                if self.token_store is not None:
+                    self.token_store.discard(self._auth_identity,
+                                             failed_token)
+                self._authenticated = False
+                self.authenticate()
+            return self.auth_token
+
+    def _get_auth_data(self):
+        if self.token_store is None:
+            return self._fetch_auth_data()
+        return self.token_store.fetch(self._auth_identity,
+                                      self._fetch_auth_data)
+
+    def _fetch_auth_data(self):
+        return self.auth_request.execute(self.base_url, session=self.session,
+                                         codec=self.codec)
+
+    def _set_auth_data(self, auth_data):
+        self.auth_data = auth_data
+        self.auth_token = self.auth_data["auth_token"]
+        self.account_id = self.auth_data['data']["account_id"]
+        self._authenticated = True
+        self._schedule_token_refresh()
+
+    def _get_token_refresh_delay(self):
+        if self.token_refresh_margin is None:
+            return None
+        expires = get_token_expiry(self.auth_token)
+        if expires is None:
+            return None
+        lifetime = expires - time.time()
+        if lifetime <= 0:
+            return None
+        # Tokens which live for less than twice the margin are refreshed
+        # half way through their life rather than straight away
+        return max(lifetime - self.token_refresh_margin, lifetime / 2.0)
+
+    def _schedule_token_refresh(self):
+        self._cancel_token_refresh()
+        delay = self._get_token_refresh_delay()
+        if delay is None:
+            return
+        timer = threading.Timer(delay, self._refresh_token)
+        timer.daemon = True
+        timer.start()
+        self._refresh_timer = timer
+
+    def _cancel_token_refresh(self):
+        if self._refresh_timer is not None:
+            self._refresh_timer.cancel()
+            self._refresh_timer = None
+
+    def _refresh_token(self):
+        try:
+            self._reauthenticate(self.auth_token)
+        except Exception as e:
+            logger.error('Refreshing the kazoo auth token failed, it will be '
+                         'replaced once it is rejected: {}'.format(e))
 
     def _execute_request(self, request, **kwargs):
+        return _run_steps(self._request_steps(request, kwargs))
+
+    def _request_steps(self, request, kwargs):
+        """Take a request through the response cache and single flight
+
+        This is a generator shared by the sync and async clients. It yields
+        functions which send the request, which the client calls, or
+        awaits, sending back the result or throwing in the exception it
+        raised, and returns the response.
+        """
+        use_cache = (kwargs.pop("cache", True) and
+                     self.response_cache is not None)
+
+        def send():
+            return self._execute_with_auth(request, kwargs)
+
+        url = None
+        if use_cache or self.single_flight is not None:
+            url = request.resolve_url(self.base_url, kwargs)
+        if url is None:
+            return (yield send)
+
+        if not self._is_get(request, kwargs):
+            try:
+                return (yield send)
+            finally:
+                if use_cache:
+                    self.response_cache.invalidate(self._auth_identity, url)
+
+        if (kwargs.get("stream") or kwargs.get("fields") or
+                kwargs.get("lazy")):
+            # The caller reads a streamed response, a projected one holds
+            # partial documents and a lazy one is decoded as it is used, so
+            # none can be cached or shared with other requests
+            return (yield send)
+
+        def fetch():
+            return self._fetch(request, url, kwargs)
+
+        if not use_cache:
+            return (yield fetch)
+
+        response = self.response_cache.get(self._auth_identity, url)
+        if response is not None:
+            return response
+
+        etag = self.response_cache.get_etag(self._auth_identity, url)
+        headers = kwargs.get("headers")
+        if etag is not None:
+            kwargs["headers"] = dict(headers or {}, **{"If-None-Match": etag})
+        response = yield fetch
+        if response is NOT_MODIFIED:
+            response = self.response_cache.refresh(self._auth_identity, url)
+            if response is not None:
+                return response
+            # Evicted while the request was being made, so fetch it again
+            # without If-None-Match
+            if headers is None:
+                kwargs.pop("headers")
+            else:
+                kwargs["headers"] = headers
+            response = yield fetch
+        if response:
+            self.response_cache.set(self._auth_identity, url, response,
+                                    etag=get_etag(response))
+        return response
+
+    def _fetch(self, request, url, kwargs):
+        """Send a GET request, sharing the response with any identical
+        request already in flight when the client has a single_flight
+        """
+        if self.single_flight is None:
+            return self._execute_with_auth(request, kwargs)
+        key = self._get_flight_key(url, kwargs)
+        return self.single_flight.call(
+            key, lambda: self._execute_with_auth(request, kwargs))
+
+    def _get_flight_key(self, url, kwargs):
+        headers = tuple(sorted((kwargs.get("headers") or {}).items()))
+        return (self._auth_identity, "get", url, headers)
+
+    def _with_optional_args(self, optional_args, kwargs):
+        if optional_args:
+            kwargs["get_params"] = {**optional_args,
+                                    **kwargs.get("get_params", {})}
+        return kwargs
+
+    def _is_get(self, request, kwargs):
+        method = kwargs.get("method") or request.method
+        return method.lower() == "get"
+
+    def _execute_download(self, request, dest, resume=False, **kwargs):
+        target = DownloadTarget(dest, resume=resume)
+        return self._execute_with_auth(
+            request, kwargs, execute=functools.partial(request.download,
+                                                       target=target))
+
+    def _execute_with_auth(self, request, kwargs, execute=None):
         from .exceptions import KazooApiAuthenticationError
 
         if request.auth_required:
             kwargs["token"] = self.auth_token
+        kwargs["session"] = self.session
+        if self.codec is not None:
+            kwargs["codec"] = self.codec
 
         try:
-            return request.execute(self.base_url, **kwargs)
+            return self._send(request, kwargs, execute)
         except KazooApiAuthenticationError as e:
             logger.error('Kazoo authentication failed. Attempting to re-authentication and retry: {}'.format(e))
-            self._authenticated = False
-            self.auth_token = None
-            self.authenticate()
-            kwargs["token"] = self.auth_token
-            return request.execute(self.base_url, **kwargs)
+            kwargs["token"] = self._reauthenticate(
+                kwargs.get("token", self.auth_token))
+            return self._send(request, kwargs, execute)
         except ValueError:
             return ''
 
+    def _send(self, request, kwargs, execute=None):
+        method = kwargs.get("method") or request.method
+        if execute is None:
+            execute = request.execute
+
+        def send():
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(request, kwargs)
+            if self.concurrency_controller is not None:
+                return self.concurrency_controller.call(
+                    request.route, lambda: execute(self.base_url, **kwargs))
+            return execute(self.base_url, **kwargs)
+
+        def attempt():
+            if self.circuit_breaker is not None:
+                return self.circuit_breaker.call(request.route, send)
+            return send()
+
+        return self.retry_policy.call(method, attempt)
+
+    def use_account_rate_limits(self, acct_id=None, scope="account",
+                                limit_name="total_packets"):
+        """Install a :class:`kazoo.ratelimit.RateLimiter` on this client
+        built from the rate_limits document of 'acct_id', defaulting to the
+        authenticated account
+        """
+        response = self.get_rate_limits(acct_id or self.account_id)
+        self.rate_limiter = RateLimiter.from_rate_limits(
+            response["data"], scope=scope, limit_name=limit_name)
+        return self.rate_limiter
+
+    def iter_time_range(self, method, args, created_from, created_to,
+                        window=86400, max_workers=None, page_size=None,
+                        sort_key="timestamp", **kwargs):
+        """Yield every document returned by a list method between the
+        gregorian timestamps 'created_from' and 'created_to', ordered by
+        'sort_key'. The range is split into windows of 'window' seconds
+        which are fetched concurrently on 'max_workers' threads, each one
+        following the pagination of its own 'created_from'/'created_to'
+        query. ::
+
+            >>>cdrs = client.iter_time_range("get_cdrs", [acct_id],
+            ...                              created_from, created_to,
+            ...                              window=3600, max_workers=8)
+            >>>for cdr in cdrs:
+            ...    process(cdr)
+
+        This works with any method taking a created range, such as
+        get_cdrs, get_acdc_call_stats and get_user_cdrs. 'method' may be a
+        method name or a bound method and 'args' are its positional
+        arguments.
+        """
+        get_params = kwargs.pop("get_params", {})
+
+        def fetch_documents(window_from, window_to):
+            window_params = dict(get_params, created_from=window_from,
+                                 created_to=window_to)
+            return self._iterate_list(method, args, page_size=page_size,
+                                      prefetch=0, get_params=window_params,
+                                      **kwargs)
+
+        return iterate_time_windows(fetch_documents, created_from,
+                                    created_to, window,
+                                    max_workers or self.pool_maxsize,
+                                    sort_key=sort_key)
+
+    def _iterate_list(self, list_method, args, page_size=None,
+                      start_key=None, prefetch=None, **kwargs):
+        if isinstance(list_method, str):
+            list_method = getattr(self, list_method)
+        get_params = kwargs.pop("get_params", {})
+        if prefetch is None:
+            prefetch = self.prefetch_pages
+        if kwargs.get("stream"):
+            # A streamed page has to be read before the next can be fetched
+            prefetch = 0
+
+        def fetch_page(page_params):
+            return list_method(*args, get_params={**get_params, **page_params},
+                               **kwargs)
+
+        pages = iterate_pages(fetch_page, page_size=page_size,
+                              start_key=start_key)
+        if prefetch:
+            pages = prefetch_pages(pages, prefetch)
+        return iterate_documents(pages)
+
     def get_about(self):
         request = KazooRequest("/about", method="get")
         return self._execute_request(request)
@@ -1589,20 +2140,105 @@ class Client(metaclass=RestClientMetaClass):
         return self._execute_request(request,
                                      account_id=acct_id, phone_number=phone_number)
 
-    def upload_media_file(self, acct_id, media_id, filename, file_obj):
-        """Uploads a media file like object as part of a media document"""
+    def upload_media_file(self, acct_id, media_id, filename, file_obj,
+                          content_type=None, progress=None,
+                          chunk_size=DEFAULT_CHUNK_SIZE):
+        """Uploads a media file like object as part of a media document
+
+        The file is streamed 'chunk_size' bytes at a time and 'progress' is
+        called with the number of bytes sent and the total after each chunk,
+        see :class:`kazoo.upload.FileBody`. The content type is guessed from
+        'filename' unless it is given.
+        """
         request = KazooRequest("/accounts/{account_id}/media/{media_id}/raw",
                                method="post")
-        return self._execute_request(request, 
-                                     account_id=acct_id, 
+        body = FileBody(file_obj, content_type=content_type,
+                        filename=filename, progress=progress,
+                        chunk_size=chunk_size)
+        return self._execute_request(request,
+                                     account_id=acct_id,
                                      media_id=media_id,
-                                     rawfiles=({filename: file_obj}))
+                                     body=body)
 
-    def upload_phone_number_file(self, acct_id, phone_number, filename, file_obj):
-        """Uploads a file like object as part of a phone numbers documents"""
-        request = KazooRequest("/accounts/{account_id}/phone_numbers/{phone_number}",
+    def download_media_file(self, acct_id, media_id, dest, resume=False,
+                            **kwargs):
+        """Streams the raw file of a media document to 'dest', a path or a
+        writable binary file, returning a
+        :class:`kazoo.download.DownloadResult` ::
+
+            >>>result = client.download_media_file(acct_id, media_id,
+            ...                                    "greeting.mp3")
+            >>>result.content_type, result.content_length
+
+        With 'resume' a partly downloaded file is completed by requesting
+        only the missing bytes, see :class:`kazoo.download.DownloadTarget`.
+        The same arguments are taken by the other download methods.
+        """
+        request = KazooRequest("/accounts/{account_id}/media/{media_id}/raw")
+        return self._execute_download(request, dest, resume=resume,
+                                      account_id=acct_id, media_id=media_id,
+                                      **kwargs)
+
+    def download_fax_payload(self, acct_id, fax_id, dest, resume=False,
+                             **kwargs):
+        """Streams the attachment of a fax in the outbox to 'dest', see
+        :meth:`download_media_file`
+        """
+        request = self._fax_resource.get_extra_view_template(
+            "get_fax_payload")
+        return self._execute_download(request, dest, resume=resume,
+                                      account_id=acct_id, FAX_ID=fax_id,
+                                      **kwargs)
+
+    def download_inbox_fax_payload(self, acct_id, fax_id, dest, resume=False,
+                                   **kwargs):
+        """Streams the attachment of a fax in the inbox to 'dest', see
+        :meth:`download_media_file`
+        """
+        request = self._fax_resource.get_extra_view_template(
+            "get_inbox_fax_payload")
+        return self._execute_download(request, dest, resume=resume,
+                                      account_id=acct_id, FAX_ID=fax_id,
+                                      **kwargs)
+
+    def download_user_photo(self, acct_id, user_id, dest, resume=False,
+                            **kwargs):
+        """Streams a user's photo to 'dest', see :meth:`download_media_file`
+        """
+        request = self._users_resource.get_extra_view_template("get_photo")
+        return self._execute_download(request, dest, resume=resume,
+                                      account_id=acct_id, user_id=user_id,
+                                      **kwargs)
+
+    def download_recording(self, acct_id, recording_id, dest, resume=False,
+                           accept="audio/mpeg", **kwargs):
+        """Streams a call recording to 'dest', asking for it in the 'accept'
+        format, see :meth:`download_media_file`
+        """
+        request = self._recording_resource.get_request_template("object")
+        headers = dict(kwargs.pop("headers", None) or {}, Accept=accept)
+        return self._execute_download(request, dest, resume=resume,
+                                      account_id=acct_id,
+                                      record_id=recording_id,
+                                      headers=headers, **kwargs)
+
+    def upload_phone_number_file(self, acct_id, phone_number, filename,
+                                 file_obj, content_type=None, progress=None,
+                                 chunk_size=DEFAULT_CHUNK_SIZE):
+        """Uploads a file like object as part of a phone numbers documents,
+        streaming it like :meth:`upload_media_file`
+        """
+        request = KazooRequest("/accounts/{account_id}/phone_numbers/"
+                               "{phone_number}/docs/{filename}",
                                method="post")
-        return self._execute_request(request, files={filename: file_obj})
+        body = FileBody(file_obj, content_type=content_type,
+                        filename=filename, progress=progress,
+                        chunk_size=chunk_size)
+        return self._execute_request(request,
+                                     account_id=acct_id,
+                                     phone_number=phone_number,
+                                     filename=filename,
+                                     body=body)
 
     def list_devices_by_owner(self, accountId, ownerId):
         request = KazooRequest("/accounts/{account_id}/devices", get_params={"filter_owner_id": ownerId})
@@ -0,0 +1,51 @@
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonCodec(object):
+    """Encodes request bodies to bytes and decodes response bodies using
+    the standard library json module
+
+    A codec is anything with ``dumps`` and ``loads`` methods like these,
+    it can be passed to :class:`kazoo.Client` as 'codec'.
+    """
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(",", ":"),
+                          ensure_ascii=False).encode("utf-8")
+
+    def loads(self, content):
+        return json.loads(content)
+
+
+class OrjsonCodec(JsonCodec):
+    """Uses orjson, which is several times faster than the standard
+    library, install it with 'pip install kazoo-api[fast]'
+    """
+
+    def __init__(self):
+        if orjson is None:
+            raise RuntimeError("OrjsonCodec requires the orjson package, "
+                               "install it with 'pip install orjson'")
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+    def loads(self, content):
+        return orjson.loads(content)
+
+
+def get_default_codec():
+    """Return an :class:`OrjsonCodec` if orjson is installed, otherwise a
+    :class:`JsonCodec`
+    """
+    if orjson is not None:
+        return OrjsonCodec()
+    return JsonCodec()
+
+
+default_codec = get_default_codec()
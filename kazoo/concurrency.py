@@ -0,0 +1,176 @@
+import asyncio
+import math
+import threading
+import time
+from kazoo.exceptions import KazooApiHttpError
+from kazoo.retry import get_connection_errors
+
+
+def is_overload_error(error):
+    """Whether ``error`` shows the api is overloaded, that is the request
+    was throttled, the api was unavailable or the connection failed
+    """
+    return isinstance(error, (KazooApiHttpError,) + get_connection_errors())
+
+
+def _percentile(samples, percentile):
+    ordered = sorted(samples)
+    index = int(math.ceil(percentile * len(ordered))) - 1
+    return ordered[max(0, index)]
+
+
+class AdaptiveLimit(object):
+    """An AIMD limit on the number of requests in flight at once
+
+    Once as many requests as the current limit have completed without
+    their 95th percentile latency rising above ``latency_tolerance`` times
+    the lowest recently seen, the limit is increased by one. When a request
+    is throttled or fails because the api is overloaded, or latency rises
+    past that tolerance, the limit is multiplied by ``backoff_ratio``.
+    Failures of requests which started before the last decrease are not
+    counted again, so a single burst of errors only backs off once.
+    """
+
+    def __init__(self, initial_limit=4, min_limit=1, max_limit=64,
+                 backoff_ratio=0.5, latency_tolerance=2.0, min_samples=10):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff_ratio = backoff_ratio
+        self.latency_tolerance = latency_tolerance
+        self.min_samples = min_samples
+        self.in_flight = 0
+        self._baseline = None
+        self._samples = []
+        self._generation = 0
+        self._condition = threading.Condition()
+        self._async_waiters = []
+
+    def _try_acquire(self):
+        if self.in_flight < int(self.limit):
+            self.in_flight += 1
+            return True
+        return False
+
+    def acquire(self):
+        """Block until a request may be sent, returning a token to pass to
+        :meth:`release`
+        """
+        with self._condition:
+            while not self._try_acquire():
+                self._condition.wait()
+            return self._generation
+
+    async def acquire_async(self):
+        """Asyncio version of :meth:`acquire`"""
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self._try_acquire():
+                    return self._generation
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, token, latency, overloaded=False):
+        """Record the outcome of a request started with ``token``, a
+        'latency' of None frees its slot without recording anything
+        """
+        with self._condition:
+            self.in_flight -= 1
+            if overloaded:
+                if token == self._generation:
+                    self._decrease()
+            elif latency is not None and token == self._generation:
+                self._samples.append(latency)
+                if len(self._samples) >= max(int(self.limit),
+                                             self.min_samples):
+                    self._adjust(_percentile(self._samples, 0.95))
+            self._notify()
+
+    def _adjust(self, p95):
+        self._samples = []
+        if (self._baseline is not None and
+                p95 > self._baseline * self.latency_tolerance):
+            self._decrease()
+            return
+        if self._baseline is None:
+            self._baseline = p95
+        else:
+            # Follow falling latency straight away, rising latency slowly
+            self._baseline = min(p95, self._baseline * 0.9 + p95 * 0.1)
+        self.limit = min(self.max_limit, self.limit + 1)
+
+    def _decrease(self):
+        self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+        self._samples = []
+        self._generation += 1
+
+    def _notify(self):
+        self._condition.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, waiter in waiters:
+            loop.call_soon_threadsafe(_wake, waiter)
+
+
+def _wake(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class ConcurrencyController(object):
+    """Keeps a separate :class:`AdaptiveLimit` for each endpoint, keyed by
+    request route, so that a slow endpoint like /cdrs does not hold back
+    requests to /devices
+    """
+
+    def __init__(self, **limit_kwargs):
+        self.limit_kwargs = limit_kwargs
+        self._limits = {}
+        self._lock = threading.Lock()
+
+    def get_limit(self, key):
+        with self._lock:
+            limit = self._limits.get(key)
+            if limit is None:
+                limit = AdaptiveLimit(**self.limit_kwargs)
+                self._limits[key] = limit
+            return limit
+
+    def call(self, key, func):
+        """Call ``func`` once the limit for ``key`` allows it"""
+        limit = self.get_limit(key)
+        token = limit.acquire()
+        start = time.monotonic()
+        latency = None
+        overloaded = False
+        try:
+            result = func()
+            latency = time.monotonic() - start
+            return result
+        except Exception as e:
+            latency = time.monotonic() - start
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            # A cancelled or interrupted call still frees its slot
+            limit.release(token, latency, overloaded=overloaded)
+
+    async def call_async(self, key, func):
+        """Asyncio version of :meth:`call`"""
+        limit = self.get_limit(key)
+        token = await limit.acquire_async()
+        start = time.monotonic()
+        latency = None
+        overloaded = False
+        try:
+            result = await func()
+            latency = time.monotonic() - start
+            return result
+        except Exception as e:
+            latency = time.monotonic() - start
+            overloaded = is_overload_error(e)
+            raise
+        finally:
+            # A cancelled or interrupted call still frees its slot
+            limit.release(token, latency, overloaded=overloaded)
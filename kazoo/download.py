@@ -0,0 +1,169 @@
+import os
+import re
+from kazoo.exceptions import KazooApiError
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+_content_range_regex = re.compile(r"bytes\s+(?:(\d+)-\d+|\*)/(\d+|\*)")
+
+
+def parse_content_range(value):
+    """Return the first byte and the total length given a Content-Range
+    header, either of which is None when it is not given
+    """
+    match = _content_range_regex.match(value or "")
+    if match is None:
+        return None, None
+    start, total = match.groups()
+    return (int(start) if start is not None else None,
+            int(total) if total != "*" else None)
+
+
+def _get_content_length(headers):
+    try:
+        return int(headers["Content-Length"])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+class DownloadResult(object):
+    """Describes a downloaded payload
+
+    ``content_length`` is the size of the whole payload when the server
+    gave it, ``bytes_written`` the number of bytes written by this download
+    and ``resumed_from`` the number of bytes which were already there.
+    """
+
+    def __init__(self, content_type, content_length, bytes_written=0,
+                 resumed_from=0):
+        self.content_type = content_type
+        self.content_length = content_length
+        self.bytes_written = bytes_written
+        self.resumed_from = resumed_from
+
+    def __repr__(self):
+        return "<DownloadResult {0} {1}/{2} bytes>".format(
+            self.content_type, self.resumed_from + self.bytes_written,
+            self.content_length)
+
+
+class DownloadTarget(object):
+    """The path or writable binary file a payload is streamed to
+
+    With 'resume' the bytes already in the destination, the size of the
+    file at the path or the position of the file object, are kept and only
+    the rest of the payload is requested using an HTTP Range header. If the
+    server ignores the range the destination is rewritten from the start.
+
+    Without 'resume' a file object is written from its current position,
+    which it is rewound to if the download has to be restarted, so
+    restarting a download which failed part way through needs a seekable
+    file.
+    """
+
+    def __init__(self, dest, resume=False):
+        self.dest = dest
+        self.resume = resume
+        self._is_path = isinstance(dest, (str, bytes, os.PathLike))
+        self._start = None
+        seekable = getattr(dest, "seekable", None)
+        if not self._is_path and not resume and seekable and seekable():
+            self._start = dest.tell()
+        self._started = False
+        self.file = None
+        self.offset = 0
+        self.result = None
+
+    def prepare(self):
+        """Return the number of bytes the destination already holds which do
+        not need to be downloaded, without changing it
+        """
+        self.offset = 0
+        if self.resume:
+            if not self._is_path:
+                self.offset = self.dest.tell()
+            elif os.path.exists(self.dest):
+                self.offset = os.path.getsize(self.dest)
+        return self.offset
+
+    def open(self):
+        """Open the destination for writing, once a response holding the
+        payload has been received, so that an error response leaves it as
+        it was
+        """
+        if self._is_path:
+            self.file = open(self.dest, "ab" if self.resume else "wb")
+        else:
+            self.file = self.dest
+            self._rewind_if_restarted()
+        self._started = True
+
+    def _rewind_if_restarted(self):
+        if self.resume or not self._started:
+            return
+        if self._start is None:
+            raise KazooApiError("The download can not be restarted because "
+                                "the file it is written to is not seekable")
+        self.file.seek(self._start)
+        self.file.truncate()
+
+    def get_headers(self, headers=None):
+        """Return the request headers, asking for the rest of the payload
+        when resuming
+        """
+        headers = dict(headers or {})
+        if self.offset:
+            headers["Range"] = "bytes={0}-".format(self.offset)
+        return headers
+
+    def accepts(self, status_code):
+        """Return whether a response with 'status_code' holds the payload,
+        or tells us it was already completely downloaded
+        """
+        return status_code in (200, 206) or (status_code == 416 and
+                                             self.offset > 0)
+
+    def start(self, status_code, headers):
+        """Prepare to write the body of an accepted response, returning the
+        :class:`DownloadResult` which is updated as it is written
+        """
+        content_type = headers.get("Content-Type")
+        if status_code == 416:
+            # Nothing is left to download past the end of the payload
+            start, total = parse_content_range(headers.get("Content-Range"))
+            self.result = DownloadResult(content_type, total,
+                                         resumed_from=self.offset)
+            return self.result
+        if status_code == 206:
+            start, total = parse_content_range(headers.get("Content-Range"))
+            if start != self.offset:
+                raise KazooApiError(
+                    "Asked to resume the download at byte {0} but the server "
+                    "sent the payload from byte {1}".format(self.offset,
+                                                            start))
+        else:
+            total = _get_content_length(headers)
+            if self.offset:
+                # The range was ignored, so the whole payload is sent
+                self._truncate()
+        self.result = DownloadResult(content_type, total,
+                                     resumed_from=self.offset)
+        return self.result
+
+    def _truncate(self):
+        if self._is_path:
+            self.file.truncate(0)
+        else:
+            self.file.seek(0)
+            self.file.truncate()
+        self.offset = 0
+
+    def write(self, chunk):
+        if chunk:
+            self.file.write(chunk)
+            self.result.bytes_written += len(chunk)
+
+    def close(self):
+        if self._is_path and self.file is not None:
+            self.file.close()
+        self.file = None
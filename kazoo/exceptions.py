@@ -17,6 +17,32 @@ class KazooApiError(RuntimeError):
 class KazooApiAuthenticationError(RuntimeError):
     pass
 
+
+class KazooApiHttpError(KazooApiError):
+    """Raised for HTTP responses which indicate a server side failure,
+    being throttled (429), an internal server error (500) or an unavailable
+    upstream (502, 503, 504)
+    """
+
+    def __init__(self, status_code, message, retry_after=None):
+        super(KazooApiHttpError, self).__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(KazooApiError):
+    """Raised without making a request when the endpoint's circuit breaker
+    is open because it has been failing
+    """
+
+    def __init__(self, route, retry_after):
+        super(CircuitOpenError, self).__init__(
+            "Requests to {0} are failing, circuit open for another {1:.0f}s"
+            .format(route, retry_after))
+        self.route = route
+        self.retry_after = retry_after
+
+
 class KazooApiBadDataError(RuntimeError):
 
     def __init__(self, field_errors):
@@ -0,0 +1,406 @@
+import codecs
+import collections
+import json
+import re
+from kazoo.records import Record, record_decoder, to_record
+
+_whitespace_regex = re.compile(r"[ \t\n\r]*")
+# What matters when looking for the end of a value, whole strings, brackets
+# and the opening quote of a string which is not complete yet
+_token_regex = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[\[\]{}"]')
+# The rest of a string, up to and including its closing quote if that is
+# there, otherwise stopping before an escape cut off by the end of the buffer
+_string_end_regex = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*(")?')
+_CONTAINERS = "[{\""
+# What may follow the part of a number read so far when more of it is to
+# come, such as "1." or "2.5e"
+_number_rest_regex = re.compile(r"[0-9.eE+-]*")
+
+# The states of a DataParser, which parses the response envelope field by
+# field and the elements of its 'data' array one at a time
+_START, _KEY, _COLON, _VALUE, _NEXT_FIELD, _ELEMENT, _NEXT_ELEMENT, _END = \
+    range(8)
+
+
+class DataParser(object):
+    """Incrementally parses a response envelope fed to it in chunks of
+    bytes, returning the elements of its 'data' array as soon as each one
+    has been read
+
+    The other fields of the envelope are collected in :attr:`envelope`.
+    Fields which come after 'data' are only there once it has been read.
+    A 'data' which is not an array is put in the envelope like any other
+    field. Only the element being read is held in memory, along with the
+    rest of the chunk it is in.
+
+    Given a :class:`kazoo.projection.Projection` the elements, or a 'data'
+    which is not an array, are projected as soon as they are decoded, so
+    the fields it drops are never held for more than one element.
+    Otherwise with 'raw_object' the elements which are objects are returned
+    as the result of calling it with their JSON text. Other values are
+    decoded with 'decoder', a :class:`json.JSONDecoder`.
+
+    An array, object or string which is not complete in the chunks read so
+    far is not decoded again with every chunk. Instead the search for its
+    end carries on from where it stopped, and it is decoded once that has
+    been found.
+    """
+
+    def __init__(self, projection=None, raw_object=None, decoder=None):
+        self.envelope = {}
+        self.projection = projection
+        self.raw_object = raw_object
+        self.has_data_array = False
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._scan = (decoder or json.JSONDecoder()).raw_decode
+        self._buffer = ""
+        self._pos = 0
+        self._state = _START
+        self._key = None
+        self._end_search = None
+
+    @property
+    def done(self):
+        return self._state == _END
+
+    def feed(self, chunk):
+        """Parse the next chunk of the body, returning the elements of the
+        'data' array completed by it
+        """
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(chunk)
+        self._pos = 0
+        return self._parse(final=False)
+
+    def close(self, chunk=b""):
+        """Finish parsing once the whole body has been fed, along with its
+        last 'chunk', returning the remaining elements and raising
+        ValueError if it was incomplete
+        """
+        self._buffer = self._buffer[self._pos:] + self._decoder.decode(
+            chunk, final=True)
+        self._pos = 0
+        elements = self._parse(final=True)
+        if self._state != _END:
+            raise ValueError("The response body ended unexpectedly")
+        return elements
+
+    def _parse(self, final):
+        elements = []
+        while self._state != _END:
+            pos = _whitespace_regex.match(self._buffer, self._pos).end()
+            if pos == len(self._buffer):
+                break
+            char = self._buffer[pos]
+            state = self._state
+            if state == _START:
+                self._expect(char, "{", pos)
+                self._state = _KEY
+            elif state == _KEY or state == _NEXT_FIELD:
+                if char == "}":
+                    self._state = _END
+                elif state == _NEXT_FIELD:
+                    self._expect(char, ",", pos)
+                    self._state = _KEY
+                else:
+                    value = self._value(pos, final)
+                    if value is None:
+                        break
+                    self._key = value[0]
+                    self._state = _COLON
+                    continue
+            elif state == _COLON:
+                self._expect(char, ":", pos)
+                self._state = _VALUE
+            elif state == _VALUE:
+                if self._key == "data" and char == "[":
+                    self.has_data_array = True
+                    self._state = _ELEMENT
+                else:
+                    value = self._value(pos, final)
+                    if value is None:
+                        break
+                    if self._key == "data" and self.projection is not None:
+                        value = (self.projection.apply(value[0]),)
+                    self.envelope[self._key] = value[0]
+                    self._state = _NEXT_FIELD
+                    continue
+            elif state == _ELEMENT or state == _NEXT_ELEMENT:
+                if char == "]":
+                    self._state = _NEXT_FIELD
+                elif state == _NEXT_ELEMENT:
+                    self._expect(char, ",", pos)
+                    self._state = _ELEMENT
+                else:
+                    value = self._value(pos, final)
+                    if value is None:
+                        break
+                    if self.projection is not None:
+                        elements.append(self.projection.apply(value[0]))
+                    elif self.raw_object is not None and char == "{":
+                        elements.append(self.raw_object(
+                            self._buffer[pos:self._pos]))
+                    else:
+                        elements.append(value[0])
+                    self._state = _NEXT_ELEMENT
+                    continue
+            self._pos = pos + 1
+        return elements
+
+    def _value(self, pos, final):
+        """Decode the value starting at 'pos', returning it in a tuple or
+        None if more of the body is needed
+        """
+        if self._end_search is not None:
+            # A value which continued past earlier chunks is only decoded
+            # again once its end has been found
+            if self._find_end(pos) is None:
+                if final:
+                    raise ValueError("The response body ended unexpectedly")
+                return None
+        try:
+            value, end = self._scan(self._buffer, pos)
+        except ValueError:
+            if final:
+                raise
+            if (self._buffer[pos] in _CONTAINERS and
+                    self._find_end(pos) is not None):
+                # The value is complete, so it is not valid JSON
+                raise
+            return None
+        # A number near the end of the buffer may continue in the next chunk
+        if (not final and self._buffer[pos] not in _CONTAINERS and
+                _number_rest_regex.match(self._buffer, end).end() ==
+                len(self._buffer)):
+            return None
+        self._pos = end
+        return (value,)
+
+    def _find_end(self, pos):
+        """Return the index just past the array, object or string starting
+        at 'pos', or None if it continues past the buffer, in which case
+        the search carries on from where it stopped next time
+        """
+        buffer = self._buffer
+        if self._end_search is None:
+            i, depth, in_string = pos, 0, False
+        else:
+            # Positions are kept relative to the value, which moves to the
+            # start of the buffer when the next chunk is added
+            i, depth, in_string = self._end_search
+            i += pos
+        length = len(buffer)
+        while i < length:
+            if in_string:
+                match = _string_end_regex.match(buffer, i)
+                i = match.end()
+                if match.group(1) is None:
+                    break
+                in_string = False
+                if depth == 0:
+                    self._end_search = None
+                    return i
+            else:
+                match = _token_regex.search(buffer, i)
+                if match is None:
+                    i = length
+                    break
+                token = match.group()
+                i = match.end()
+                if token == "\"":
+                    # A string which continues past the buffer
+                    in_string = True
+                elif token == "[" or token == "{":
+                    depth += 1
+                elif token == "]" or token == "}":
+                    depth -= 1
+                    if depth == 0:
+                        self._end_search = None
+                        return i
+                elif depth == 0:
+                    self._end_search = None
+                    return i
+        self._end_search = (i - pos, depth, in_string)
+        return None
+
+    def _expect(self, char, expected, pos):
+        if char != expected:
+            raise ValueError("Expected {0!r} at {1!r} in the response "
+                             "body".format(expected,
+                                           self._buffer[pos:pos + 20]))
+
+
+def parse_projected(content, projection):
+    """Decode a whole response body, projecting its documents one at a
+    time as they are decoded rather than once the whole body is
+    """
+    return _parse(DataParser(projection), content)
+
+
+def parse_records(content, projection=None):
+    """Decode a whole response body into a :class:`kazoo.records.Record`
+    whose documents are records which keep their JSON text until they are
+    used, or are projected by 'projection'
+    """
+    if projection is None:
+        parser = DataParser(raw_object=Record.from_json,
+                            decoder=record_decoder)
+    else:
+        # Projections are applied to dicts, which are then converted
+        parser = DataParser(projection)
+    return to_record(_parse(parser, content))
+
+
+def _parse(parser, content):
+    # The body is already in memory, so it is parsed in one pass
+    documents = parser.close(content)
+    response = parser.envelope
+    if parser.has_data_array:
+        response["data"] = documents
+    return response
+
+
+class StreamedResponse(object):
+    """A list response whose documents are parsed as the body is read
+
+    Iterating it yields the documents in the response's 'data' one at a
+    time, while the rest of the body is still arriving. Envelope fields are
+    read with :meth:`get`, or as items, such as
+    ``response["next_start_key"]``. Fields which come after 'data', which
+    next_start_key does, are only known once the documents have been read,
+    so asking for them earlier reads the rest of the body and keeps the
+    remaining documents in memory. ::
+
+        >>>with client.get_cdrs(acct_id, stream=True) as response:
+        ...    for cdr in response:
+        ...        process(cdr)
+        ...    next_start_key = response.get("next_start_key")
+
+    The connection is released once the body has been read, or when the
+    response is closed. With 'records' the documents are
+    :class:`kazoo.records.Record` objects instead of dicts.
+    """
+
+    def __init__(self, chunks, close=None, projection=None, records=False):
+        self._chunks = iter(chunks)
+        self._close = close
+        self._records = records
+        self._parser = DataParser(
+            projection, raw_object=Record.from_json if records else None)
+        self._pending = collections.deque()
+        self._finished = False
+
+    @property
+    def envelope(self):
+        """The envelope fields read so far"""
+        return self._parser.envelope
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        while not self._pending:
+            if not self._read():
+                raise StopIteration
+        return self._pending.popleft()
+
+    def _read(self):
+        if self._finished:
+            return False
+        chunk = next(self._chunks, None)
+        try:
+            if chunk is None:
+                self._add(self._parser.close())
+                self.close()
+            else:
+                self._add(self._parser.feed(chunk))
+        except ValueError:
+            self.close()
+            raise
+        return True
+
+    def _add(self, documents):
+        if self._records:
+            documents = [to_record(document) for document in documents]
+        self._pending.extend(documents)
+
+    def get(self, key, default=None):
+        while key not in self.envelope and self._read():
+            pass
+        return self.envelope.get(key, default)
+
+    def __getitem__(self, key):
+        if key == "data":
+            return self
+        value = self.get(key, self)
+        if value is self:
+            raise KeyError(key)
+        return value
+
+    def close(self):
+        self._finished = True
+        if self._close is not None:
+            self._close()
+            self._close = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class AsyncStreamedResponse(StreamedResponse):
+    """An asyncio version of :class:`StreamedResponse` whose documents are
+    iterated with ``async for``
+
+    As the body can not be read without awaiting, :meth:`get` raises
+    RuntimeError for a field which has not been read yet while documents
+    are still to be read.
+    """
+
+    def __init__(self, chunks, close=None, projection=None, records=False):
+        super(AsyncStreamedResponse, self).__init__((), close, projection,
+                                                    records)
+        self._chunks = chunks.__aiter__()
+
+    def __iter__(self):
+        raise TypeError("Use 'async for' to iterate an AsyncStreamedResponse")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while not self._pending:
+            if not await self._read_async():
+                raise StopAsyncIteration
+        return self._pending.popleft()
+
+    async def _read_async(self):
+        if self._finished:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            chunk = None
+        try:
+            if chunk is None:
+                self._add(self._parser.close())
+                self.close()
+            else:
+                self._add(self._parser.feed(chunk))
+        except ValueError:
+            self.close()
+            raise
+        return True
+
+    def get(self, key, default=None):
+        if key not in self.envelope and not self._finished:
+            raise RuntimeError("The {0!r} field has not been read yet, read "
+                               "the documents first".format(key))
+        return self.envelope.get(key, default)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,225 @@
+import asyncio
+import queue
+import threading
+from kazoo.batch import map_calls, map_calls_async
+from kazoo.jsonstream import StreamedResponse, AsyncStreamedResponse
+
+
+def _page_params(page_size, start_key):
+    get_params = {}
+    if page_size:
+        get_params["page_size"] = page_size
+    if start_key is not None:
+        get_params["start_key"] = start_key
+    return get_params
+
+
+def iterate_pages(fetch_page, page_size=None, start_key=None):
+    """Yield response envelopes by calling ``fetch_page`` with the get
+    parameters for each page in turn
+
+    Kazoo includes a 'next_start_key' in a page when there are more results,
+    which is sent back as the 'start_key' get parameter to fetch the
+    following page.
+    """
+    while True:
+        response = fetch_page(_page_params(page_size, start_key))
+        if not response:
+            return
+        yield response
+        start_key = response.get("next_start_key")
+        if start_key is None:
+            return
+
+
+async def iterate_pages_async(fetch_page, page_size=None, start_key=None):
+    """Asyncio version of :func:`iterate_pages`, ``fetch_page`` must
+    return an awaitable
+    """
+    while True:
+        response = await fetch_page(_page_params(page_size, start_key))
+        if not response:
+            return
+        yield response
+        start_key = response.get("next_start_key")
+        if start_key is None:
+            return
+
+
+class _PrefetchError(object):
+
+    def __init__(self, error):
+        self.error = error
+
+
+_DONE = object()
+
+
+def prefetch_pages(pages, depth):
+    """Iterate ``pages`` on a background thread, keeping up to ``depth``
+    pages fetched ahead of the consumer so that the next page is already
+    downloading while the current one is processed
+
+    An exception raised while fetching is re-raised to the consumer when it
+    reaches that page. Closing the returned iterator stops the background
+    fetching.
+    """
+    buffered = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                buffered.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def fetch():
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+        except Exception as e:
+            put(_PrefetchError(e))
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=fetch, name="kazoo-prefetch")
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item = buffered.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _PrefetchError):
+                raise item.error
+            yield item
+    finally:
+        stopped.set()
+
+
+async def prefetch_pages_async(pages, depth):
+    """Asyncio version of :func:`prefetch_pages`, fetching ``pages`` in a
+    separate task
+    """
+    buffered = asyncio.Queue(maxsize=depth)
+
+    async def fetch():
+        try:
+            async for page in pages:
+                await buffered.put(page)
+        except Exception as e:
+            await buffered.put(_PrefetchError(e))
+            return
+        await buffered.put(_DONE)
+
+    task = asyncio.ensure_future(fetch())
+    try:
+        while True:
+            item = await buffered.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _PrefetchError):
+                raise item.error
+            yield item
+    finally:
+        task.cancel()
+
+
+def _page_documents(page):
+    if isinstance(page, StreamedResponse):
+        return page
+    data = page.get("data")
+    if isinstance(data, list):
+        return data
+    if data is None:
+        return []
+    return [data]
+
+
+def iterate_documents(pages):
+    """Yield the documents in the 'data' of each page in turn"""
+    for page in pages:
+        for document in _page_documents(page):
+            yield document
+
+
+async def iterate_documents_async(pages):
+    async for page in pages:
+        if isinstance(page, AsyncStreamedResponse):
+            async for document in page:
+                yield document
+            continue
+        for document in _page_documents(page):
+            yield document
+
+
+def split_time_range(created_from, created_to, window):
+    """Split the inclusive range of timestamps from ``created_from`` to
+    ``created_to`` into consecutive, non-overlapping inclusive ranges of at
+    most ``window`` seconds
+    """
+    windows = []
+    start = created_from
+    while start <= created_to:
+        end = min(start + window - 1, created_to)
+        windows.append((start, end))
+        start = end + 1
+    return windows
+
+
+def _sorted_window(documents, sort_key):
+    documents = list(documents)
+    if sort_key:
+        documents.sort(key=lambda document: document.get(sort_key, 0))
+    return documents
+
+
+def _window_documents(results):
+    for result in results:
+        if not result.ok:
+            raise result.error
+        for document in result.result:
+            yield document
+
+
+def iterate_time_windows(fetch_documents, created_from, created_to, window,
+                         max_workers, sort_key=None):
+    """Yield the documents created between ``created_from`` and
+    ``created_to`` in time order, fetching windows of that range
+    concurrently
+
+    ``fetch_documents`` is called with the bounds of each window on a pool
+    of ``max_workers`` threads and should return all the documents in it.
+    Each window is sorted by ``sort_key`` and the windows are yielded in
+    order, so at most a couple of windows per worker are held in memory.
+    """
+    def fetch_window(window_from, window_to):
+        return _sorted_window(fetch_documents(window_from, window_to),
+                              sort_key)
+
+    windows = split_time_range(created_from, created_to, window)
+    return _window_documents(map_calls(fetch_window, windows, max_workers))
+
+
+async def iterate_time_windows_async(fetch_documents, created_from,
+                                     created_to, window, max_concurrency,
+                                     sort_key=None):
+    """Asyncio version of :func:`iterate_time_windows`, ``fetch_documents``
+    must return an async iterable
+    """
+    async def fetch_window(window_from, window_to):
+        documents = [document async for document in
+                     fetch_documents(window_from, window_to)]
+        return _sorted_window(documents, sort_key)
+
+    windows = split_time_range(created_from, created_to, window)
+    async for result in map_calls_async(fetch_window, windows,
+                                        max_concurrency):
+        if not result.ok:
+            raise result.error
+        for document in result.result:
+            yield document
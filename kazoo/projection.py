@@ -0,0 +1,49 @@
+class Projection(object):
+    """Picks the given fields out of documents, dropping the rest
+
+    'fields' are field names or dotted paths to nested fields, such as
+    ``["id", "name", "caller_id.external.number"]``. A path through a list
+    applies to each of its items. Fields missing from a document are left
+    out of the projected document.
+    """
+
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self._tree = {}
+        for field in self.fields:
+            node = self._tree
+            names = field.split(".")
+            for name in names[:-1]:
+                child = node.get(name, {})
+                if child is None:
+                    # The whole of this field is already kept
+                    break
+                node = node.setdefault(name, child)
+            else:
+                node[names[-1]] = None
+
+    def apply(self, document):
+        """Return the projection of 'document'"""
+        return _project(document, self._tree)
+
+    def __repr__(self):
+        return "<Projection {0}>".format(", ".join(self.fields))
+
+
+def get_projection(fields):
+    """Return a :class:`Projection` given one or a list of fields"""
+    if fields is None or isinstance(fields, Projection):
+        return fields
+    if isinstance(fields, str):
+        fields = [fields]
+    return Projection(fields)
+
+
+def _project(value, tree):
+    if isinstance(value, dict):
+        return {name: value[name] if subtree is None
+                else _project(value[name], subtree)
+                for name, subtree in tree.items() if name in value}
+    if isinstance(value, list):
+        return [_project(item, tree) for item in value]
+    return value
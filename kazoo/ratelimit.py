@@ -0,0 +1,116 @@
+import re
+import threading
+import time
+
+_account_regex = re.compile("/accounts/([^/?]+)")
+
+
+class TokenBucket(object):
+    """A thread safe token bucket refilled at ``rate`` tokens per second and
+    holding at most ``capacity`` tokens
+    """
+
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be greater than zero")
+        self.rate = float(rate)
+        if capacity is None:
+            capacity = max(1.0, self.rate)
+        self.capacity = float(capacity)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens=1):
+        """Take ``tokens`` from the bucket and return how many seconds the
+        caller has to wait before it may use them
+
+        The bucket may go into debt, so callers queue up in the order they
+        made their reservations.
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity,
+                               self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self, tokens=1):
+        """Block until ``tokens`` are available"""
+        delay = self.reserve(tokens)
+        if delay:
+            time.sleep(delay)
+
+
+class RateLimiter(object):
+    """Limits requests to ``rate`` per second, allowing bursts of up to
+    ``burst`` requests
+
+    The limit applies to all requests together with a 'global' scope, to
+    the requests for each account with an 'account' scope, or to the
+    requests for each api endpoint with a 'resource' scope.
+    """
+    scopes = ["global", "account", "resource"]
+
+    def __init__(self, rate, burst=None, scope="global"):
+        if scope not in self.scopes:
+            raise ValueError("Unknown rate limit scope {0}".format(scope))
+        self.rate = rate
+        self.burst = burst
+        self.scope = scope
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_rate_limits(cls, rate_limits, scope="account",
+                         limit_name="total_packets", burst=None):
+        """Create a limiter from the data of an account's rate_limits
+        document, using the 'per_second' value of 'limit_name' for the
+        account, or its 'per_minute' value spread over a minute
+        """
+        account_limits = rate_limits.get("account", {})
+        per_second = account_limits.get("per_second", {}).get(limit_name)
+        if per_second:
+            return cls(per_second, burst=burst, scope=scope)
+        per_minute = account_limits.get("per_minute", {}).get(limit_name)
+        if per_minute:
+            return cls(per_minute / 60.0, burst=burst, scope=scope)
+        raise ValueError("The rate_limits document has no account limit "
+                         "for {0}".format(limit_name))
+
+    def get_key(self, request, params):
+        if self.scope == "resource":
+            return request.route
+        if self.scope == "account":
+            match = _account_regex.search(request.path)
+            if match is None:
+                return None
+            account_id = match.group(1)
+            if account_id.startswith("{"):
+                return params.get(account_id[1:-1])
+            return account_id
+        return None
+
+    def _get_bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst)
+                self._buckets[key] = bucket
+            return bucket
+
+    def reserve(self, request, params):
+        """Reserve a request slot, returning how many seconds to wait
+        before sending ``request``
+        """
+        return self._get_bucket(self.get_key(request, params)).reserve()
+
+    def acquire(self, request, params):
+        """Block until ``request`` may be sent"""
+        delay = self.reserve(request, params)
+        if delay:
+            time.sleep(delay)
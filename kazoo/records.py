@@ -0,0 +1,157 @@
+import json
+import sys
+
+# The fields of every record with the same keys, in the same order, are
+# shared. Once there are too many sets of fields the cache is emptied,
+# records keep the fields they already have.
+_field_sets = {}
+_MAX_FIELD_SETS = 10000
+
+
+class _Fields(object):
+    __slots__ = ("names", "index")
+
+    def __init__(self, names):
+        self.names = names
+        self.index = {name: i for i, name in enumerate(names)}
+
+
+def _get_fields(names):
+    fields = _field_sets.get(names)
+    if fields is None:
+        if len(_field_sets) >= _MAX_FIELD_SETS:
+            _field_sets.clear()
+        fields = _Fields(tuple([sys.intern(name) for name in names]))
+        _field_sets[fields.names] = fields
+    return fields
+
+
+def _record_from_pairs(pairs):
+    if not pairs:
+        return Record(_get_fields(()), ())
+    names, values = zip(*pairs)
+    return Record(_get_fields(names), values)
+
+
+# Builds records directly while decoding, rather than converting the dicts
+record_decoder = json.JSONDecoder(object_pairs_hook=_record_from_pairs)
+
+
+def to_record(value):
+    """Convert the dicts in a decoded JSON value into records"""
+    if isinstance(value, dict):
+        return Record._from_dict(value)
+    if isinstance(value, list):
+        return [to_record(item) for item in value]
+    return value
+
+
+def _to_plain(value):
+    if isinstance(value, Record):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+class Record(object):
+    """A read only JSON object whose fields are read as attributes or
+    items, ``device.name`` or ``device["name"]``
+
+    A record is much smaller than a dict. Its values are kept in a tuple
+    and the names of its fields are shared with every other record with the
+    same fields, so they are stored once however many records there are.
+    A record created from JSON text, see :meth:`from_json`, keeps just the
+    text until one of its fields is first read. Nested objects are records
+    too, :meth:`to_dict` converts a record back to plain dicts. Fields
+    named like a method of the record, such as 'items', are read as items.
+    """
+
+    __slots__ = ("_raw", "_fields", "_values")
+
+    def __init__(self, fields=None, values=(), raw=None):
+        self._fields = fields
+        self._values = values
+        self._raw = raw
+
+    @classmethod
+    def from_json(cls, text):
+        """Return a record of the JSON object 'text', decoded when first
+        used
+        """
+        return cls(raw=text)
+
+    @classmethod
+    def _from_dict(cls, document):
+        return cls(_get_fields(tuple(document)),
+                   tuple([to_record(value) for value in document.values()]))
+
+    def _load(self):
+        record = record_decoder.decode(self._raw)
+        self._fields = record._fields
+        self._values = record._values
+        self._raw = None
+
+    def __getattr__(self, name):
+        # Only called for names which are not methods or set slots
+        if name.startswith("__") or name in Record.__slots__:
+            raise AttributeError(name)
+        if self._raw is not None:
+            self._load()
+        index = self._fields.index.get(name)
+        if index is None:
+            raise AttributeError(name)
+        return self._values[index]
+
+    def __getitem__(self, key):
+        if self._raw is not None:
+            self._load()
+        return self._values[self._fields.index[key]]
+
+    def get(self, key, default=None):
+        if self._raw is not None:
+            self._load()
+        index = self._fields.index.get(key)
+        if index is None:
+            return default
+        return self._values[index]
+
+    def __contains__(self, key):
+        if self._raw is not None:
+            self._load()
+        return key in self._fields.index
+
+    def keys(self):
+        if self._raw is not None:
+            self._load()
+        return self._fields.names
+
+    def values(self):
+        if self._raw is not None:
+            self._load()
+        return self._values
+
+    def items(self):
+        return zip(self.keys(), self.values())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def to_dict(self):
+        """Return the record as a dict, converting nested records too"""
+        return {name: _to_plain(value) for name, value in self.items()}
+
+    def __eq__(self, other):
+        if isinstance(other, Record):
+            other = other.to_dict()
+        if not isinstance(other, dict):
+            return NotImplemented
+        return self.to_dict() == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "Record({0!r})".format(self.to_dict())
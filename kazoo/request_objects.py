@@ -1,67 +1,323 @@
 import base64
-import json
 from kazoo import exceptions
+from kazoo.codec import default_codec
+from kazoo.download import DownloadTarget, DEFAULT_CHUNK_SIZE
+from kazoo.jsonstream import StreamedResponse, AsyncStreamedResponse, \
+    parse_projected, parse_records
+from kazoo.projection import get_projection
+from kazoo.upload import MultipartBody
 import hashlib
 import logging
+import operator
 import re
 import requests
 import urllib
-from requests.adapters import HTTPAdapter
-from urllib3.poolmanager import PoolManager
-import ssl
 
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
-class HttpsAdapterHack(HTTPAdapter):
-    def init_poolmanager(self, connections, maxsize, block=False):
-        self.poolmanager = PoolManager(num_pools=connections,
-                                       maxsize=maxsize,
-                                       block=block,
-                                       ssl_version=ssl.PROTOCOL_TLSv1)
+# Returned by KazooRequest.execute when a conditional request gets a 304
+NOT_MODIFIED = object()
+
+# Matches the {argument} placeholders in a request path
+param_regex = re.compile("{([a-zA-Z0-9_]+)}")
+
+
+def _compile_path(path):
+    """Split a request path into a %-format template, which takes the base
+    url then the path arguments, and a function picking those arguments out
+    of a dict, so that a url is built with a single string operation
+    """
+    param_names = param_regex.findall(path)
+    template = "%s" + param_regex.sub("%s", path.replace("%", "%%"))
+    if not param_names:
+        return template, lambda params: ()
+    if len(param_names) == 1:
+        name = param_names[0]
+        return template, lambda params: (params[name],)
+    return template, operator.itemgetter(*param_names)
+
 
 class KazooRequest(object):
     http_methods = ["get", "post", "put", "delete", "patch"]
+    temporary_error_statuses = [429, 502, 503, 504]
 
-    def __init__(self, path, auth_required=True, method='get', get_params={}):
+    def __init__(self, path, auth_required=True, method='get', get_params={},
+                 route=None):
         """An object which takes a path and determines required
         parameters from it, these parameters must be passed to the execute
         method of the object
+
+        'route' is the unformatted path template the request was built from,
+        used to group requests to the same endpoint, it defaults to 'path'.
+
+        Executing a request does not change it, so one request can be reused
+        for many calls and shared between threads.
         """
         self.path = path
+        self.route = route or path
         self._required_param_names = self._get_params_from_path(self.path)
+        self._url_template, self._get_path_args = _compile_path(self.path)
         self.auth_required = auth_required
         self.method = method
-        self.get_params = get_params
+        self.get_params = dict(get_params)
 
     def _get_params_from_path(self, path):
-        param_regex = re.compile("{([a-zA-Z0-9_]+)}")
         param_names = param_regex.findall(path)
         return param_names
 
-    def _get_headers(self, token=None):
+    def _get_headers(self, token=None, extra_headers=None):
         headers = {"Content-Type": "application/json"}
         if self.auth_required:
             headers["X-Auth-Token"] = token
+        if extra_headers:
+            headers.update(extra_headers)
         return headers
 
     def _get_url(self, params, base_url):
-        url = base_url + self._get_url_with_variables_replaced(params)
-        if self.get_params:
-            return url + "?" + urllib.parse.urlencode(self.get_params)
+        url = self._url_template % ((base_url,) + self._get_path_args(params))
+        get_params = params.get('get_params')
+        if get_params:
+            get_params = {**self.get_params, **get_params}
+        else:
+            get_params = self.get_params
+        if get_params:
+            return url + "?" + urllib.parse.urlencode(get_params)
         return url
 
-    def _get_url_with_variables_replaced(self, params):
-        return self.path.format(**params)
+    def format_path(self, params):
+        """Return the path with its arguments replaced by those in the
+        dict 'params'
+        """
+        return self._url_template % (("",) + self._get_path_args(params))
+
+    def resolve_url(self, base_url, params):
+        """Return the full url this request would be sent to given the
+        keyword arguments for :meth:`execute`, or None if required
+        parameters are missing
+        """
+        for param_name in self._required_param_names:
+            if param_name not in params:
+                return None
+        return self._get_url(params, base_url)
+
+    def execute(self, base_url, method=None, data=None, token=None, files=None,
+                session=None, headers=None, codec=None, body=None,
+                stream=False, fields=None, lazy=False, **kwargs):
+        """Send the request and return the decoded response
+
+        If a :class:`requests.Session` is passed as ``session`` it is used to
+        send the request so that its pooled keep-alive connections are
+        reused, otherwise a one-off connection is made. ``headers`` are
+        added to the request, if they make it conditional and the server
+        responds 304 Not Modified then :data:`NOT_MODIFIED` is returned.
+        ``codec`` encodes the data and decodes the response, see
+        :mod:`kazoo.codec`.
+
+        ``body`` is a :class:`kazoo.upload.FileBody` or
+        :class:`kazoo.upload.MultipartBody` streamed as the body of the
+        request. If ``data`` is given too they are sent together as a
+        multipart body, which is how a document is created along with its
+        attachment.
 
-    def execute(self, base_url, method=None, data=None, token=None, files=None, **kwargs):
+        With ``stream`` a successful response is returned as a
+        :class:`kazoo.jsonstream.StreamedResponse` which parses the body as
+        it is read, yielding the documents in its 'data' one at a time.
+
+        ``fields`` is a list of the fields, or dotted paths to nested
+        fields, to keep in the documents of a successful response, see
+        :class:`kazoo.projection.Projection`. Each document is projected as
+        soon as it is decoded, so the whole unprojected response is never
+        held in memory.
+
+        With ``lazy`` a successful response is returned as a
+        :class:`kazoo.records.Record`, whose documents are records which
+        are only decoded when they are first used.
+        """
         # if self.auth_required and token is None:
         #     error_message = ("This method requires an auth token, be sure to "
         #                      "call client.authenticate() before making API "
         #                      "calls")
         #     raise exceptions.AuthenticationRequiredError(error_message)
+        method, full_url = self._prepare(base_url, method, kwargs)
+        headers = self._get_headers(token=token, extra_headers=headers)
+        if session is None:
+            session = requests
+        if codec is None:
+            codec = default_codec
+        req_func = getattr(session, method)
+
+        kwargs = {}
+        if body is not None:
+            kwargs["data"] = self._get_body(body, data, headers, codec)
+        elif data:
+            kwargs["data"] = codec.dumps({"data": data})
+        if files:
+            kwargs["files"] = files
+        if stream:
+            kwargs["stream"] = True
+        raw_response = req_func(full_url, headers=headers, **kwargs)
+
+        if raw_response.status_code == 304:
+            return NOT_MODIFIED
+        if stream and 200 <= raw_response.status_code < 300:
+            return StreamedResponse(
+                raw_response.iter_content(DEFAULT_CHUNK_SIZE),
+                raw_response.close, get_projection(fields), lazy)
+        return self._decode_response(raw_response.status_code,
+                                     raw_response.headers,
+                                     raw_response.content, codec,
+                                     get_projection(fields), lazy)
+
+    async def execute_async(self, base_url, session, method=None, data=None,
+                            token=None, files=None, headers=None, codec=None,
+                            body=None, stream=False, fields=None,
+                            lazy=False, **kwargs):
+        """Send the request using an :class:`aiohttp.ClientSession` and
+        return the decoded response, see :meth:`execute`
+
+        With ``stream`` a successful response is returned as a
+        :class:`kazoo.jsonstream.AsyncStreamedResponse`.
+        """
+        method, full_url = self._prepare(base_url, method, kwargs)
+        headers = self._get_headers(token=token, extra_headers=headers)
+        if codec is None:
+            codec = default_codec
+
+        kwargs = {}
+        if body is not None:
+            kwargs["data"] = self._get_body(body, data, headers, codec)
+            # aiohttp would otherwise chunk the streamed body
+            if kwargs["data"].len is not None:
+                headers["Content-Length"] = str(kwargs["data"].len)
+        elif data:
+            kwargs["data"] = codec.dumps({"data": data})
+        if files:
+            kwargs["data"] = files
+        raw_response = await session.request(method.upper(), full_url,
+                                             headers=headers, **kwargs)
+        if stream and 200 <= raw_response.status < 300:
+            return AsyncStreamedResponse(
+                raw_response.content.iter_chunked(DEFAULT_CHUNK_SIZE),
+                raw_response.release, get_projection(fields), lazy)
+        async with raw_response:
+            if raw_response.status == 304:
+                return NOT_MODIFIED
+            content = await raw_response.read()
+        return self._decode_response(raw_response.status,
+                                     raw_response.headers, content, codec,
+                                     get_projection(fields), lazy)
+
+    def _get_body(self, body, data, headers, codec):
+        if data:
+            body = MultipartBody([
+                ("content", "application/json", codec.dumps({"data": data})),
+                ("file", None, body)])
+        headers["Content-Type"] = body.content_type
+        return body
+
+    def download(self, base_url, target, method=None, token=None,
+                 session=None, headers=None, codec=None,
+                 chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+        """Send the request and stream the binary payload of the response to
+        'target', a :class:`kazoo.download.DownloadTarget` or a path or
+        writable binary file, 'chunk_size' bytes at a time so that the
+        payload is never held in memory
+
+        Returns a :class:`kazoo.download.DownloadResult`. Error responses
+        raise the same exceptions as :meth:`execute`.
+        """
+        method, full_url = self._prepare(base_url, method, kwargs)
+        if not isinstance(target, DownloadTarget):
+            target = DownloadTarget(target)
+        if session is None:
+            session = requests
+        req_func = getattr(session, method)
+
+        target.prepare()
+        try:
+            headers = self._get_headers(
+                token=token, extra_headers=target.get_headers(headers))
+            with req_func(full_url, headers=headers,
+                          stream=True) as raw_response:
+                if not target.accepts(raw_response.status_code):
+                    self._raise_download_error(raw_response.status_code,
+                                               raw_response.headers,
+                                               raw_response.content, codec)
+                target.open()
+                result = target.start(raw_response.status_code,
+                                      raw_response.headers)
+                if raw_response.status_code != 416:
+                    for chunk in raw_response.iter_content(chunk_size):
+                        target.write(chunk)
+            return result
+        finally:
+            target.close()
+
+    async def download_async(self, base_url, session, target, method=None,
+                             token=None, headers=None, codec=None,
+                             chunk_size=DEFAULT_CHUNK_SIZE, **kwargs):
+        """Stream the payload of the response using an
+        :class:`aiohttp.ClientSession`, see :meth:`download`
+        """
+        method, full_url = self._prepare(base_url, method, kwargs)
+        if not isinstance(target, DownloadTarget):
+            target = DownloadTarget(target)
+
+        target.prepare()
+        try:
+            headers = self._get_headers(
+                token=token, extra_headers=target.get_headers(headers))
+            async with session.request(method.upper(), full_url,
+                                       headers=headers) as raw_response:
+                if not target.accepts(raw_response.status):
+                    self._raise_download_error(raw_response.status,
+                                               raw_response.headers,
+                                               await raw_response.read(),
+                                               codec)
+                target.open()
+                result = target.start(raw_response.status,
+                                      raw_response.headers)
+                if raw_response.status != 416:
+                    async for chunk in raw_response.content.iter_chunked(
+                            chunk_size):
+                        target.write(chunk)
+            return result
+        finally:
+            target.close()
+
+    def _raise_download_error(self, status_code, headers, content, codec):
+        try:
+            self._decode_response(status_code, headers, content,
+                                  codec or default_codec)
+        except ValueError:
+            pass
+        raise exceptions.KazooApiHttpError(
+            status_code,
+            "The kazoo api responded with HTTP {0} instead of the payload, "
+            "Request ID was {1}".format(status_code,
+                                        headers.get("X-Request-Id")))
+
+    def _decode_response(self, status_code, headers, content, codec,
+                         projection=None, lazy=False):
+        self._check_status(status_code, headers)
+        if status_code == 500:
+            try:
+                response = codec.loads(content)
+            except ValueError:
+                response = None
+            self._raise_500_error(headers.get("X-Request-Id"), response)
+        if lazy and 200 <= status_code < 300:
+            response = parse_records(content, projection)
+        elif projection is not None and 200 <= status_code < 300:
+            response = parse_projected(content, projection)
+        else:
+            response = codec.loads(content)
+        return self._check_response(response, content)
+
+    def _prepare(self, base_url, method, kwargs):
         if method is None:
             method = self.method
         if method.lower() not in self.http_methods:
@@ -73,31 +329,23 @@ class KazooRequest(object):
                 raise ValueError("keyword argument {0} is required".format(
                     param_name))
 
-        self.get_params = {**self.get_params, **kwargs.get('get_params', {})}
         full_url = self._get_url(kwargs, base_url)
         logger.debug("Making {0} request to url {1}".
                      format(method, full_url.encode("utf-8")))
+        return method, full_url
 
-        headers = self._get_headers(token=token)
-        req_func = getattr(requests, method)
+    def _check_status(self, status_code, headers):
+        if status_code in self.temporary_error_statuses:
+            raise exceptions.KazooApiHttpError(
+                status_code,
+                "The kazoo api responded with HTTP {0}, Request ID was "
+                "{1}".format(status_code, headers.get("X-Request-Id")),
+                retry_after=headers.get("Retry-After"))
 
-        kwargs = {}
-        if data:
-            kwargs["data"] = json.dumps({"data": data})
-        if files:
-            kwargs["files"] = files
-        raw_response = req_func(full_url, headers=headers, **kwargs)
-
-        if base_url.startswith('https'):
-            s = requests.Session()
-            s.mount('https://', HttpsAdapterHack())
-
-        if raw_response.status_code == 500:
-            self._handle_500_error(raw_response)
-        response = raw_response.json()
+    def _check_response(self, response, content):
         if response["status"] == "error":
             logger.debug("There was an error, full error text is: {0}".format(
-                raw_response.content))
+                content))
             self._handle_error(response)
         return response
 
@@ -115,16 +363,15 @@ class KazooRequest(object):
                                            error_data["request_id"],
                                        ))
 
-    def _handle_500_error(self, raw_response):
-        request_id = raw_response.headers["X-Request-Id"]
-        if raw_response.json():
-            message = raw_response.json()["data"]
+    def _raise_500_error(self, request_id, response):
+        if response:
+            message = response["data"]
         else:
             message = "There was no error message"
-        raise exceptions.KazooApiError("Internal Server Error, "
-                                       "Request ID was {0}"
-                                       " message was {1}".format(
-                                           request_id, message))
+        raise exceptions.KazooApiHttpError(500, "Internal Server Error, "
+                                           "Request ID was {0}"
+                                           " message was {1}".format(
+                                               request_id, message))
 
 
 class UsernamePasswordAuthRequest(KazooRequest):
@@ -136,14 +383,21 @@ class UsernamePasswordAuthRequest(KazooRequest):
         self.password = password
         self.account_name = account_name
 
-    def execute(self, base_url):
-        data = {
+    def execute(self, base_url, session=None, codec=None):
+        return super(UsernamePasswordAuthRequest, self).execute(
+            base_url, method="put", data=self._get_auth_data(),
+            session=session, codec=codec)
+
+    async def execute_async(self, base_url, session, codec=None):
+        return await super(UsernamePasswordAuthRequest, self).execute_async(
+            base_url, session, method="put", data=self._get_auth_data(),
+            codec=codec)
+
+    def _get_auth_data(self):
+        return {
             "credentials": self._get_hashed_credentials(),
             "account_name": self.account_name,
         }
-        return super(UsernamePasswordAuthRequest, self).execute(base_url,
-                                                                method="put",
-                                                                data=data)
 
     def _get_hashed_credentials(self):
         m = hashlib.md5()
@@ -158,9 +412,17 @@ class ApiKeyAuthRequest(KazooRequest):
                                                 auth_required=False)
         self.api_key = api_key
 
-    def execute(self, base_url):
-        data = {
+    def execute(self, base_url, session=None, codec=None):
+        return super(ApiKeyAuthRequest, self).execute(
+            base_url, data=self._get_auth_data(), method="put",
+            session=session, codec=codec)
+
+    async def execute_async(self, base_url, session, codec=None):
+        return await super(ApiKeyAuthRequest, self).execute_async(
+            base_url, session, data=self._get_auth_data(), method="put",
+            codec=codec)
+
+    def _get_auth_data(self):
+        return {
             "api_key": self.api_key
         }
-        return super(ApiKeyAuthRequest, self).execute(base_url, data=data,
-                                                      method="put")
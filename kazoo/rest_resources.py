@@ -1,24 +1,34 @@
-from kazoo.request_objects import KazooRequest
-import re
+from kazoo.request_objects import KazooRequest, param_regex
 
 method_types = ["detail", "list", "update", "create", "delete", "partial_update"]
 
+# The paths and http methods of the requests made by each method type
+_request_types = {
+    "list": ("path", "get"),
+    "object": ("object_path", "get"),
+    "update": ("object_path", "post"),
+    "partial_update": ("object_path", "patch"),
+    "delete": ("object_path", "delete"),
+    "create": ("path", "put"),
+}
+
 
 class RestResource(object):
 
     def __init__(self, name, path, plural_name=None, extra_views=[],
                  methods=method_types, exclude_methods=[],
                  method_names={}):
-        self._param_regex = re.compile("{([a-zA-Z0-9_]+)}")
         self.name = name
         self._plural_name = plural_name
         self._check_at_least_one_argument(path)
         self.required_args = self._get_required_arguments(path)
         self.object_arg = self._get_object_argument(path)
         self.path = self._get_resource_path(path)
+        self.object_path = "{0}/{{{1}}}".format(self.path, self.object_arg)
         self._initialize_extra_view_descriptions(extra_views)
         self._initialize_methods(methods, exclude_methods)
         self._initialize_method_names(method_names)
+        self._templates = {}
 
     def _initialize_method_names(self, given_method_names):
         self.method_names = {
@@ -51,15 +61,13 @@ class RestResource(object):
         return self._get_params(path)[-1]
 
     def _get_params(self, path):
-        param_names = self._param_regex.findall(path)
+        param_names = param_regex.findall(path)
         return param_names
 
-    def _get_full_url(self, params):
-        object_id = params[self.object_arg]
-        return self.path.format(**params) + "/{0}".format(object_id)
-
     def _initialize_extra_view_descriptions(self, view_descs):
         self.extra_views = []
+        self._extra_views_by_name = {}
+        self._extra_views_by_path = {}
         for view_desc in view_descs:
             if isinstance(view_desc, dict):
                 result = view_desc
@@ -70,50 +78,86 @@ class RestResource(object):
             if "method" not in result:
                 result["method"] = "get"
             self.extra_views.append(result)
+            self._extra_views_by_name[result["name"]] = result
+            self._extra_views_by_path.setdefault(result["path"], result)
+
+    def get_request_template(self, request_type):
+        """Return the request for one of the resource's methods, 'list',
+        'object', 'update', 'partial_update', 'delete' or 'create'
+
+        The request's path is unformatted, its arguments are passed when it
+        is executed. It is only built once and is shared by every call.
+        """
+        template = self._templates.get(request_type)
+        if template is None:
+            path_attr, method = _request_types[request_type]
+            template = KazooRequest(getattr(self, path_attr), method=method)
+            self._templates[request_type] = template
+        return template
+
+    def get_extra_view_template(self, view_name):
+        """Return the request for the extra view whose method is named
+        'view_name', see :meth:`get_request_template`
+        """
+        key = ("view", view_name)
+        template = self._templates.get(key)
+        if template is None:
+            view_desc = self._extra_views_by_name.get(view_name)
+            if view_desc is None:
+                raise ValueError("Unknown extra view name {0}".format(
+                    view_name))
+            if view_desc["scope"] == "aggregate":
+                path = self.path
+            elif view_desc["scope"] == "system":
+                path = ""
+            else:
+                path = self.object_path
+            if view_desc["path"] or not path:
+                path = path + "/" + view_desc["path"]
+            template = KazooRequest(path, method=view_desc["method"])
+            self._templates[key] = template
+        return template
+
+    def _format_request(self, template, params, get_params=None):
+        return KazooRequest(template.format_path(params),
+                            method=template.method, route=template.path,
+                            get_params=get_params or {})
 
     def get_list_request(self, **kwargs):
-        relative_path = self.path.format(**kwargs)
-        if kwargs['request_optional_args']:
-            relative_path = relative_path + '?' + self.dict_to_string(kwargs['request_optional_args'])
-        return KazooRequest(relative_path)
+        return self._format_request(self.get_request_template("list"), kwargs,
+                                    kwargs.get('request_optional_args'))
 
     def get_object_request(self, **kwargs):
-        return KazooRequest(self._get_full_url(kwargs))
+        return self._format_request(self.get_request_template("object"),
+                                    kwargs)
 
     def get_update_object_request(self, **kwargs):
-        return KazooRequest(self._get_full_url(kwargs), method='post')
+        return self._format_request(self.get_request_template("update"),
+                                    kwargs)
 
     def get_partial_update_object_request(self, **kwargs):
-        return KazooRequest(self._get_full_url(kwargs), method='patch')
+        return self._format_request(
+            self.get_request_template("partial_update"), kwargs)
 
     def get_delete_object_request(self, **kwargs):
-        return KazooRequest(self._get_full_url(kwargs), method='delete')
+        return self._format_request(self.get_request_template("delete"),
+                                    kwargs)
 
     def get_create_object_request(self, **kwargs):
-        return KazooRequest(self.path.format(**kwargs), method='put')
+        return self._format_request(self.get_request_template("create"),
+                                    kwargs)
 
     def get_extra_view_request(self, viewname, **kwargs):
-        view_desc = None
-        for desc in self.extra_views:
-            if desc["path"] == viewname:
-                view_desc = desc
+        """Return a request for an extra view, given the name of its method
+        or its path. Several views can share a path, for example to get and
+        update the same document, in which case the path picks the first.
+        """
+        view_desc = (self._extra_views_by_name.get(viewname) or
+                     self._extra_views_by_path.get(viewname))
         if view_desc is None:
             raise ValueError("Unknown extra view name {0}".format(viewname))
-        if view_desc["scope"] == "aggregate":
-            return KazooRequest(self.path.format(**kwargs) + "/" + viewname,
-                                method=view_desc["method"])
-        if view_desc["scope"] == "system":
-            return KazooRequest("/" + viewname,
-                                method=view_desc["method"])
-
-        return KazooRequest(self._get_full_url(kwargs) + "/" + viewname,
-                            method=view_desc["method"])
-
-    def dict_to_string(self, in_dict):
-        res = ''
-        for key, value in in_dict.items():
-            res = res + key + '=' + value +'&'
-        return res[:-1]
+        return self._format_request(
+            self.get_extra_view_template(view_desc["name"]), kwargs)
 
     @property
     def plural_name(self):
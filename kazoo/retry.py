@@ -0,0 +1,174 @@
+import asyncio
+import email.utils
+import logging
+import random
+import sys
+import threading
+import time
+import requests
+from kazoo.exceptions import KazooApiHttpError
+
+logger = logging.getLogger(__name__)
+
+CONNECTION_ERRORS = (requests.exceptions.ConnectionError,
+                     requests.exceptions.Timeout)
+
+
+def get_connection_errors():
+    """Return the exception types raised when a connection fails
+
+    aiohttp's are only included once something, such as the async client,
+    has imported it, so that importing kazoo does not import aiohttp.
+    """
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is None:
+        return CONNECTION_ERRORS
+    return CONNECTION_ERRORS + (aiohttp.ClientConnectionError,
+                                asyncio.TimeoutError)
+
+
+def parse_retry_after(value):
+    """Return the number of seconds to wait given a Retry-After header,
+    which is either a number of seconds or an HTTP date
+    """
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryBudget(object):
+    """Caps retries at a fraction of the requests made so that retrying
+    cannot multiply the load on an api which is already failing
+
+    Every request deposits ``ratio`` of a retry into the budget and every
+    retry withdraws a whole one. The budget starts with, and never holds
+    more than, ``min_retries`` plus whatever has been deposited up to
+    ``max_balance``.
+    """
+
+    def __init__(self, ratio=0.2, min_retries=10, max_balance=100):
+        self.ratio = ratio
+        self.max_balance = max_balance
+        self._balance = float(min_retries)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._balance = min(self.max_balance, self._balance + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self._balance < 1:
+                return False
+            self._balance -= 1
+            return True
+
+
+class RetryPolicy(object):
+    """Decides which failed requests are retried and how long to wait
+    before each retry
+
+    Requests which were throttled (429) are always safe to retry. Other
+    temporary failures, such as 502, 503 and 504 responses or a dropped
+    connection, are only retried for ``idempotent_methods``. Note that
+    kazoo uses PUT to create documents, so it is not included by default.
+
+    The wait before the nth retry is a random time up to
+    ``backoff_factor * 2 ** n`` seconds, capped at ``max_backoff``. If the
+    response carried a Retry-After header that is waited for instead,
+    unless it is longer than ``max_retry_after`` in which case the error is
+    raised. Pass ``max_retries=0`` to disable retrying.
+    """
+
+    def __init__(self, max_retries=3, backoff_factor=0.5, max_backoff=30,
+                 retry_statuses=(429, 502, 503, 504),
+                 idempotent_methods=("get", "delete"),
+                 respect_retry_after=True, max_retry_after=120,
+                 budget=None):
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = retry_statuses
+        self.idempotent_methods = idempotent_methods
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        if budget is None:
+            budget = RetryBudget()
+        self.budget = budget
+
+    def is_retryable(self, method, error):
+        if isinstance(error, KazooApiHttpError):
+            if error.status_code not in self.retry_statuses:
+                return False
+            return (error.status_code == 429 or
+                    method.lower() in self.idempotent_methods)
+        if isinstance(error, get_connection_errors()):
+            return method.lower() in self.idempotent_methods
+        return False
+
+    def get_retry_delay(self, method, error, attempt):
+        """Return how long to wait before retrying after ``error``, or None
+        if the request should not be retried
+        """
+        if attempt >= self.max_retries or not self.is_retryable(method,
+                                                                 error):
+            return None
+        delay = random.uniform(0, min(self.max_backoff,
+                                      self.backoff_factor * 2 ** attempt))
+        if self.respect_retry_after:
+            retry_after = parse_retry_after(getattr(error, "retry_after",
+                                                    None))
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                delay = max(delay, retry_after)
+        if not self.budget.withdraw():
+            logger.warning("Retry budget exhausted, not retrying: {0}".format(
+                error))
+            return None
+        return delay
+
+    def call(self, method, func):
+        """Call ``func``, retrying it according to this policy"""
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return func()
+            except Exception as e:
+                delay = self.get_retry_delay(method, e, attempt)
+                if delay is None:
+                    raise
+                self._log_retry(e, delay, attempt)
+            time.sleep(delay)
+            attempt += 1
+
+    async def call_async(self, method, func):
+        """Asyncio version of :meth:`call`, ``func`` must return an
+        awaitable
+        """
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                return await func()
+            except Exception as e:
+                delay = self.get_retry_delay(method, e, attempt)
+                if delay is None:
+                    raise
+                self._log_retry(e, delay, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _log_retry(self, error, delay, attempt):
+        logger.warning("Request failed, retrying in {0:.2f}s (retry {1} of "
+                       "{2}): {3}".format(delay, attempt + 1,
+                                          self.max_retries, error))
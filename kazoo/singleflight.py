@@ -0,0 +1,129 @@
+import asyncio
+import copy
+import functools
+import threading
+
+
+def _share(result):
+    # Each waiter gets its own copy of a decoded document so that changing
+    # it does not affect the others
+    if isinstance(result, (dict, list)):
+        return copy.deepcopy(result)
+    return result
+
+
+class _Call(object):
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.followers = 0
+        # The followers are given copies of this copy of the result, as
+        # the leader's caller may change the result itself
+        self.result = None
+        self.error = None
+
+
+class _AsyncCall(_Call):
+
+    def __init__(self):
+        super(_AsyncCall, self).__init__()
+        self.task = None
+        self.waiters = 0
+
+
+class SingleFlight(object):
+    """Collapses identical calls made at the same time into one
+
+    The first caller for a key runs the function, callers arriving with the
+    same key while it is running wait for it and are given the same result,
+    or have the same exception raised. Once the call finishes the next
+    caller for that key runs the function again, results are not cached.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def call(self, key, func):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.followers += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return _share(call.result)
+
+        result = None
+        try:
+            result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            if call.followers:
+                call.result = _share(result)
+            call.done.set()
+        return result
+
+    async def call_async(self, key, func):
+        """Like :meth:`call` for a coroutine function, calls are only
+        collapsed with others running on the same event loop
+
+        The call runs as a task of its own, so a caller which is cancelled
+        stops waiting for it without cancelling it for the others. It is
+        only cancelled once every caller waiting for it has been.
+        """
+        loop = asyncio.get_running_loop()
+        key = (loop, key)
+        call = self._tasks.get(key)
+        leader = call is None
+        if leader:
+            call = _AsyncCall()
+            call.task = loop.create_task(self._run(key, call, func))
+            self._tasks[key] = call
+            call.task.add_done_callback(
+                functools.partial(self._finished, key, call))
+        else:
+            call.followers += 1
+
+        call.waiters += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if not leader:
+                call.followers -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+        return result if leader else _share(call.result)
+
+    async def _run(self, key, call, func):
+        try:
+            result = await func()
+        finally:
+            self._forget(key, call)
+        # Copied before any caller is given the result
+        if call.followers:
+            call.result = _share(result)
+        return result
+
+    def _finished(self, key, call, task):
+        self._forget(key, call)
+        # Nobody may be waiting, so mark the exception as retrieved
+        if not task.cancelled():
+            task.exception()
+
+    def _forget(self, key, call):
+        if self._tasks.get(key) is call:
+            del self._tasks[key]
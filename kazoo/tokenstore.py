@@ -0,0 +1,219 @@
+import base64
+import contextlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+def get_token_expiry(auth_token):
+    """Return the time, in seconds since the epoch, at which a JWT auth
+    token expires according to its ``exp`` claim, or None if it is not a
+    JWT or has no expiry
+    """
+    try:
+        payload = auth_token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        claims = json.loads(base64.urlsafe_b64decode(payload))
+        return float(claims["exp"])
+    except (AttributeError, IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenStore(object):
+    """Base class for stores which let clients share auth tokens
+
+    Tokens are stored against the client's auth identity, a hash of the
+    api url and credentials, and are reused for ``max_age`` seconds or
+    until they expire if that is sooner. The store is locked while a token
+    is looked up and, if there is none, fetched, so that of the clients
+    sharing a store only one authenticates and the rest wait for it and
+    reuse its token.
+
+    Subclasses implement ``_locked`` as a context manager which holds the
+    lock and returns a handle passed to ``_read``, ``_write`` and
+    ``_remove``.
+    """
+
+    def __init__(self, max_age=3600, clock=time.time):
+        self.max_age = max_age
+        self._clock = clock
+
+    def fetch(self, identity, authenticate):
+        """Return the stored auth data for ``identity``, or call
+        ``authenticate`` and store the auth data it returns
+        """
+        with self._locked() as handle:
+            entry = self._read(handle, identity)
+            if entry is not None and entry["expires"] > self._clock():
+                return entry["auth_data"]
+            auth_data = authenticate()
+            expires = self._clock() + self.max_age
+            token_expiry = get_token_expiry(auth_data.get("auth_token"))
+            if token_expiry is not None:
+                expires = min(expires, token_expiry)
+            self._write(handle, identity,
+                        {"auth_data": auth_data, "expires": expires})
+            return auth_data
+
+    def discard(self, identity, auth_token):
+        """Remove the stored token for ``identity`` if it is ``auth_token``,
+        because it has been rejected. A token which has already replaced it
+        is kept.
+        """
+        with self._locked() as handle:
+            entry = self._read(handle, identity)
+            if (entry is not None and
+                    entry["auth_data"].get("auth_token") == auth_token):
+                self._remove(handle, identity)
+
+    def _locked(self):
+        raise NotImplementedError()
+
+    def _read(self, handle, identity):
+        raise NotImplementedError()
+
+    def _write(self, handle, identity, entry):
+        raise NotImplementedError()
+
+    def _remove(self, handle, identity):
+        raise NotImplementedError()
+
+
+class MemoryTokenStore(TokenStore):
+    """Shares tokens between the clients in one process"""
+
+    def __init__(self, max_age=3600, clock=time.time):
+        super(MemoryTokenStore, self).__init__(max_age, clock)
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._lock:
+            yield self._entries
+
+    def _read(self, handle, identity):
+        return handle.get(identity)
+
+    def _write(self, handle, identity, entry):
+        handle[identity] = entry
+
+    def _remove(self, handle, identity):
+        del handle[identity]
+
+
+class FileTokenStore(TokenStore):
+    """Shares tokens between processes on one host through a JSON file
+
+    The file is only readable by its owner and is locked with ``flock`` on
+    a separate ``<path>.lock`` file, so this store is not available on
+    Windows.
+    """
+
+    def __init__(self, path, max_age=3600, clock=time.time):
+        if fcntl is None:
+            raise RuntimeError("FileTokenStore needs fcntl, which is not "
+                               "available on this platform")
+        super(FileTokenStore, self).__init__(max_age, clock)
+        self.path = path
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with open(self.path + ".lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                entries = self._load()
+                original = dict(entries)
+                yield entries
+                if entries != original:
+                    self._save(entries)
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _save(self, entries):
+        now = self._clock()
+        entries = {identity: entry for identity, entry in entries.items()
+                   if entry["expires"] > now}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, temp_path = tempfile.mkstemp(dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(entries, f)
+            os.replace(temp_path, self.path)
+        except Exception:
+            os.unlink(temp_path)
+            raise
+
+    def _read(self, handle, identity):
+        return handle.get(identity)
+
+    def _write(self, handle, identity, entry):
+        handle[identity] = entry
+
+    def _remove(self, handle, identity):
+        del handle[identity]
+
+
+class SQLiteTokenStore(TokenStore):
+    """Shares tokens between processes on one host through an SQLite
+    database, which is locked for writing while a token is fetched
+    """
+
+    def __init__(self, path, max_age=3600, clock=time.time, timeout=60):
+        super(SQLiteTokenStore, self).__init__(max_age, clock)
+        self.path = path
+        self.timeout = timeout
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS auth_tokens "
+                "(identity TEXT PRIMARY KEY, auth_data TEXT, expires REAL)")
+        os.chmod(self.path, 0o600)
+
+    def _connect(self):
+        return contextlib.closing(sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None))
+
+    @contextlib.contextmanager
+    def _locked(self):
+        with self._connect() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def _read(self, handle, identity):
+        row = handle.execute(
+            "SELECT auth_data, expires FROM auth_tokens WHERE identity = ?",
+            (identity,)).fetchone()
+        if row is None:
+            return None
+        return {"auth_data": json.loads(row[0]), "expires": row[1]}
+
+    def _write(self, handle, identity, entry):
+        handle.execute("DELETE FROM auth_tokens WHERE expires <= ?",
+                       (self._clock(),))
+        handle.execute(
+            "INSERT OR REPLACE INTO auth_tokens VALUES (?, ?, ?)",
+            (identity, json.dumps(entry["auth_data"]), entry["expires"]))
+
+    def _remove(self, handle, identity):
+        handle.execute("DELETE FROM auth_tokens WHERE identity = ?",
+                       (identity,))
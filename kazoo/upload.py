@@ -0,0 +1,147 @@
+import io
+import mimetypes
+import os
+import uuid
+from kazoo.download import DEFAULT_CHUNK_SIZE
+from kazoo.exceptions import KazooApiError
+
+
+def guess_content_type(filename):
+    """Return the content type of a file given its name, defaulting to
+    application/octet-stream
+    """
+    if filename:
+        content_type = mimetypes.guess_type(filename)[0]
+        if content_type is not None:
+            return content_type
+    return "application/octet-stream"
+
+
+def _get_remaining_length(file_obj):
+    try:
+        return os.fstat(file_obj.fileno()).st_size - file_obj.tell()
+    except (AttributeError, OSError, ValueError):
+        pass
+    try:
+        position = file_obj.tell()
+        end = file_obj.seek(0, io.SEEK_END)
+        file_obj.seek(position)
+        return end - position
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _is_seekable(file_obj):
+    seekable = getattr(file_obj, "seekable", None)
+    return bool(seekable and seekable())
+
+
+class FileBody(object):
+    """Streams a binary file as the body of a request 'chunk_size' bytes at
+    a time, so that it is never read into memory all at once ::
+
+        >>>with open("fax.pdf", "rb") as f:
+        ...    client.create_outgoing_fax(acct_id, fax_data,
+        ...                               body=FileBody(f, progress=report))
+
+    'progress' is called with the number of bytes sent so far and the
+    total, which is None when the size of the file can not be found, after
+    each chunk. The content type is guessed from 'filename', or the name
+    of the file, unless it is given. A seekable file is rewound when the
+    request has to be sent again, for example after re-authenticating.
+    """
+
+    def __init__(self, file_obj, content_type=None, filename=None,
+                 progress=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        name = getattr(file_obj, "name", None)
+        if filename is None and isinstance(name, str):
+            filename = os.path.basename(name)
+        self.file_obj = file_obj
+        self.filename = filename
+        self.content_type = content_type or guess_content_type(filename)
+        self.progress = progress
+        self.chunk_size = chunk_size
+        self._start = file_obj.tell() if _is_seekable(file_obj) else None
+        self._started = False
+        # requests sends a Content-Length taken from 'len' instead of
+        # chunking the body when the length is known
+        self.len = _get_remaining_length(file_obj)
+
+    def _rewind(self):
+        if self._started:
+            if self._start is None:
+                raise KazooApiError("The request can not be sent again "
+                                    "because its file is not seekable")
+            self.file_obj.seek(self._start)
+        self._started = True
+
+    def __iter__(self):
+        self._rewind()
+        sent = 0
+        while True:
+            chunk = self.file_obj.read(self.chunk_size)
+            if not chunk:
+                break
+            yield chunk
+            sent += len(chunk)
+            if self.progress is not None:
+                self.progress(sent, self.len)
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
+
+
+class MultipartBody(object):
+    """Streams a multipart body made of 'parts', a list of (name,
+    content_type, content) where content is bytes or a :class:`FileBody`,
+    whose content type is used if content_type is None
+
+    This is how a document is created along with its attachment, such as a
+    fax and the PDF to send. Files are read chunk by chunk as they are sent.
+    """
+
+    def __init__(self, parts, subtype="mixed", boundary=None):
+        self.boundary = boundary or uuid.uuid4().hex
+        self.content_type = "multipart/{0}; boundary={1}".format(
+            subtype, self.boundary)
+        self._parts = [(self._get_part_header(name, content_type, content),
+                        content)
+                       for name, content_type, content in parts]
+        self._closing = "--{0}--\r\n".format(self.boundary).encode()
+        self.len = self._get_length()
+
+    def _get_part_header(self, name, content_type, content):
+        disposition = 'form-data; name="{0}"'.format(name)
+        if isinstance(content, FileBody):
+            content_type = content_type or content.content_type
+            if content.filename:
+                disposition += '; filename="{0}"'.format(content.filename)
+        return ("--{0}\r\nContent-Disposition: {1}\r\nContent-Type: {2}"
+                "\r\n\r\n".format(self.boundary, disposition,
+                                  content_type)).encode()
+
+    def _get_length(self):
+        length = len(self._closing)
+        for header, content in self._parts:
+            content_length = (content.len if isinstance(content, FileBody)
+                              else len(content))
+            if content_length is None:
+                return None
+            length += len(header) + content_length + 2
+        return length
+
+    def __iter__(self):
+        for header, content in self._parts:
+            yield header
+            if isinstance(content, FileBody):
+                for chunk in content:
+                    yield chunk
+            else:
+                yield content
+            yield b"\r\n"
+        yield self._closing
+
+    async def __aiter__(self):
+        for chunk in self:
+            yield chunk
@@ -3,7 +3,8 @@ from distutils.core import setup
 
 #Nasty hack to get version without importing currently uninstalled module
 import os.path as path
-version_line = open(path.join(path.dirname(__file__), "kazoo", "__init__.py")).read().split("\n")[2]
+version_line = [line for line in open(path.join(path.dirname(__file__), "kazoo", "__init__.py")).read().split("\n")
+                if line.startswith("VERSION")][0]
 version = version_line.split("\"")[1]
 
 setup(
@@ -14,6 +15,7 @@ setup(
     url="http://2600hz.com/platform.html",
     packages = ["kazoo"],
     install_requires=["requests >=2.2.1"],
+    extras_require={"async": ["aiohttp"], "fast": ["orjson"]},
     license="MIT License",
     readme='README.rst',
 )
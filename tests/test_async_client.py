@@ -0,0 +1,164 @@
+import json
+import mock
+import unittest
+from kazoo import AsyncClient, exceptions
+from kazoo.cache import ResponseCache
+from kazoo.request_objects import KazooRequest
+from kazoo.tokenstore import MemoryTokenStore
+from tests import utils
+
+try:
+    import aiohttp
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    aiohttp = None
+
+
+def async_return(value):
+    return mock.AsyncMock(return_value=value)
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncClientTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.client = AsyncClient(api_key="sdfasdfasdf")
+        self.auth_response = utils.load_fixture_as_dict(
+            "good_auth_response.json")
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def test_authenticate_sets_auth_token(self):
+        with mock.patch.object(self.client.auth_request, "execute_async",
+                               async_return(self.auth_response)):
+            token = await self.client.authenticate()
+        self.assertEqual(token, self.auth_response["auth_token"])
+        self.assertEqual(self.client.account_id,
+                         self.auth_response["data"]["account_id"])
+
+    async def test_authenticate_with_token_store(self):
+        store = MemoryTokenStore()
+        other = AsyncClient(api_key="sdfasdfasdf", token_store=store)
+        self.client.token_store = store
+        auth = async_return(self.auth_response)
+        with mock.patch.object(self.client.auth_request, "execute_async",
+                               auth), \
+                mock.patch.object(other.auth_request, "execute_async", auth):
+            await self.client.authenticate()
+            token = await other.authenticate()
+        await other.close()
+        self.assertEqual(token, self.auth_response["auth_token"])
+        self.assertEqual(auth.call_count, 1)
+
+    async def test_generated_methods_return_awaitables(self):
+        self.client.auth_token = "sometoken"
+        with mock.patch.object(KazooRequest, "execute_async",
+                               async_return({"status": "success"})) as mock_exec:
+            response = await self.client.get_account("someaccount")
+        self.assertEqual(response, {"status": "success"})
+        mock_exec.assert_called_with(self.client.base_url, mock.ANY,
+                                     token="sometoken",
+                                     account_id="someaccount")
+
+    async def test_reauthenticates_on_401(self):
+        self.client.auth_token = "expiredtoken"
+        self.client._authenticated = True
+        execute = mock.AsyncMock(side_effect=[
+            exceptions.KazooApiAuthenticationError("Invalid credentials"),
+            {"status": "success"}])
+        with mock.patch.object(self.client.auth_request, "execute_async",
+                               async_return(self.auth_response)), \
+                mock.patch.object(KazooRequest, "execute_async", execute):
+            response = await self.client.get_account("someaccount")
+        self.assertEqual(response, {"status": "success"})
+        self.assertEqual(execute.call_args[1]["token"],
+                         self.auth_response["auth_token"])
+
+    async def test_lazy_update_invalidates_cached_get(self):
+        self.client.auth_token = "sometoken"
+        self.client.response_cache = ResponseCache()
+        execute = async_return({"status": "success", "data": {"id": "dev"}})
+        with mock.patch.object(KazooRequest, "execute_async", execute):
+            await self.client.get_device("acct", "dev")
+            await self.client.update_device("acct", "dev", {"name": "new"},
+                                            lazy=True)
+            await self.client.get_device("acct", "dev")
+            await self.client.get_device("acct", "dev")
+        self.assertEqual(execute.call_count, 3)
+
+    async def test_sync_context_manager_refused(self):
+        with self.assertRaises(TypeError):
+            with self.client:
+                pass
+
+    async def test_async_context_manager_closes_session(self):
+        async with AsyncClient(api_key="sdfasdfasdf") as client:
+            session = client._get_session()
+        self.assertTrue(session.closed)
+
+    async def test_map_yields_results_in_order(self):
+        self.client.auth_token = "sometoken"
+        async def execute(request, *args, **kwargs):
+            return {"status": "success", "data": {"id": kwargs["device_id"]}}
+
+        with mock.patch.object(KazooRequest, "execute_async", execute):
+            results = [r async for r in self.client.map(
+                "get_device", [("acct", "dev1"), ("acct", "dev2")])]
+        self.assertEqual([r.result["data"]["id"] for r in results],
+                         ["dev1", "dev2"])
+
+    async def test_batch_runs_submitted_calls(self):
+        self.client.auth_token = "sometoken"
+        async def execute(request, *args, **kwargs):
+            return {"status": "success", "data": {"id": kwargs["device_id"]}}
+
+        with mock.patch.object(KazooRequest, "execute_async", execute):
+            async with self.client.batch() as batch:
+                batch.submit(self.client.get_device, "acct", "dev1")
+                batch.submit(self.client.get_device, "acct", "dev2")
+        self.assertEqual([r.result["data"]["id"]
+                          async for r in batch.results()], ["dev1", "dev2"])
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncRequestTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.session = aiohttp.ClientSession()
+        self.base_url = str(self.server.make_url(""))
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def handler(self, request):
+        self.requests.append((request.method, request.path_qs,
+                              request.headers.get("X-Auth-Token"),
+                              await request.read()))
+        return web.json_response(self.response_body)
+
+    async def test_data_and_token_sent_to_server(self):
+        self.response_body = {"status": "success", "data": {"id": "1"}}
+        req_obj = KazooRequest("/testpath/{param1}", method="post")
+        response = await req_obj.execute_async(
+            self.base_url, self.session, token="sometoken",
+            data={"name": "somename"}, param1="value")
+        self.assertEqual(response, self.response_body)
+        method, path, token, body = self.requests[0]
+        self.assertEqual((method, path, token),
+                         ("POST", "/testpath/value", "sometoken"))
+        self.assertEqual(json.loads(body), {"data": {"name": "somename"}})
+
+    async def test_error_response_raises(self):
+        self.response_body = utils.load_fixture_as_dict(
+            "bad_auth_response.json")
+        req_obj = KazooRequest("/somepath", auth_required=False)
+        with self.assertRaises(exceptions.KazooApiAuthenticationError):
+            await req_obj.execute_async(self.base_url, self.session)
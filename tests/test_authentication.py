@@ -1,6 +1,9 @@
 import mock
+import threading
+import time
 import unittest
-from kazoo import Client
+from kazoo import Client, exceptions
+from kazoo.request_objects import KazooRequest
 
 
 class AuthenticationTestCase(unittest.TestCase):
@@ -14,3 +17,54 @@ class AuthenticationTestCase(unittest.TestCase):
             client.authenticate()
             mock_req.execute.assert_called_with(client.BASE_URL)
             self.assertEqual(client.auth_token, "authorizethis")
+
+
+class ReauthenticationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="dsfjasbfkasdf")
+        self.client._set_auth_data({"auth_token": "expired",
+                                    "data": {"account_id": "acct"}})
+        patcher = mock.patch.object(self.client.auth_request, "execute")
+        self.mock_auth = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_auth.return_value = {"auth_token": "fresh",
+                                       "data": {"account_id": "acct"}}
+
+    def test_rejected_token_replaced(self):
+        self.assertEqual(self.client._reauthenticate("expired"), "fresh")
+        self.assertEqual(self.mock_auth.call_count, 1)
+
+    def test_token_already_replaced_is_reused(self):
+        self.client._reauthenticate("expired")
+        self.assertEqual(self.client._reauthenticate("expired"), "fresh")
+        self.assertEqual(self.mock_auth.call_count, 1)
+
+    def test_concurrent_401s_authenticate_once(self):
+        started = threading.Event()
+        release = threading.Event()
+        sent_tokens = []
+
+        def execute(*args, **kwargs):
+            sent_tokens.append(kwargs["token"])
+            if kwargs["token"] == "expired":
+                started.set()
+                release.wait(5)
+                raise exceptions.KazooApiAuthenticationError("Invalid")
+            return {"status": "success"}
+
+        results = []
+        with mock.patch.object(KazooRequest, "execute", side_effect=execute):
+            threads = [threading.Thread(
+                target=lambda: results.append(self.client.get_account("a")))
+                for i in range(4)]
+            for thread in threads:
+                thread.start()
+            started.wait(5)
+            time.sleep(0.05)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(results, [{"status": "success"}] * 4)
+        self.assertEqual(self.mock_auth.call_count, 1)
+        self.assertEqual(sent_tokens.count("fresh"), 4)
@@ -0,0 +1,123 @@
+import asyncio
+import mock
+import threading
+import unittest
+from kazoo import Client, exceptions
+from kazoo.batch import AsyncBatch, Batch, map_calls
+
+
+class MapCallsTestCase(unittest.TestCase):
+
+    def test_results_returned_in_order(self):
+        results = list(map_calls(lambda x: x * 2, range(50), max_workers=4))
+        self.assertEqual([r.result for r in results],
+                         [x * 2 for x in range(50)])
+        self.assertEqual([r.index for r in results], list(range(50)))
+
+    def test_unordered_results_cover_every_item(self):
+        results = map_calls(lambda x: x, range(20), max_workers=4,
+                            ordered=False)
+        self.assertEqual(sorted(r.result for r in results), list(range(20)))
+
+    def test_errors_collected_per_item(self):
+        def fail_on_odd(x):
+            if x % 2:
+                raise exceptions.KazooApiError("odd")
+            return x
+
+        results = list(map_calls(fail_on_odd, range(6), max_workers=2))
+        self.assertEqual([r.ok for r in results],
+                         [True, False, True, False, True, False])
+        self.assertTrue(isinstance(results[1].error,
+                                   exceptions.KazooApiError))
+
+    def test_tuple_and_dict_items_expanded(self):
+        func = mock.Mock(return_value=None)
+        list(map_calls(func, [("a", "b"), {"x": 1}, "c"], max_workers=1))
+        func.assert_has_calls([mock.call("a", "b"), mock.call(x=1),
+                               mock.call("c")])
+
+    def test_calls_run_concurrently(self):
+        barrier = threading.Barrier(3, timeout=5)
+        results = list(map_calls(lambda x: barrier.wait(), range(3),
+                                 max_workers=3))
+        self.assertTrue(all(r.ok for r in results))
+
+    def test_in_flight_calls_bounded(self):
+        consumed = []
+
+        def args():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+
+        results = map_calls(lambda x: x, args(), max_workers=2)
+        next(results)
+        self.assertTrue(len(consumed) <= 5)
+        results.close()
+
+
+class BatchTestCase(unittest.TestCase):
+
+    def test_submitted_calls_return_results(self):
+        with Batch(max_workers=2) as batch:
+            for i in range(5):
+                batch.submit(pow, i, 2)
+        self.assertEqual([r.result for r in batch.results()],
+                         [0, 1, 4, 9, 16])
+
+
+class AsyncBatchTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_submitted_calls_return_results(self):
+        async def square(x):
+            await asyncio.sleep(0.01 * (5 - x))
+            return x * x
+
+        async with AsyncBatch(max_concurrency=5) as batch:
+            for i in range(5):
+                batch.submit(square, i)
+        self.assertEqual([r.result async for r in batch.results()],
+                         [0, 1, 4, 9, 16])
+
+    async def test_unordered_results_as_completed(self):
+        async def wait(x):
+            await asyncio.sleep(0.01 * x)
+            if x == 1:
+                raise exceptions.KazooApiError("failed")
+            return x
+
+        async with AsyncBatch(max_concurrency=3) as batch:
+            for i in (3, 1, 2):
+                batch.submit(wait, i)
+            results = [r async for r in batch.results(ordered=False)]
+        self.assertEqual([r.index for r in results], [1, 2, 0])
+        self.assertFalse(results[0].ok)
+
+    async def test_concurrency_bounded(self):
+        running = []
+        peak = []
+
+        async def call(x):
+            running.append(x)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(x)
+
+        async with AsyncBatch(max_concurrency=2) as batch:
+            for i in range(6):
+                batch.submit(call, i)
+        self.assertEqual(max(peak), 2)
+
+
+class ClientMapTestCase(unittest.TestCase):
+
+    def test_map_accepts_method_name(self):
+        client = Client(api_key="sometoken", pool_maxsize=4)
+        with mock.patch.object(Client, "_execute_request") as mock_exec:
+            mock_exec.return_value = {"status": "success"}
+            results = list(client.map("get_device",
+                                      [("acct", "dev1"), ("acct", "dev2")]))
+        self.assertEqual(len(results), 2)
+        self.assertTrue(all(r.result == {"status": "success"}
+                            for r in results))
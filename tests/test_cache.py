@@ -0,0 +1,207 @@
+import mock
+import unittest
+from kazoo import Client
+from kazoo.cache import ResponseCache
+from kazoo.request_objects import KazooRequest, NOT_MODIFIED
+from tests.utils import FakeClock
+
+
+class ResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(maxsize=3, ttl=10, clock=self.clock)
+
+    def test_returns_cached_copy(self):
+        self.cache.set("me", "http://api/accounts/a", {"data": {"id": "a"}})
+        response = self.cache.get("me", "http://api/accounts/a")
+        self.assertEqual(response, {"data": {"id": "a"}})
+        response["data"]["id"] = "changed"
+        self.assertEqual(self.cache.get("me", "http://api/accounts/a"),
+                         {"data": {"id": "a"}})
+
+    def test_keyed_by_identity(self):
+        self.cache.set("me", "http://api/accounts/a", {"data": {}})
+        self.assertEqual(self.cache.get("you", "http://api/accounts/a"),
+                         None)
+
+    def test_entries_expire(self):
+        self.cache.set("me", "http://api/accounts/a", {"data": {}})
+        self.clock.now = 10
+        self.assertEqual(self.cache.get("me", "http://api/accounts/a"), None)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_least_recently_used_evicted(self):
+        for name in ["a", "b", "c"]:
+            self.cache.set("me", "http://api/" + name, {"data": name})
+        self.cache.get("me", "http://api/a")
+        self.cache.set("me", "http://api/d", {"data": "d"})
+        self.assertEqual(self.cache.get("me", "http://api/b"), None)
+        self.assertEqual(self.cache.get("me", "http://api/a"), {"data": "a"})
+
+    def test_expired_entry_with_etag_kept_for_revalidation(self):
+        self.cache.set("me", "http://api/accounts/a", {"data": {}},
+                       etag='"1-abc"')
+        self.clock.now = 10
+        self.assertEqual(self.cache.get("me", "http://api/accounts/a"), None)
+        self.assertEqual(self.cache.get_etag("me", "http://api/accounts/a"),
+                         '"1-abc"')
+        self.assertEqual(self.cache.refresh("me", "http://api/accounts/a"),
+                         {"data": {}})
+        self.assertEqual(self.cache.get("me", "http://api/accounts/a"),
+                         {"data": {}})
+
+    def test_refresh_missing_entry(self):
+        self.assertEqual(self.cache.refresh("me", "http://api/accounts/a"),
+                         None)
+
+    def test_invalidate_object_views_and_collection(self):
+        cache = ResponseCache()
+        base = "http://api/accounts/a/devices"
+        urls = [base, base + "?page_size=5", base + "/d1",
+                base + "/d1/quickcall/100", base + "/d2",
+                "http://api/accounts/a/users"]
+        for url in urls:
+            cache.set("me", url, {"data": url})
+        cache.invalidate("me", base + "/d1")
+        remaining = [url for url in urls if cache.get("me", url)]
+        self.assertEqual(remaining, [base + "/d2",
+                                     "http://api/accounts/a/users"])
+
+
+class ClientResponseCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="sometoken",
+                             response_cache=ResponseCache())
+        patcher = mock.patch.object(KazooRequest, "execute")
+        self.mock_execute = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_execute.return_value = {"status": "success",
+                                          "data": {"id": "cf1"}}
+
+    def test_repeated_get_served_from_cache(self):
+        first = self.client.get_callflow("acct", "cf1")
+        second = self.client.get_callflow("acct", "cf1")
+        self.assertEqual(first, second)
+        self.assertEqual(self.mock_execute.call_count, 1)
+
+    def test_cache_can_be_bypassed(self):
+        self.client.get_callflow("acct", "cf1")
+        self.client.get_callflow("acct", "cf1", cache=False)
+        self.assertEqual(self.mock_execute.call_count, 2)
+
+    def test_update_invalidates_object(self):
+        self.client.get_callflow("acct", "cf1")
+        self.client.update_callflow("acct", "cf1", {"name": "new"})
+        self.client.get_callflow("acct", "cf1")
+        self.assertEqual(self.mock_execute.call_count, 3)
+
+    def test_delete_invalidates_collection(self):
+        self.client.get_callflows("acct")
+        self.client.delete_callflow("acct", "cf1")
+        self.client.get_callflows("acct")
+        self.assertEqual(self.mock_execute.call_count, 3)
+
+    def test_lazy_update_invalidates_object(self):
+        self.client.get_callflow("acct", "cf1")
+        self.client.update_callflow("acct", "cf1", {"name": "new"},
+                                    lazy=True)
+        self.client.get_callflow("acct", "cf1")
+        self.assertEqual(self.mock_execute.call_count, 3)
+
+    def test_projected_create_invalidates_collection(self):
+        self.client.get_callflows("acct")
+        self.client.create_callflow("acct", {"name": "new"}, fields=["id"])
+        self.client.get_callflows("acct")
+        self.assertEqual(self.mock_execute.call_count, 3)
+
+    def test_interrupted_update_invalidates_object(self):
+        self.client.get_callflow("acct", "cf1")
+        self.mock_execute.side_effect = KeyboardInterrupt
+        with self.assertRaises(KeyboardInterrupt):
+            self.client.update_callflow("acct", "cf1", {"name": "new"})
+        self.mock_execute.side_effect = None
+        self.client.get_callflow("acct", "cf1")
+        self.assertEqual(self.mock_execute.call_count, 3)
+
+    def test_clients_with_different_credentials_do_not_share(self):
+        other = Client(api_key="othertoken",
+                       response_cache=self.client.response_cache)
+        self.client.get_callflow("acct", "cf1")
+        other.get_callflow("acct", "cf1")
+        self.assertEqual(self.mock_execute.call_count, 2)
+
+
+class ClientConditionalGetTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="sometoken",
+                             response_cache=ResponseCache(ttl=0))
+        patcher = mock.patch.object(KazooRequest, "execute")
+        self.mock_execute = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.document = {"status": "success", "revision": "2-def",
+                         "data": {"id": "cf1"}}
+
+    def test_not_modified_reuses_cached_document(self):
+        self.mock_execute.side_effect = [self.document, NOT_MODIFIED]
+        self.client.get_callflow("acct", "cf1")
+        self.assertEqual(self.client.get_callflow("acct", "cf1"),
+                         self.document)
+        headers = self.mock_execute.call_args[1]["headers"]
+        self.assertEqual(headers, {"If-None-Match": '"2-def"'})
+
+    def test_changed_document_replaces_cached(self):
+        changed = dict(self.document, revision="3-fed")
+        self.mock_execute.side_effect = [self.document, changed, NOT_MODIFIED]
+        self.client.get_callflow("acct", "cf1")
+        self.assertEqual(self.client.get_callflow("acct", "cf1"), changed)
+        self.client.get_callflow("acct", "cf1")
+        headers = self.mock_execute.call_args[1]["headers"]
+        self.assertEqual(headers, {"If-None-Match": '"3-fed"'})
+
+    def test_caller_headers_kept(self):
+        self.mock_execute.side_effect = [self.document, NOT_MODIFIED]
+        accept = {"Accept": "application/json"}
+        self.client.get_callflow("acct", "cf1", headers=accept)
+        self.client.get_callflow("acct", "cf1", headers=accept)
+        headers = self.mock_execute.call_args[1]["headers"]
+        self.assertEqual(headers, {"Accept": "application/json",
+                                   "If-None-Match": '"2-def"'})
+        self.assertEqual(accept, {"Accept": "application/json"})
+
+    def test_refetch_after_eviction_keeps_caller_headers(self):
+        self.mock_execute.side_effect = [self.document, NOT_MODIFIED,
+                                         self.document]
+        accept = {"Accept": "application/json"}
+        self.client.get_callflow("acct", "cf1", headers=accept)
+        with mock.patch.object(self.client.response_cache, "refresh",
+                               return_value=None):
+            self.assertEqual(self.client.get_callflow(
+                "acct", "cf1", headers=accept), self.document)
+        self.assertEqual(self.mock_execute.call_count, 3)
+        headers = self.mock_execute.call_args[1]["headers"]
+        self.assertEqual(headers, {"Accept": "application/json"})
+
+    def test_no_revision_not_conditional(self):
+        del self.document["revision"]
+        self.mock_execute.return_value = self.document
+        self.client.get_callflow("acct", "cf1")
+        self.client.get_callflow("acct", "cf1")
+        self.assertNotIn("headers", self.mock_execute.call_args[1])
+
+
+class ConditionalRequestTestCase(unittest.TestCase):
+
+    def test_304_returns_not_modified(self):
+        request = KazooRequest("/accounts/{account_id}")
+        with mock.patch("requests.get") as mock_get:
+            mock_get.return_value.status_code = 304
+            result = request.execute("http://api", token="tok",
+                                     account_id="acct",
+                                     headers={"If-None-Match": '"1"'})
+        self.assertIs(result, NOT_MODIFIED)
+        sent = mock_get.call_args[1]["headers"]
+        self.assertEqual(sent["If-None-Match"], '"1"')
+        self.assertEqual(sent["X-Auth-Token"], "tok")
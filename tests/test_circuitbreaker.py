@@ -0,0 +1,120 @@
+import asyncio
+import mock
+import unittest
+from kazoo import Client, exceptions
+from kazoo.circuitbreaker import CircuitBreaker, CircuitBreakerRegistry
+from kazoo.request_objects import KazooRequest
+from kazoo.retry import RetryPolicy
+from tests.utils import FakeClock
+
+
+def unavailable():
+    raise exceptions.KazooApiHttpError(503, "unavailable")
+
+
+class CircuitBreakerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker(name="/faxes", failure_threshold=3,
+                                      recovery_timeout=10, clock=self.clock)
+
+    def fail(self, times):
+        for i in range(times):
+            with self.assertRaises(exceptions.KazooApiHttpError):
+                self.breaker.call(unavailable)
+
+    def test_opens_after_threshold_failures(self):
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+        func = mock.Mock()
+        with self.assertRaises(exceptions.CircuitOpenError) as cm:
+            self.breaker.call(func)
+        self.assertFalse(func.called)
+        self.assertEqual(cm.exception.route, "/faxes")
+        self.assertEqual(cm.exception.retry_after, 10)
+
+    def test_success_resets_failure_count(self):
+        self.fail(2)
+        self.breaker.call(lambda: None)
+        self.fail(2)
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_api_errors_do_not_count_as_failures(self):
+        error = exceptions.KazooApiBadDataError({"name": "required"})
+        for i in range(5):
+            with self.assertRaises(exceptions.KazooApiBadDataError):
+                self.breaker.call(mock.Mock(side_effect=error))
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_after_recovery_timeout(self):
+        self.fail(3)
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+
+    def test_half_open_allows_single_probe(self):
+        self.fail(3)
+        self.clock.now = 10
+        self.breaker.before_call()
+        with self.assertRaises(exceptions.CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_successful_probe_closes(self):
+        self.fail(3)
+        self.clock.now = 10
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+        self.assertEqual(self.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_failed_probe_reopens(self):
+        self.fail(3)
+        self.clock.now = 10
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CircuitBreaker.OPEN)
+
+    def test_interrupted_probe_lets_another_through(self):
+        self.fail(3)
+        self.clock.now = 10
+        with self.assertRaises(KeyboardInterrupt):
+            self.breaker.call(mock.Mock(side_effect=KeyboardInterrupt))
+        self.assertEqual(self.breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertEqual(self.breaker.call(lambda: "ok"), "ok")
+
+
+class AsyncCircuitBreakerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_cancelled_probe_lets_another_through(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=10,
+                                 clock=clock)
+        with self.assertRaises(exceptions.KazooApiHttpError):
+            breaker.call(unavailable)
+        clock.now = 10
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(breaker.call_async(
+                lambda: asyncio.sleep(10)), 0.01)
+        result = await breaker.call_async(lambda: asyncio.sleep(0, "ok"))
+        self.assertEqual(result, "ok")
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+
+class ClientCircuitBreakerTestCase(unittest.TestCase):
+
+    def test_open_endpoint_fails_fast_without_affecting_others(self):
+        client = Client(api_key="sometoken",
+                        retry_policy=RetryPolicy(max_retries=0),
+                        circuit_breaker=CircuitBreakerRegistry(
+                            failure_threshold=2))
+        with mock.patch.object(KazooRequest, "execute") as mock_execute:
+            mock_execute.side_effect = exceptions.KazooApiHttpError(
+                502, "bad gateway")
+            for i in range(2):
+                with self.assertRaises(exceptions.KazooApiHttpError):
+                    client.get_queues("acct")
+            with self.assertRaises(exceptions.CircuitOpenError):
+                client.get_queues("acct")
+            self.assertEqual(mock_execute.call_count, 2)
+
+            mock_execute.side_effect = None
+            mock_execute.return_value = {"status": "success"}
+            self.assertEqual(client.get_device("acct", "dev"),
+                             {"status": "success"})
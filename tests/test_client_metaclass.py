@@ -1,5 +1,5 @@
 import unittest
-from kazoo.client import RestClientMetaClass
+from kazoo.client import RestClientMetaClass, _LazyFunction
 from kazoo.rest_resources import RestResource
 import inspect
 
@@ -103,3 +103,30 @@ class GeneratedMethodNamesTestCase(unittest.TestCase):
                         "update_bird", "delete_bird"]
         for method_name in method_names:
             self.assertTrue(hasattr(self.test_resource, method_name))
+
+
+class LazyMethodGenerationTestCase(unittest.TestCase):
+
+    def setUp(self):
+        class LazyClass(metaclass=RestClientMetaClass):
+            some_resource = RestResource(
+                "some_resource",
+                "/{resource_one_id}/subresources/{resource_two_id}")
+        self.lazy_class = LazyClass
+
+    def test_methods_compiled_on_first_use(self):
+        self.assertIsInstance(self.lazy_class.__dict__["get_some_resource"],
+                              _LazyFunction)
+        method = self.lazy_class().get_some_resource
+        self.assertEqual(inspect.getfullargspec(method).args,
+                         ["self", "resource_one_id", "resource_two_id"])
+        self.assertTrue(inspect.isfunction(
+            self.lazy_class.__dict__["get_some_resource"]))
+
+    def test_compiled_method_replaced_on_defining_class(self):
+        class SubClass(self.lazy_class):
+            pass
+        SubClass().get_some_resources
+        self.assertNotIn("get_some_resources", SubClass.__dict__)
+        self.assertTrue(inspect.isfunction(
+            self.lazy_class.__dict__["get_some_resources"]))
@@ -0,0 +1,81 @@
+import mock
+import unittest
+from kazoo import Client, exceptions
+from kazoo.codec import JsonCodec, OrjsonCodec, get_default_codec
+from kazoo.request_objects import KazooRequest
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class JsonCodecTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = JsonCodec()
+
+    def test_encodes_compact_bytes(self):
+        self.assertEqual(self.codec.dumps({"data": {"name": "é"}}),
+                         '{"data":{"name":"é"}}'.encode("utf-8"))
+
+    def test_decodes_bytes(self):
+        self.assertEqual(self.codec.loads(b'{"status": "success"}'),
+                         {"status": "success"})
+
+    def test_invalid_json_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            self.codec.loads(b"<html>")
+
+
+@unittest.skipIf(orjson is None, "orjson is not installed")
+class OrjsonCodecTestCase(JsonCodecTestCase):
+
+    def setUp(self):
+        self.codec = OrjsonCodec()
+
+    def test_non_string_keys_encoded(self):
+        self.assertEqual(self.codec.loads(self.codec.dumps({1: "one"})),
+                         {"1": "one"})
+
+    def test_used_by_default_when_installed(self):
+        self.assertIsInstance(get_default_codec(), OrjsonCodec)
+
+
+class RequestCodecTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.codec = mock.Mock(wraps=JsonCodec())
+        self.request = KazooRequest("/accounts/{account_id}",
+                                    auth_required=False)
+
+    def test_codec_encodes_data_and_decodes_response_once(self):
+        with mock.patch("requests.get") as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = b'{"status": "success"}'
+            response = self.request.execute("http://api", account_id="a",
+                                            data={"name": "x"},
+                                            codec=self.codec)
+        self.assertEqual(response, {"status": "success"})
+        self.assertEqual(mock_get.call_args[1]["data"],
+                         b'{"data":{"name":"x"}}')
+        self.assertEqual(self.codec.loads.call_count, 1)
+        self.assertFalse(mock_get.return_value.json.called)
+
+    def test_internal_server_error_decoded_once(self):
+        with mock.patch("requests.get") as mock_get:
+            mock_get.return_value.status_code = 500
+            mock_get.return_value.headers = {"X-Request-Id": "req1"}
+            mock_get.return_value.content = b'{"data": "broken"}'
+            with self.assertRaises(exceptions.KazooApiHttpError) as cm:
+                self.request.execute("http://api", account_id="a",
+                                     codec=self.codec)
+        self.assertIn("broken", str(cm.exception))
+        self.assertEqual(self.codec.loads.call_count, 1)
+
+    def test_client_codec_passed_to_requests(self):
+        client = Client(api_key="sometoken", codec=self.codec)
+        with mock.patch.object(KazooRequest, "execute") as mock_execute:
+            mock_execute.return_value = {"status": "success"}
+            client.get_account("acct")
+        self.assertIs(mock_execute.call_args[1]["codec"], self.codec)
@@ -0,0 +1,134 @@
+import asyncio
+import mock
+import threading
+import unittest
+from kazoo import Client, exceptions
+from kazoo.concurrency import AdaptiveLimit, ConcurrencyController
+from kazoo.request_objects import KazooRequest
+
+
+class AdaptiveLimitTestCase(unittest.TestCase):
+
+    def complete(self, limit, count, latency=0.1):
+        for i in range(count):
+            token = limit.acquire()
+            limit.release(token, latency)
+
+    def test_limit_increases_while_latency_flat(self):
+        limit = AdaptiveLimit(initial_limit=2, min_samples=5)
+        self.complete(limit, 5)
+        self.assertEqual(limit.limit, 3)
+        self.complete(limit, 5)
+        self.assertEqual(limit.limit, 4)
+
+    def test_limit_capped_at_max(self):
+        limit = AdaptiveLimit(initial_limit=2, max_limit=3, min_samples=1)
+        self.complete(limit, 10)
+        self.assertEqual(limit.limit, 3)
+
+    def test_overload_halves_limit(self):
+        limit = AdaptiveLimit(initial_limit=8)
+        token = limit.acquire()
+        limit.release(token, 0.1, overloaded=True)
+        self.assertEqual(limit.limit, 4)
+
+    def test_burst_of_failures_backs_off_once(self):
+        limit = AdaptiveLimit(initial_limit=8)
+        tokens = [limit.acquire() for i in range(4)]
+        for token in tokens:
+            limit.release(token, 0.1, overloaded=True)
+        self.assertEqual(limit.limit, 4)
+
+    def test_limit_never_below_min(self):
+        limit = AdaptiveLimit(initial_limit=2, min_limit=1)
+        for i in range(5):
+            limit.release(limit.acquire(), 0.1, overloaded=True)
+        self.assertEqual(limit.limit, 1)
+
+    def test_rising_latency_backs_off(self):
+        limit = AdaptiveLimit(initial_limit=4, min_samples=5,
+                              latency_tolerance=2.0)
+        self.complete(limit, 5, latency=0.1)
+        self.assertEqual(limit.limit, 5)
+        self.complete(limit, 5, latency=1.0)
+        self.assertEqual(limit.limit, 2.5)
+
+    def test_acquire_blocks_at_limit(self):
+        limit = AdaptiveLimit(initial_limit=1)
+        token = limit.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limit.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.1))
+        limit.release(token, 0.1)
+        self.assertTrue(acquired.wait(5))
+        thread.join()
+
+
+class AsyncAdaptiveLimitTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_acquire_waits_for_release(self):
+        limit = AdaptiveLimit(initial_limit=1)
+        token = await limit.acquire_async()
+        waiting = asyncio.ensure_future(limit.acquire_async())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiting.done())
+        limit.release(token, 0.1)
+        await asyncio.wait_for(waiting, 5)
+
+
+class ConcurrencyControllerTestCase(unittest.TestCase):
+
+    def test_limits_kept_per_key(self):
+        controller = ConcurrencyController(initial_limit=4)
+        self.assertTrue(controller.get_limit("/cdrs") is
+                        controller.get_limit("/cdrs"))
+        self.assertFalse(controller.get_limit("/cdrs") is
+                         controller.get_limit("/devices"))
+
+    def test_throttled_call_backs_off(self):
+        controller = ConcurrencyController(initial_limit=4)
+        error = exceptions.KazooApiHttpError(429, "throttled")
+        with self.assertRaises(exceptions.KazooApiHttpError):
+            controller.call("/cdrs", mock.Mock(side_effect=error))
+        self.assertEqual(controller.get_limit("/cdrs").limit, 2)
+        self.assertEqual(controller.get_limit("/cdrs").in_flight, 0)
+
+    def test_other_errors_do_not_back_off(self):
+        controller = ConcurrencyController(initial_limit=4)
+        error = exceptions.KazooApiError("not found")
+        with self.assertRaises(exceptions.KazooApiError):
+            controller.call("/cdrs", mock.Mock(side_effect=error))
+        self.assertEqual(controller.get_limit("/cdrs").limit, 4)
+
+    def test_client_requests_keyed_by_route(self):
+        controller = ConcurrencyController()
+        client = Client(api_key="sometoken",
+                        concurrency_controller=controller)
+        with mock.patch.object(KazooRequest, "execute") as mock_execute:
+            mock_execute.return_value = {"status": "success"}
+            client.get_device("acct", "dev")
+        limit = controller.get_limit(
+            "/accounts/{account_id}/devices/{device_id}")
+        self.assertEqual(len(limit._samples), 1)
+
+
+class AsyncConcurrencyControllerTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_cancelled_calls_free_their_slots(self):
+        controller = ConcurrencyController(initial_limit=2)
+        for _ in range(2):
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(controller.call_async(
+                    "/cdrs", lambda: asyncio.sleep(10)), 0.01)
+        limit = controller.get_limit("/cdrs")
+        self.assertEqual(limit.in_flight, 0)
+        self.assertEqual(limit._samples, [])
+        result = await asyncio.wait_for(controller.call_async(
+            "/cdrs", lambda: asyncio.sleep(0, "done")), 5)
+        self.assertEqual(result, "done")
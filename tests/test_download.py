@@ -0,0 +1,244 @@
+import io
+import json
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+from kazoo import Client, exceptions
+from kazoo.download import DownloadTarget, parse_content_range
+from kazoo.request_objects import KazooRequest
+
+try:
+    import aiohttp
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    aiohttp = None
+
+PAYLOAD = b"".join(bytes([i]) * 1000 for i in range(10))
+
+
+def make_response(status_code=200, body=PAYLOAD, headers=None):
+    response = mock.MagicMock()
+    response.__enter__.return_value = response
+    response.status_code = status_code
+    response.headers = headers or {"Content-Type": "application/pdf",
+                                   "Content-Length": str(len(body))}
+    response.content = body
+    response.iter_content.side_effect = lambda chunk_size: (
+        body[i:i + chunk_size] for i in range(0, len(body), chunk_size))
+    return response
+
+
+class ParseContentRangeTestCase(unittest.TestCase):
+
+    def test_range_parsed(self):
+        self.assertEqual(parse_content_range("bytes 100-199/1000"),
+                         (100, 1000))
+
+    def test_unknown_total(self):
+        self.assertEqual(parse_content_range("bytes 100-199/*"), (100, None))
+
+    def test_unsatisfied_range(self):
+        self.assertEqual(parse_content_range("bytes */1000"), (None, 1000))
+
+    def test_missing_header(self):
+        self.assertEqual(parse_content_range(None), (None, None))
+
+
+class RequestDownloadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tempdir, "payload.pdf")
+        self.request = KazooRequest("/faxes/{fax_id}/attachment")
+        self.session = mock.Mock()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+
+    def download(self, target, **kwargs):
+        return self.request.download("http://testserver", target,
+                                     session=self.session, token="token",
+                                     fax_id="1", **kwargs)
+
+    def read_file(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def test_payload_streamed_to_path(self):
+        self.session.get.return_value = make_response()
+        result = self.download(self.path, chunk_size=1024)
+        self.assertEqual(self.read_file(), PAYLOAD)
+        self.assertEqual(result.content_type, "application/pdf")
+        self.assertEqual(result.content_length, len(PAYLOAD))
+        self.assertEqual(result.bytes_written, len(PAYLOAD))
+        self.session.get.assert_called_with(
+            "http://testserver/faxes/1/attachment", headers=mock.ANY,
+            stream=True)
+        self.session.get.return_value.iter_content.assert_called_with(1024)
+
+    def test_payload_streamed_to_file_object(self):
+        self.session.get.return_value = make_response()
+        dest = io.BytesIO(b"header")
+        dest.seek(0, io.SEEK_END)
+        self.download(dest)
+        self.assertEqual(dest.getvalue(), b"header" + PAYLOAD)
+
+    def test_resume_requests_missing_bytes(self):
+        with open(self.path, "wb") as f:
+            f.write(PAYLOAD[:4000])
+        self.session.get.return_value = make_response(206, PAYLOAD[4000:], {
+            "Content-Type": "application/pdf",
+            "Content-Range": "bytes 4000-9999/10000"})
+        result = self.download(DownloadTarget(self.path, resume=True))
+        headers = self.session.get.call_args[1]["headers"]
+        self.assertEqual(headers["Range"], "bytes=4000-")
+        self.assertEqual(self.read_file(), PAYLOAD)
+        self.assertEqual((result.resumed_from, result.bytes_written,
+                          result.content_length), (4000, 6000, 10000))
+
+    def test_resume_ignored_by_server_rewrites_file(self):
+        with open(self.path, "wb") as f:
+            f.write(b"stale")
+        self.session.get.return_value = make_response()
+        result = self.download(DownloadTarget(self.path, resume=True))
+        self.assertEqual(self.read_file(), PAYLOAD)
+        self.assertEqual(result.resumed_from, 0)
+
+    def test_resume_of_complete_file(self):
+        with open(self.path, "wb") as f:
+            f.write(PAYLOAD)
+        self.session.get.return_value = make_response(416, b"", {
+            "Content-Range": "bytes */10000"})
+        result = self.download(DownloadTarget(self.path, resume=True))
+        self.assertEqual(self.read_file(), PAYLOAD)
+        self.assertEqual((result.bytes_written, result.content_length),
+                         (0, 10000))
+
+    def test_resume_at_wrong_offset_raises(self):
+        with open(self.path, "wb") as f:
+            f.write(PAYLOAD[:4000])
+        self.session.get.return_value = make_response(206, PAYLOAD, {
+            "Content-Range": "bytes 0-9999/10000"})
+        with self.assertRaises(exceptions.KazooApiError):
+            self.download(DownloadTarget(self.path, resume=True))
+
+    def test_error_envelope_raised(self):
+        body = json.dumps({"status": "error", "error": "401",
+                           "message": "invalid credentials"}).encode()
+        self.session.get.return_value = make_response(401, body)
+        with self.assertRaises(exceptions.KazooApiAuthenticationError):
+            self.download(self.path)
+
+    def test_error_without_envelope_raised(self):
+        self.session.get.return_value = make_response(404, b"not found")
+        with self.assertRaises(exceptions.KazooApiHttpError) as cm:
+            self.download(self.path)
+        self.assertEqual(cm.exception.status_code, 404)
+
+    def test_error_leaves_destination_untouched(self):
+        with open(self.path, "wb") as f:
+            f.write(b"previous photo")
+        self.session.get.return_value = make_response(404, b"not found")
+        with self.assertRaises(exceptions.KazooApiHttpError):
+            self.download(self.path)
+        self.assertEqual(self.read_file(), b"previous photo")
+        missing = os.path.join(self.tempdir, "missing.pdf")
+        with self.assertRaises(exceptions.KazooApiHttpError):
+            self.download(missing)
+        self.assertFalse(os.path.exists(missing))
+
+    def test_restart_rewinds_file_object(self):
+        dest = io.BytesIO()
+        target = DownloadTarget(dest)
+        self.session.get.return_value = make_response()
+        self.download(target)
+        self.download(target)
+        self.assertEqual(dest.getvalue(), PAYLOAD)
+
+
+class ClientDownloadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="sometoken")
+        self.client.auth_token = "token"
+        self.client.session = mock.Mock()
+
+    def test_fax_payload_url(self):
+        self.client.session.get.return_value = make_response()
+        dest = io.BytesIO()
+        result = self.client.download_fax_payload("acct", "fax1", dest)
+        self.assertEqual(dest.getvalue(), PAYLOAD)
+        self.assertEqual(result.content_length, len(PAYLOAD))
+        url = self.client.session.get.call_args[0][0]
+        self.assertTrue(url.endswith(
+            "/accounts/acct/faxes/outbox/fax1/attachment"))
+
+    def test_recording_requested_as_audio(self):
+        self.client.session.get.return_value = make_response()
+        self.client.download_recording("acct", "rec1", io.BytesIO())
+        args, kwargs = self.client.session.get.call_args
+        self.assertTrue(args[0].endswith("/accounts/acct/recordings/rec1"))
+        self.assertEqual(kwargs["headers"]["Accept"], "audio/mpeg")
+        self.assertEqual(kwargs["headers"]["X-Auth-Token"], "token")
+
+    def test_download_restarted_after_reauthentication(self):
+        rejected = json.dumps({"status": "error", "error": "401",
+                               "message": "expired"}).encode()
+        self.client.session.get.side_effect = [make_response(401, rejected),
+                                               make_response()]
+        dest = io.BytesIO()
+        with mock.patch.object(self.client, "_reauthenticate",
+                               return_value="newtoken"):
+            self.client.download_media_file("acct", "media1", dest)
+        self.assertEqual(dest.getvalue(), PAYLOAD)
+        headers = self.client.session.get.call_args[1]["headers"]
+        self.assertEqual(headers["X-Auth-Token"], "newtoken")
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncDownloadTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.range_headers = []
+        app = web.Application()
+        app.router.add_get("/payload", self.handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.session = aiohttp.ClientSession()
+        self.base_url = str(self.server.make_url(""))
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def handler(self, request):
+        self.range_headers.append(request.headers.get("Range"))
+        if request.http_range.start:
+            start = request.http_range.start
+            return web.Response(status=206, body=PAYLOAD[start:], headers={
+                "Content-Range": "bytes {0}-{1}/{2}".format(
+                    start, len(PAYLOAD) - 1, len(PAYLOAD))},
+                content_type="audio/mpeg")
+        return web.Response(body=PAYLOAD, content_type="audio/mpeg")
+
+    async def test_payload_streamed(self):
+        dest = io.BytesIO()
+        result = await KazooRequest("/payload").download_async(
+            self.base_url, self.session, dest, token="token",
+            chunk_size=1024)
+        self.assertEqual(dest.getvalue(), PAYLOAD)
+        self.assertEqual(result.content_type, "audio/mpeg")
+        self.assertEqual(result.content_length, len(PAYLOAD))
+
+    async def test_resumed(self):
+        dest = io.BytesIO(PAYLOAD[:2500])
+        dest.seek(0, io.SEEK_END)
+        result = await KazooRequest("/payload").download_async(
+            self.base_url, self.session, DownloadTarget(dest, resume=True),
+            token="token")
+        self.assertEqual(self.range_headers, ["bytes=2500-"])
+        self.assertEqual(dest.getvalue(), PAYLOAD)
+        self.assertEqual(result.bytes_written, len(PAYLOAD) - 2500)
@@ -1,3 +1,5 @@
+import mock
+import requests
 import unittest
 from kazoo import Client
 from kazoo.request_objects import UsernamePasswordAuthRequest,\
@@ -51,3 +53,34 @@ class ConstructorRequiredArgumentsTestCase(unittest.TestCase):
     def test_with_token_creates_api_key_auth_request(self):
         client = Client(api_key="fhasdlkjfblkasd")
         self.assertEqual(type(client.auth_request), ApiKeyAuthRequest)
+
+
+class ConnectionPoolTestCase(unittest.TestCase):
+
+    def test_client_creates_persistent_session(self):
+        client = Client(api_key="sometoken")
+        self.assertTrue(isinstance(client.session, requests.Session))
+
+    def test_pool_settings_applied_to_adapters(self):
+        client = Client(api_key="sometoken", pool_connections=3,
+                        pool_maxsize=7, pool_block=True)
+        for prefix in ["http://", "https://"]:
+            adapter = client.session.get_adapter(prefix + "api.example.com")
+            self.assertEqual(adapter._pool_connections, 3)
+            self.assertEqual(adapter._pool_maxsize, 7)
+            self.assertEqual(adapter._pool_block, True)
+
+    def test_context_manager_closes_session(self):
+        with mock.patch.object(requests.Session, "close") as mock_close:
+            with Client(api_key="sometoken"):
+                pass
+            mock_close.assert_called_once_with()
+
+    def test_requests_sent_through_client_session(self):
+        client = Client(api_key="sometoken")
+        with mock.patch.object(client.session, "get") as mock_get:
+            mock_get.return_value.status_code = 200
+            mock_get.return_value.content = b'{"status": "success"}'
+            client.get_about()
+            mock_get.assert_called_with(client.base_url + "/about",
+                                        headers=mock.ANY)
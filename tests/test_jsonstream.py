@@ -0,0 +1,231 @@
+import json
+import mock
+import unittest
+from kazoo import Client, exceptions
+from kazoo.jsonstream import DataParser, StreamedResponse, \
+    AsyncStreamedResponse
+from kazoo.request_objects import KazooRequest
+
+try:
+    import aiohttp
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    aiohttp = None
+
+ENVELOPE = {
+    "page_size": 4,
+    "data": [{"id": "1", "name": "café ]},\""}, 12345, [1, [2]], None],
+    "revision": "abc",
+    "next_start_key": 63800000000,
+    "status": "success",
+}
+BODY = json.dumps(ENVELOPE, ensure_ascii=False, indent=1).encode()
+
+
+def split(content, size):
+    return [content[i:i + size] for i in range(0, len(content), size)]
+
+
+def parse(chunks):
+    parser = DataParser()
+    documents = []
+    for chunk in chunks:
+        documents.extend(parser.feed(chunk))
+    documents.extend(parser.close())
+    return parser, documents
+
+
+class DataParserTestCase(unittest.TestCase):
+
+    def test_parsed_in_any_size_of_chunk(self):
+        envelope = dict(ENVELOPE)
+        data = envelope.pop("data")
+        for size in [1, 2, 3, 7, 64, len(BODY)]:
+            parser, documents = parse(split(BODY, size))
+            self.assertEqual(documents, data)
+            self.assertEqual(parser.envelope, envelope)
+
+    def test_split_at_every_offset(self):
+        body = json.dumps({"page_size": 3, "ratio": 2.5e3, "data": [
+            1.5, -2.5e3, {"id": "1", "rate": 0.25E-2, "name": "\\\"x]"},
+            [10, True, None]], "next_start_key": 63800000000,
+            "status": "success"}).encode()
+        expected = json.loads(body)
+        data = expected.pop("data")
+        for offset in range(len(body) + 1):
+            parser, documents = parse([body[:offset], body[offset:]])
+            self.assertEqual(documents, data, offset)
+            self.assertEqual(parser.envelope, expected, offset)
+
+    def test_documents_returned_as_they_are_completed(self):
+        parser = DataParser()
+        self.assertEqual(parser.feed(b'{"data": [{"id": 1}, {"id"'),
+                         [{"id": 1}])
+        self.assertEqual(parser.feed(b': 2}, 3'), [{"id": 2}])
+        self.assertEqual(parser.feed(b"4]}"), [34])
+        self.assertTrue(parser.done)
+
+    def test_fields_before_data_known_first(self):
+        parser = DataParser()
+        parser.feed(b'{"page_size": 2, "data": [1,')
+        self.assertEqual(parser.envelope, {"page_size": 2})
+
+    def test_data_which_is_not_a_list(self):
+        parser, documents = parse([b'{"data": {"id": "1"}, "status": "ok"}'])
+        self.assertEqual(documents, [])
+        self.assertEqual(parser.envelope, {"data": {"id": "1"},
+                                           "status": "ok"})
+
+    def test_value_larger_than_chunk_decoded_once(self):
+        document = {"id": "1", "notes": ["a \\\"quoted\\\" ]} note"] * 500,
+                    "nested": [{"list": [1, [2, {}]], "text": "{["}] * 200}
+        body = json.dumps({"data": [document, document],
+                           "status": "ok"}).encode()
+        parser = DataParser()
+        scan = mock.Mock(wraps=parser._scan)
+        parser._scan = scan
+        documents = []
+        for chunk in split(body, 64):
+            documents.extend(parser.feed(chunk))
+        documents.extend(parser.close())
+        self.assertEqual(documents, [document, document])
+        self.assertEqual(parser.envelope, {"status": "ok"})
+        self.assertLess(scan.call_count, 20)
+
+    def test_complete_invalid_value_raises_straight_away(self):
+        parser = DataParser()
+        with self.assertRaises(ValueError):
+            parser.feed(b'{"data": [{"id": 1,}, {"id"')
+
+    def test_truncated_body_raises(self):
+        with self.assertRaises(ValueError):
+            parse([b'{"data": [{"id": 1}, {"id"'])
+
+    def test_invalid_body_raises(self):
+        with self.assertRaises(ValueError):
+            parse([b'["data"]'])
+
+
+class StreamedResponseTestCase(unittest.TestCase):
+
+    def test_documents_iterated(self):
+        response = StreamedResponse(split(BODY, 10))
+        self.assertEqual(list(response), ENVELOPE["data"])
+        self.assertEqual(response["next_start_key"], 63800000000)
+
+    def test_field_after_data_read_early(self):
+        response = StreamedResponse(split(BODY, 10))
+        next(response)
+        self.assertEqual(response.get("next_start_key"), 63800000000)
+        self.assertEqual(list(response), ENVELOPE["data"][1:])
+
+    def test_missing_field(self):
+        response = StreamedResponse([BODY])
+        self.assertIsNone(response.get("start_key"))
+        with self.assertRaises(KeyError):
+            response["start_key"]
+
+    def test_closed_once_read(self):
+        close = mock.Mock()
+        response = StreamedResponse(split(BODY, 10), close)
+        list(response)
+        close.assert_called_once_with()
+
+    def test_closed_by_context_manager(self):
+        close = mock.Mock()
+        with StreamedResponse(split(BODY, 10), close) as response:
+            next(response)
+        close.assert_called_once_with()
+
+
+class RequestStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        self.raw_response = self.session.get.return_value
+        self.raw_response.iter_content.return_value = split(BODY, 16)
+
+    def execute(self):
+        return KazooRequest("/cdrs").execute("http://testserver",
+                                             session=self.session,
+                                             token="token", stream=True)
+
+    def test_streamed_response_returned(self):
+        self.raw_response.status_code = 200
+        response = self.execute()
+        self.assertEqual(self.session.get.call_args[1]["stream"], True)
+        self.assertEqual(list(response), ENVELOPE["data"])
+        self.raw_response.close.assert_called_once_with()
+
+    def test_error_response_raised(self):
+        self.raw_response.status_code = 401
+        self.raw_response.content = json.dumps({
+            "status": "error", "error": "401",
+            "message": "invalid credentials"}).encode()
+        with self.assertRaises(exceptions.KazooApiAuthenticationError):
+            self.execute()
+
+
+class ClientStreamTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="sometoken")
+
+    def test_stream_bypasses_cache(self):
+        self.client.response_cache = mock.Mock()
+        with mock.patch.object(Client, "_execute_with_auth") as mock_exec:
+            self.client.get_cdrs("acct", stream=True)
+        self.assertFalse(self.client.response_cache.get.called)
+        self.assertTrue(mock_exec.call_args[0][1]["stream"])
+
+    def test_iter_method_follows_streamed_pages(self):
+        pages = {
+            None: {"data": [{"id": "a"}, {"id": "b"}],
+                   "next_start_key": "key1"},
+            "key1": {"data": [{"id": "c"}]},
+        }
+
+        def execute(request, **kwargs):
+            page = pages[kwargs["get_params"].get("start_key")]
+            return StreamedResponse(split(json.dumps(page).encode(), 8))
+
+        client = Client(api_key="sometoken", prefetch_pages=2)
+        with mock.patch.object(Client, "_execute_request") as mock_exec:
+            mock_exec.side_effect = execute
+            cdrs = list(client.iter_cdrs("acct", stream=True))
+        self.assertEqual(cdrs, [{"id": "a"}, {"id": "b"}, {"id": "c"}])
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncStreamTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        app = web.Application()
+        app.router.add_get("/cdrs", self.handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.session = aiohttp.ClientSession()
+        self.base_url = str(self.server.make_url(""))
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def handler(self, request):
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for chunk in split(BODY, 16):
+            await response.write(chunk)
+        await response.write_eof()
+        return response
+
+    async def test_documents_iterated(self):
+        response = await KazooRequest("/cdrs").execute_async(
+            self.base_url, self.session, token="token", stream=True)
+        self.assertIsInstance(response, AsyncStreamedResponse)
+        with self.assertRaises(RuntimeError):
+            response.get("next_start_key")
+        documents = [document async for document in response]
+        self.assertEqual(documents, ENVELOPE["data"])
+        self.assertEqual(response.get("next_start_key"), 63800000000)
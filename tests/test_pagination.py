@@ -0,0 +1,177 @@
+import mock
+import threading
+import unittest
+from kazoo import Client
+from kazoo.pagination import iterate_pages, iterate_documents, \
+    prefetch_pages, split_time_range, iterate_time_windows
+
+
+def make_pages(*pages):
+    """Return a fetch_page function serving the given lists of documents,
+    linked together by start keys
+    """
+    responses = {}
+    for i, documents in enumerate(pages):
+        response = {"status": "success", "data": documents,
+                    "page_size": len(documents)}
+        if i + 1 < len(pages):
+            response["next_start_key"] = "key{0}".format(i + 1)
+        start_key = "key{0}".format(i) if i else None
+        responses[start_key] = response
+    calls = []
+
+    def fetch_page(get_params):
+        calls.append(dict(get_params))
+        return responses[get_params.get("start_key")]
+
+    return fetch_page, calls
+
+
+class IteratePagesTestCase(unittest.TestCase):
+
+    def test_follows_next_start_key(self):
+        fetch_page, calls = make_pages([1, 2], [3, 4], [5])
+        documents = list(iterate_documents(iterate_pages(fetch_page)))
+        self.assertEqual(documents, [1, 2, 3, 4, 5])
+        self.assertEqual(calls, [{}, {"start_key": "key1"},
+                                 {"start_key": "key2"}])
+
+    def test_page_size_sent_with_every_page(self):
+        fetch_page, calls = make_pages([1, 2], [3])
+        list(iterate_pages(fetch_page, page_size=2))
+        self.assertEqual([c["page_size"] for c in calls], [2, 2])
+
+    def test_pages_fetched_lazily(self):
+        fetch_page, calls = make_pages([1, 2], [3, 4])
+        documents = iterate_documents(iterate_pages(fetch_page))
+        next(documents)
+        next(documents)
+        self.assertEqual(len(calls), 1)
+        next(documents)
+        self.assertEqual(len(calls), 2)
+
+    def test_stops_on_empty_response(self):
+        pages = list(iterate_pages(lambda get_params: ''))
+        self.assertEqual(pages, [])
+
+
+class PrefetchPagesTestCase(unittest.TestCase):
+
+    def test_yields_every_page_in_order(self):
+        fetch_page, calls = make_pages([1], [2], [3], [4])
+        pages = prefetch_pages(iterate_pages(fetch_page), depth=2)
+        self.assertEqual(list(iterate_documents(pages)), [1, 2, 3, 4])
+
+    def test_next_page_fetched_while_current_processed(self):
+        fetch_page, calls = make_pages([1], [2], [3])
+        second_fetched = threading.Event()
+
+        def fetch_and_signal(get_params):
+            page = fetch_page(get_params)
+            if len(calls) == 2:
+                second_fetched.set()
+            return page
+
+        pages = prefetch_pages(iterate_pages(fetch_and_signal), depth=1)
+        next(pages)
+        self.assertTrue(second_fetched.wait(5))
+        pages.close()
+
+    def test_fetch_errors_raised_to_consumer(self):
+        def failing_pages():
+            yield {"data": [1]}
+            raise ValueError("broken page")
+
+        pages = prefetch_pages(failing_pages(), depth=2)
+        self.assertEqual(next(pages), {"data": [1]})
+        with self.assertRaises(ValueError):
+            next(pages)
+
+
+class TimeWindowTestCase(unittest.TestCase):
+
+    def test_split_time_range_covers_range_without_overlap(self):
+        self.assertEqual(split_time_range(100, 124, 10),
+                         [(100, 109), (110, 119), (120, 124)])
+
+    def test_split_time_range_single_window(self):
+        self.assertEqual(split_time_range(100, 105, 10), [(100, 105)])
+
+    def test_windows_merged_in_time_order(self):
+        documents = [{"timestamp": t} for t in [5, 31, 12, 27, 3, 18, 40]]
+
+        def fetch_documents(window_from, window_to):
+            # Return each window newest first, as Kazoo does
+            return sorted((d for d in documents
+                           if window_from <= d["timestamp"] <= window_to),
+                          key=lambda d: -d["timestamp"])
+
+        merged = iterate_time_windows(fetch_documents, 0, 49, 10,
+                                      max_workers=3, sort_key="timestamp")
+        self.assertEqual([d["timestamp"] for d in merged],
+                         [3, 5, 12, 18, 27, 31, 40])
+
+    def test_window_errors_raised(self):
+        def fetch_documents(window_from, window_to):
+            raise ValueError("window failed")
+
+        with self.assertRaises(ValueError):
+            list(iterate_time_windows(fetch_documents, 0, 49, 10,
+                                      max_workers=2))
+
+
+class GeneratedIterMethodsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="sometoken")
+
+    def test_iter_method_generated_for_list_methods(self):
+        self.assertTrue(hasattr(self.client, "iter_devices"))
+        self.assertTrue(hasattr(self.client, "iter_all_media"))
+        self.assertTrue(hasattr(self.client, "iter_calls"))
+
+    def test_iter_method_passes_pagination_params(self):
+        fetch_page, calls = make_pages([{"id": "a"}], [{"id": "b"}])
+        with mock.patch.object(Client, "_execute_request") as mock_exec:
+            mock_exec.side_effect = lambda request, **kwargs: fetch_page(
+                kwargs["get_params"])
+            devices = list(self.client.iter_devices(
+                "acct", page_size=1, get_params={"filter_owner_id": "x"}))
+        self.assertEqual(devices, [{"id": "a"}, {"id": "b"}])
+        self.assertEqual(calls[1], {"filter_owner_id": "x", "page_size": 1,
+                                    "start_key": "key1"})
+        request = mock_exec.call_args[0][0]
+        self.assertEqual(request.path, "/accounts/{account_id}/devices")
+        self.assertEqual(mock_exec.call_args[1]["account_id"], "acct")
+
+    def test_client_prefetch_default_used(self):
+        client = Client(api_key="sometoken", prefetch_pages=2)
+        fetch_page, calls = make_pages([{"id": "a"}], [{"id": "b"}])
+        with mock.patch.object(Client, "_execute_request") as mock_exec, \
+                mock.patch("kazoo.client.prefetch_pages",
+                           wraps=prefetch_pages) as mock_prefetch:
+            mock_exec.side_effect = lambda request, **kwargs: fetch_page(
+                kwargs["get_params"])
+            devices = list(client.iter_devices("acct"))
+        self.assertEqual(devices, [{"id": "a"}, {"id": "b"}])
+        self.assertEqual(mock_prefetch.call_args[0][1], 2)
+
+    def test_iter_time_range_paginates_each_window(self):
+        pages = {}
+        for window_from in [0, 10]:
+            pages[(window_from, None)] = {
+                "data": [{"timestamp": window_from + 1}],
+                "next_start_key": "next"}
+            pages[(window_from, "next")] = {
+                "data": [{"timestamp": window_from}]}
+
+        def execute(request, **kwargs):
+            get_params = kwargs["get_params"]
+            return pages[(get_params["created_from"],
+                          get_params.get("start_key"))]
+
+        with mock.patch.object(Client, "_execute_request") as mock_exec:
+            mock_exec.side_effect = execute
+            cdrs = list(self.client.iter_time_range(
+                "get_cdrs", ["acct"], 0, 19, window=10, max_workers=2))
+        self.assertEqual([c["timestamp"] for c in cdrs], [0, 1, 10, 11])
@@ -0,0 +1,112 @@
+import json
+import mock
+import unittest
+from kazoo import Client, exceptions
+from kazoo.jsonstream import StreamedResponse, parse_projected
+from kazoo.projection import Projection, get_projection
+from kazoo.request_objects import KazooRequest
+
+DEVICE = {
+    "id": "device1",
+    "name": "Desk phone",
+    "sip": {"username": "user1", "password": "secret"},
+    "caller_id": {"external": {"number": "+15555555555", "name": "Desk"},
+                  "internal": {"number": "1000"}},
+    "numbers": [{"number": "1", "type": "main"}, {"number": "2"}],
+}
+
+
+class ProjectionTestCase(unittest.TestCase):
+
+    def test_top_level_fields(self):
+        self.assertEqual(Projection(["id", "name"]).apply(DEVICE),
+                         {"id": "device1", "name": "Desk phone"})
+
+    def test_nested_fields(self):
+        projection = Projection(["caller_id.external.number", "sip"])
+        self.assertEqual(projection.apply(DEVICE), {
+            "caller_id": {"external": {"number": "+15555555555"}},
+            "sip": {"username": "user1", "password": "secret"}})
+
+    def test_path_through_list(self):
+        self.assertEqual(Projection(["numbers.type"]).apply(DEVICE),
+                         {"numbers": [{"type": "main"}, {}]})
+
+    def test_whole_field_kept_over_nested_path(self):
+        for fields in [["sip", "sip.username"], ["sip.username", "sip"]]:
+            self.assertEqual(Projection(fields).apply(DEVICE),
+                             {"sip": DEVICE["sip"]})
+
+    def test_missing_fields_left_out(self):
+        self.assertEqual(Projection(["id", "owner_id", "sip.realm"]).apply(
+            DEVICE), {"id": "device1", "sip": {}})
+
+    def test_get_projection(self):
+        self.assertIsNone(get_projection(None))
+        projection = Projection(["id"])
+        self.assertIs(get_projection(projection), projection)
+        self.assertEqual(get_projection("id").fields, ("id",))
+
+
+class ParseProjectedTestCase(unittest.TestCase):
+
+    def test_list_response_projected(self):
+        body = json.dumps({"data": [DEVICE, DEVICE], "page_size": 2,
+                           "status": "success"}).encode()
+        response = parse_projected(body, Projection(["id"]))
+        self.assertEqual(response, {"data": [{"id": "device1"}] * 2,
+                                    "page_size": 2, "status": "success"})
+
+    def test_detail_response_projected(self):
+        body = json.dumps({"data": DEVICE, "revision": "1-a",
+                           "status": "success"}).encode()
+        response = parse_projected(body, Projection(["name"]))
+        self.assertEqual(response, {"data": {"name": "Desk phone"},
+                                    "revision": "1-a", "status": "success"})
+
+    def test_streamed_response_projected(self):
+        body = json.dumps({"data": [DEVICE]}).encode()
+        response = StreamedResponse([body[:50], body[50:]],
+                                    projection=Projection(["id"]))
+        self.assertEqual(list(response), [{"id": "device1"}])
+
+
+class RequestProjectionTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        self.raw_response = self.session.get.return_value
+
+    def execute(self):
+        return KazooRequest("/devices").execute(
+            "http://testserver", session=self.session, token="token",
+            fields=["id", "caller_id.internal"])
+
+    def test_success_projected(self):
+        self.raw_response.status_code = 200
+        self.raw_response.content = json.dumps({
+            "data": [DEVICE], "status": "success"}).encode()
+        self.assertEqual(self.execute(), {
+            "data": [{"id": "device1",
+                      "caller_id": {"internal": {"number": "1000"}}}],
+            "status": "success"})
+
+    def test_error_not_projected(self):
+        self.raw_response.status_code = 400
+        self.raw_response.content = json.dumps({
+            "data": {"name": {"required": {"message": "Field is required"}}},
+            "error": "400", "status": "error"}).encode()
+        with self.assertRaises(exceptions.KazooApiBadDataError) as cm:
+            self.execute()
+        self.assertIn("name", cm.exception.field_errors)
+
+
+class ClientProjectionTestCase(unittest.TestCase):
+
+    def test_projected_request_bypasses_cache(self):
+        client = Client(api_key="sometoken")
+        client.response_cache = mock.Mock()
+        with mock.patch.object(Client, "_execute_with_auth") as mock_exec:
+            client.get_device("acct", "device1", fields=["id"])
+        self.assertFalse(client.response_cache.get.called)
+        self.assertEqual(mock_exec.call_args[0][1]["fields"], ["id"])
@@ -0,0 +1,111 @@
+import mock
+import unittest
+from kazoo import Client
+from kazoo.ratelimit import TokenBucket, RateLimiter
+from kazoo.request_objects import KazooRequest
+from kazoo.rest_resources import RestResource
+from tests.utils import FakeClock
+
+
+class TokenBucketTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.bucket = TokenBucket(2, capacity=3, clock=self.clock)
+
+    def test_burst_up_to_capacity_without_waiting(self):
+        delays = [self.bucket.reserve() for i in range(3)]
+        self.assertEqual(delays, [0, 0, 0])
+
+    def test_waits_once_empty(self):
+        for i in range(3):
+            self.bucket.reserve()
+        self.assertEqual(self.bucket.reserve(), 0.5)
+        self.assertEqual(self.bucket.reserve(), 1.0)
+
+    def test_refills_over_time(self):
+        for i in range(3):
+            self.bucket.reserve()
+        self.clock.now = 1.0
+        self.assertEqual(self.bucket.reserve(), 0)
+        self.assertEqual(self.bucket.reserve(), 0)
+        self.assertEqual(self.bucket.reserve(), 0.5)
+
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            TokenBucket(0)
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = RestResource(
+            "device", "/accounts/{account_id}/devices/{device_id}")
+
+    def test_account_scope_keyed_by_account_id(self):
+        limiter = RateLimiter(10, scope="account")
+        request = self.resource.get_object_request(account_id="acct1",
+                                                   device_id="dev1")
+        self.assertEqual(limiter.get_key(request, {}), "acct1")
+
+    def test_account_scope_reads_account_from_params(self):
+        limiter = RateLimiter(10, scope="account")
+        request = KazooRequest("/accounts/{account_id}/phone_numbers")
+        self.assertEqual(limiter.get_key(request, {"account_id": "acct2"}),
+                         "acct2")
+
+    def test_resource_scope_keyed_by_route(self):
+        limiter = RateLimiter(10, scope="resource")
+        request = self.resource.get_object_request(account_id="acct1",
+                                                   device_id="dev1")
+        self.assertEqual(limiter.get_key(request, {}),
+                         "/accounts/{account_id}/devices/{device_id}")
+
+    def test_separate_buckets_per_key(self):
+        limiter = RateLimiter(1, burst=1, scope="account")
+        first = self.resource.get_list_request(account_id="acct1")
+        second = self.resource.get_list_request(account_id="acct2")
+        self.assertEqual(limiter.reserve(first, {}), 0)
+        self.assertEqual(limiter.reserve(second, {}), 0)
+        self.assertTrue(limiter.reserve(first, {}) > 0)
+
+    def test_invalid_scope(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(10, scope="device")
+
+    def test_from_rate_limits_per_second(self):
+        rate_limits = {"account": {"per_second": {"total_packets": 50},
+                                   "per_minute": {"total_packets": 600}}}
+        limiter = RateLimiter.from_rate_limits(rate_limits)
+        self.assertEqual(limiter.rate, 50)
+        self.assertEqual(limiter.scope, "account")
+
+    def test_from_rate_limits_per_minute(self):
+        rate_limits = {"account": {"per_minute": {"total_packets": 600}}}
+        limiter = RateLimiter.from_rate_limits(rate_limits)
+        self.assertEqual(limiter.rate, 10)
+
+    def test_from_rate_limits_missing_limit(self):
+        with self.assertRaises(ValueError):
+            RateLimiter.from_rate_limits({"device": {}})
+
+
+class ClientRateLimitTestCase(unittest.TestCase):
+
+    def test_limiter_consulted_before_each_request(self):
+        limiter = mock.Mock()
+        client = Client(api_key="sometoken", rate_limiter=limiter)
+        with mock.patch.object(KazooRequest, "execute") as mock_execute:
+            mock_execute.return_value = {"status": "success"}
+            client.get_device("acct", "dev")
+        self.assertEqual(limiter.acquire.call_count, 1)
+
+    def test_use_account_rate_limits(self):
+        client = Client(api_key="sometoken")
+        rate_limits = {"status": "success", "data": {
+            "account": {"per_second": {"total_packets": 25}}}}
+        with mock.patch.object(KazooRequest, "execute") as mock_execute:
+            mock_execute.return_value = rate_limits
+            limiter = client.use_account_rate_limits("acct")
+        self.assertEqual(client.rate_limiter, limiter)
+        self.assertEqual(limiter.rate, 25)
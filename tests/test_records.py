@@ -0,0 +1,134 @@
+import json
+import mock
+import unittest
+from kazoo import Client
+from kazoo.jsonstream import StreamedResponse, parse_records
+from kazoo.projection import Projection
+from kazoo.records import Record, to_record
+from kazoo.request_objects import KazooRequest
+
+DEVICES = [{"id": "device{0}".format(i), "name": "Phone {0}".format(i),
+            "sip": {"username": "user{0}".format(i)},
+            "numbers": [{"number": str(i)}]}
+           for i in range(3)]
+BODY = json.dumps({"data": DEVICES, "next_start_key": "key1",
+                   "status": "success"}).encode()
+
+
+class RecordTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.record = Record.from_json(json.dumps(DEVICES[0]))
+
+    def test_fields_read_as_attributes_and_items(self):
+        self.assertEqual(self.record.name, "Phone 0")
+        self.assertEqual(self.record["id"], "device0")
+        self.assertEqual(self.record.get("owner_id", "none"), "none")
+        self.assertIn("sip", self.record)
+        with self.assertRaises(AttributeError):
+            self.record.owner_id
+        with self.assertRaises(KeyError):
+            self.record["owner_id"]
+
+    def test_nested_objects_are_records(self):
+        self.assertIsInstance(self.record.sip, Record)
+        self.assertEqual(self.record.sip.username, "user0")
+        self.assertEqual(self.record.numbers[0].number, "0")
+
+    def test_decoded_when_first_used(self):
+        self.assertIsNotNone(self.record._raw)
+        self.record.name
+        self.assertIsNone(self.record._raw)
+
+    def test_mapping_methods(self):
+        self.assertEqual(list(self.record), ["id", "name", "sip", "numbers"])
+        self.assertEqual(len(self.record), 4)
+        self.assertEqual(dict(self.record.items())["id"], "device0")
+
+    def test_to_dict(self):
+        document = self.record.to_dict()
+        self.assertEqual(document, DEVICES[0])
+        self.assertIsInstance(document["numbers"][0], dict)
+
+    def test_equality(self):
+        self.assertEqual(self.record, DEVICES[0])
+        self.assertEqual(self.record, to_record(DEVICES[0]))
+        self.assertNotEqual(self.record, to_record(DEVICES[1]))
+
+    def test_fields_shared_between_records(self):
+        first, second = to_record(DEVICES[:2])
+        self.assertIs(first._fields, second._fields)
+        self.assertIs(first.sip._fields, second.sip._fields)
+
+    def test_no_instance_dict(self):
+        with self.assertRaises(AttributeError):
+            self.record.__dict__
+
+    def test_empty_object(self):
+        self.assertEqual(Record.from_json("{}").to_dict(), {})
+
+
+class ParseRecordsTestCase(unittest.TestCase):
+
+    def test_envelope_and_documents(self):
+        response = parse_records(BODY)
+        self.assertEqual(response.next_start_key, "key1")
+        self.assertEqual(response["status"], "success")
+        self.assertEqual([device.id for device in response.data],
+                         ["device0", "device1", "device2"])
+        self.assertEqual(response.to_dict(), json.loads(BODY))
+
+    def test_documents_kept_as_json_until_used(self):
+        response = parse_records(BODY)
+        self.assertTrue(all(device._raw is not None
+                            for device in response.data))
+
+    def test_detail_response(self):
+        body = json.dumps({"data": DEVICES[0], "status": "success"}).encode()
+        self.assertEqual(parse_records(body).data.sip.username, "user0")
+
+    def test_list_of_strings(self):
+        body = json.dumps({"data": ["a", "b"]}).encode()
+        self.assertEqual(parse_records(body).data, ["a", "b"])
+
+    def test_projected(self):
+        response = parse_records(BODY, Projection(["id"]))
+        self.assertEqual(response.data[1].to_dict(), {"id": "device1"})
+
+    def test_streamed(self):
+        response = StreamedResponse([BODY[:40], BODY[40:]], records=True)
+        devices = list(response)
+        self.assertIsInstance(devices[0], Record)
+        self.assertEqual(devices[2].name, "Phone 2")
+
+
+class RequestRecordsTestCase(unittest.TestCase):
+
+    def test_lazy_response_returned(self):
+        session = mock.Mock()
+        session.get.return_value.status_code = 200
+        session.get.return_value.content = BODY
+        response = KazooRequest("/devices").execute(
+            "http://testserver", session=session, token="token", lazy=True)
+        self.assertIsInstance(response, Record)
+        self.assertEqual(response.data[0].name, "Phone 0")
+
+
+class ClientRecordsTestCase(unittest.TestCase):
+
+    def test_iter_method_yields_records(self):
+        client = Client(api_key="sometoken")
+        with mock.patch.object(Client, "_execute_request") as mock_exec:
+            mock_exec.return_value = parse_records(json.dumps({
+                "data": DEVICES, "status": "success"}).encode())
+            names = [device.name
+                     for device in client.iter_devices("acct", lazy=True)]
+        self.assertEqual(names, ["Phone 0", "Phone 1", "Phone 2"])
+        self.assertTrue(mock_exec.call_args[1]["lazy"])
+
+    def test_lazy_request_bypasses_cache(self):
+        client = Client(api_key="sometoken")
+        client.response_cache = mock.Mock()
+        with mock.patch.object(Client, "_execute_with_auth"):
+            client.get_devices("acct", lazy=True)
+        self.assertFalse(client.response_cache.get.called)
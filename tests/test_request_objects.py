@@ -12,7 +12,13 @@ class RequestTestCase(unittest.TestCase):
     def assert_data(self, mock_request, expected_data):
         expected_wrapper = {"data": expected_data}
         mock_request.assert_called_with(mock.ANY, headers=mock.ANY,
-                                        data=json.dumps(expected_wrapper))
+                                        data=mock.ANY)
+        sent = json.loads(mock_request.call_args[1]["data"])
+        self.assertEqual(sent, expected_wrapper)
+
+    def respond(self, mock_request, content=b'{"status": "success"}'):
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.content = content
 
 class RequestObjectParameterTestCase(RequestTestCase):
 
@@ -37,10 +43,22 @@ class RequestObjectParameterTestCase(RequestTestCase):
             mock_get.assert_called_with("http://testserver/testpath/somevalue",
                                         headers=mock.ANY)
 
+    def test_path_formatted_with_params(self):
+        request = KazooRequest("/accounts/{account_id}/faxes/{fax_id}/raw")
+        self.assertEqual(request.format_path({"fax_id": 2, "account_id": 1,
+                                              "token": "sometoken"}),
+                         "/accounts/1/faxes/2/raw")
+
+    def test_percent_in_path_kept(self):
+        request = KazooRequest("/search/100%/{param1}")
+        self.assertEqual(request.format_path({"param1": "x"}),
+                         "/search/100%/x")
+
     def test_request_method_used(self):
         req_obj = self.create_req_obj(self.url)
         with mock.patch('requests.get') as mock_get, \
                 mock.patch('requests.post') as mock_post:
+            self.respond(mock_post)
             req_obj.execute("http://testserver", param1="value", method="post")
             mock_post.assert_called_with("http://testserver/testpath/value",
                                          headers=mock.ANY)
@@ -49,6 +67,7 @@ class RequestObjectParameterTestCase(RequestTestCase):
         req_obj = self.create_req_obj(self.url, method='post')
         with mock.patch('requests.get') as mock_get, \
                 mock.patch('requests.post') as mock_post:
+            self.respond(mock_post)
             req_obj.execute("http://testserver", param1="value")
             mock_post.assert_called_with("http://testserver/testpath/value",
                                          headers=mock.ANY)
@@ -68,6 +87,7 @@ class RequestObjectParameterTestCase(RequestTestCase):
     def test_auth_required_does_not_throw_if_token_present(self):
         req_obj = self.create_req_obj(self.url, auth_required=True)
         with mock.patch('requests.get') as mock_get:
+            self.respond(mock_get)
             req_obj.execute("https://testserver", token="jfhasdfasd",
                             param1="value3")
 
@@ -80,6 +100,7 @@ class RequestObjectDataParamsTestCase(RequestTestCase):
     def test_data_sent_to_server(self):
         req_obj = KazooRequest(self.path, auth_required=False)
         with mock.patch('requests.get') as mock_get:
+            self.respond(mock_get)
             data_dict = {
                 "data1": "dataval1"
             }
@@ -90,6 +111,7 @@ class RequestObjectDataParamsTestCase(RequestTestCase):
     def test_data_sent_to_server_with_auth_if_required(self):
         req_obj = KazooRequest(self.path, auth_required=True)
         with mock.patch('requests.post') as mock_post:
+            self.respond(mock_post)
             data_dict = {
                 "data1": "dataval1"
             }
@@ -179,6 +201,29 @@ class GetParametersTestCase(RequestTestCase):
 
 
 
+    def test_get_parameters_not_kept_between_calls(self):
+        request = KazooRequest("/somepath", auth_required=False,
+                               get_params={"one": 1})
+        with mock.patch('requests.get') as mock_get:
+            self.respond(mock_get)
+            request.execute("http://testserver.com",
+                            get_params={"two": 2})
+            request.execute("http://testserver.com")
+            mock_get.assert_called_with("http://testserver.com/somepath?one=1",
+                                        headers=mock.ANY)
+        self.assertEqual(request.get_params, {"one": 1})
+
+    def test_request_reused_with_different_params(self):
+        request = KazooRequest("/accounts/{account_id}", auth_required=False)
+        with mock.patch('requests.get') as mock_get:
+            self.respond(mock_get)
+            request.execute("http://testserver.com", account_id="one")
+            request.execute("http://testserver.com", account_id="two")
+        urls = [call[0][0] for call in mock_get.call_args_list]
+        self.assertEqual(urls, ["http://testserver.com/accounts/one",
+                                "http://testserver.com/accounts/two"])
+
+
 class UsernamePasswordAuthRequestTestCase(RequestTestCase):
 
     def setUp(self):
@@ -191,6 +236,7 @@ class UsernamePasswordAuthRequestTestCase(RequestTestCase):
 
     def test_request_hits_correct_url(self):
         with mock.patch("requests.put") as mock_put:
+            self.respond(mock_put)
             self.req_obj.execute("http://testserver")
             mock_put.assert_called_with("http://testserver/user_auth",
                                         headers=mock.ANY,
@@ -198,6 +244,7 @@ class UsernamePasswordAuthRequestTestCase(RequestTestCase):
 
     def test_request_sends_correct_data(self):
         with mock.patch('requests.put') as mock_put:
+            self.respond(mock_put)
             expected_data = {
                 "credentials": self.hashed_credentials,
                 "account_name": self.account_name,
@@ -214,6 +261,7 @@ class ApiKeyAuthRequestTestCase(RequestTestCase):
 
     def test_correct_url_hit(self):
         with mock.patch('requests.put') as mock_put:
+            self.respond(mock_put)
             self.req_obj.execute("http://testserver")
             mock_put.assert_called_with("http://testserver/api_auth",
                                         headers=mock.ANY,
@@ -221,6 +269,7 @@ class ApiKeyAuthRequestTestCase(RequestTestCase):
 
     def test_correct_data_sent(self):
         with mock.patch('requests.put') as mock_put:
+            self.respond(mock_put)
             self.req_obj.execute("http://testserver")
             expected_data = {
                 "api_key": self.api_key
@@ -109,6 +109,63 @@ class ExtraViewsResourceTestCase(unittest.TestCase):
         self.assertEqual(request.method, "put")
 
 
+class RequestTemplateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = RestResource(
+            "subresource", "/{argument1}/subresource/{argument2}",
+            extra_views=[{"path": "children", "name": "get_children",
+                          "scope": "object"}])
+
+    def test_template_paths_and_methods(self):
+        update = self.resource.get_request_template("update")
+        self.assertEqual(update.path, "/{argument1}/subresource/{argument2}")
+        self.assertEqual(update.method, "post")
+        create = self.resource.get_request_template("create")
+        self.assertEqual(create.path, "/{argument1}/subresource")
+        self.assertEqual(create.method, "put")
+
+    def test_templates_built_once(self):
+        self.assertIs(self.resource.get_request_template("object"),
+                      self.resource.get_request_template("object"))
+
+    def test_extra_view_template_looked_up_by_name(self):
+        request = self.resource.get_extra_view_template("get_children")
+        self.assertEqual(request.path,
+                         "/{argument1}/subresource/{argument2}/children")
+
+    def test_unknown_extra_view_raises(self):
+        with self.assertRaises(ValueError):
+            self.resource.get_extra_view_template("get_missing")
+
+
+class SharedPathExtraViewsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.resource = RestResource(
+            "account", "/accounts/{account_id}",
+            extra_views=[
+                {"name": "get_api_key", "path": "api_key"},
+                {"name": "create_api_key", "path": "api_key",
+                 "method": "put"},
+                {"name": "update_all", "path": "", "method": "post"}])
+
+    def test_views_sharing_a_path_found_by_name(self):
+        get = self.resource.get_extra_view_request("get_api_key")
+        create = self.resource.get_extra_view_request("create_api_key")
+        self.assertEqual(get.method, "get")
+        self.assertEqual(create.method, "put")
+        self.assertEqual(create.path, "/accounts/api_key")
+
+    def test_path_finds_first_view(self):
+        request = self.resource.get_extra_view_request("api_key")
+        self.assertEqual(request.method, "get")
+
+    def test_empty_view_path_is_collection(self):
+        request = self.resource.get_extra_view_template("update_all")
+        self.assertEqual(request.path, "/accounts")
+
+
 class PluralNameResourceTestCase(unittest.TestCase):
 
     def test_resource_plural_name(self):
@@ -0,0 +1,127 @@
+import email.utils
+import mock
+import requests
+import time
+import unittest
+from kazoo import Client, exceptions
+from kazoo.request_objects import KazooRequest
+from kazoo.retry import RetryPolicy, RetryBudget, parse_retry_after
+
+
+def http_error(status_code, retry_after=None):
+    return exceptions.KazooApiHttpError(status_code, "HTTP error",
+                                        retry_after=retry_after)
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.policy = RetryPolicy(max_retries=3, backoff_factor=1)
+        sleep_patcher = mock.patch("kazoo.retry.time.sleep")
+        self.mock_sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def test_retries_until_success(self):
+        func = mock.Mock(side_effect=[http_error(503), http_error(502),
+                                      "response"])
+        self.assertEqual(self.policy.call("get", func), "response")
+        self.assertEqual(func.call_count, 3)
+        self.assertEqual(self.mock_sleep.call_count, 2)
+
+    def test_gives_up_after_max_retries(self):
+        func = mock.Mock(side_effect=http_error(503))
+        with self.assertRaises(exceptions.KazooApiHttpError):
+            self.policy.call("get", func)
+        self.assertEqual(func.call_count, 4)
+
+    def test_non_idempotent_methods_not_retried_on_5xx(self):
+        func = mock.Mock(side_effect=http_error(503))
+        with self.assertRaises(exceptions.KazooApiHttpError):
+            self.policy.call("put", func)
+        self.assertEqual(func.call_count, 1)
+
+    def test_throttled_requests_retried_for_any_method(self):
+        func = mock.Mock(side_effect=[http_error(429), "response"])
+        self.assertEqual(self.policy.call("put", func), "response")
+
+    def test_connection_errors_retried_for_idempotent_methods(self):
+        func = mock.Mock(side_effect=[requests.exceptions.ConnectionError(),
+                                      "response"])
+        self.assertEqual(self.policy.call("get", func), "response")
+
+    def test_api_errors_not_retried(self):
+        func = mock.Mock(side_effect=exceptions.KazooApiError("bad"))
+        with self.assertRaises(exceptions.KazooApiError):
+            self.policy.call("get", func)
+        self.assertEqual(func.call_count, 1)
+
+    def test_backoff_is_jittered_exponential(self):
+        for attempt in range(3):
+            delay = self.policy.get_retry_delay("get", http_error(503),
+                                                attempt)
+            self.assertTrue(0 <= delay <= 2 ** attempt)
+
+    def test_retry_after_honoured(self):
+        delay = self.policy.get_retry_delay("get", http_error(429, "7"), 0)
+        self.assertEqual(delay, 7)
+
+    def test_excessive_retry_after_not_waited_for(self):
+        policy = RetryPolicy(max_retry_after=10)
+        self.assertEqual(
+            policy.get_retry_delay("get", http_error(429, "60"), 0), None)
+
+    def test_retry_budget_limits_retries(self):
+        policy = RetryPolicy(budget=RetryBudget(ratio=0, min_retries=1))
+        func = mock.Mock(side_effect=http_error(503))
+        with self.assertRaises(exceptions.KazooApiHttpError):
+            policy.call("get", func)
+        self.assertEqual(func.call_count, 2)
+
+
+class RetryBudgetTestCase(unittest.TestCase):
+
+    def test_requests_deposit_retries(self):
+        budget = RetryBudget(ratio=0.5, min_retries=0)
+        self.assertFalse(budget.withdraw())
+        budget.deposit()
+        budget.deposit()
+        self.assertTrue(budget.withdraw())
+        self.assertFalse(budget.withdraw())
+
+
+class ParseRetryAfterTestCase(unittest.TestCase):
+
+    def test_seconds(self):
+        self.assertEqual(parse_retry_after("120"), 120)
+
+    def test_http_date(self):
+        value = email.utils.formatdate(time.time() + 30, usegmt=True)
+        self.assertTrue(25 < parse_retry_after(value) <= 30)
+
+    def test_invalid(self):
+        self.assertEqual(parse_retry_after("soon"), None)
+
+
+class RequestTemporaryErrorTestCase(unittest.TestCase):
+
+    def test_unavailable_response_raises_http_error(self):
+        req_obj = KazooRequest("/somepath", auth_required=False)
+        with mock.patch('requests.get') as mock_get:
+            mock_get.return_value.status_code = 503
+            mock_get.return_value.headers = {"Retry-After": "5"}
+            with self.assertRaises(exceptions.KazooApiHttpError) as cm:
+                req_obj.execute("http://testserver")
+        self.assertEqual(cm.exception.status_code, 503)
+        self.assertEqual(cm.exception.retry_after, "5")
+
+
+class ClientRetryTestCase(unittest.TestCase):
+
+    def test_client_retries_get_requests(self):
+        client = Client(api_key="sometoken",
+                        retry_policy=RetryPolicy(backoff_factor=0))
+        with mock.patch.object(KazooRequest, "execute") as mock_execute:
+            mock_execute.side_effect = [http_error(502),
+                                        {"status": "success"}]
+            self.assertEqual(client.get_about(), {"status": "success"})
+        self.assertEqual(mock_execute.call_count, 2)
@@ -0,0 +1,229 @@
+import asyncio
+import mock
+import threading
+import time
+import unittest
+from kazoo import Client
+from kazoo.request_objects import KazooRequest
+from kazoo import singleflight
+from kazoo.singleflight import SingleFlight
+
+
+class SingleFlightTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = 0
+
+    def slow(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return {"data": {"id": "a"}}
+
+    def run_waiters(self, count, func):
+        results = []
+
+        def run():
+            try:
+                results.append(self.flight.call("key", func))
+            except Exception as e:
+                results.append(e)
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        self.started.wait(5)
+        followers = [threading.Thread(target=run) for i in range(count - 1)]
+        for thread in followers:
+            thread.start()
+        # Give the followers time to join the call before it finishes
+        time.sleep(0.05)
+        self.release.set()
+        for thread in [leader] + followers:
+            thread.join(5)
+        return results
+
+    def test_concurrent_calls_collapsed(self):
+        results = self.run_waiters(5, self.slow)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [{"data": {"id": "a"}}] * 5)
+
+    def test_waiters_get_their_own_copy(self):
+        results = self.run_waiters(3, self.slow)
+        results[0]["data"]["id"] = "changed"
+        self.assertEqual(results[1], {"data": {"id": "a"}})
+
+    def test_followers_unaffected_by_leader_changing_result(self):
+        changed = threading.Event()
+        share = singleflight._share
+        results = []
+
+        def late_share(result):
+            # The follower only copies once the leader's caller has changed
+            # its result
+            if threading.current_thread().name == "follower":
+                changed.wait(5)
+            return share(result)
+
+        def lead():
+            result = self.flight.call("key", self.slow)
+            result["data"]["id"] = "changed"
+            result["extra"] = True
+            changed.set()
+
+        def follow():
+            results.append(self.flight.call("key", self.slow))
+
+        leader = threading.Thread(target=lead)
+        follower = threading.Thread(target=follow, name="follower")
+        with mock.patch.object(singleflight, "_share", late_share):
+            leader.start()
+            self.started.wait(5)
+            follower.start()
+            time.sleep(0.05)
+            self.release.set()
+            leader.join(5)
+            follower.join(5)
+        self.assertEqual(results, [{"data": {"id": "a"}}])
+
+    def test_errors_raised_to_every_waiter(self):
+        error = RuntimeError("unavailable")
+
+        def fail():
+            self.slow()
+            raise error
+
+        results = self.run_waiters(3, fail)
+        self.assertEqual(results, [error] * 3)
+
+    def test_sequential_calls_not_collapsed(self):
+        self.release.set()
+        self.flight.call("key", self.slow)
+        self.flight.call("key", self.slow)
+        self.assertEqual(self.calls, 2)
+
+
+class AsyncSingleFlightTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_concurrent_calls_collapsed(self):
+        flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"data": {"id": "a"}}
+
+        results = await asyncio.gather(
+            *[flight.call_async("key", fetch) for i in range(5)])
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"data": {"id": "a"}}] * 5)
+
+    async def test_errors_raised_to_every_waiter(self):
+        flight = SingleFlight()
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("unavailable")
+
+        results = await asyncio.gather(
+            *[flight.call_async("key", fail) for i in range(3)],
+            return_exceptions=True)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+
+    async def test_followers_unaffected_by_leader_changing_result(self):
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.01)
+            return {"data": {"id": "a"}}
+
+        async def lead():
+            result = await flight.call_async("key", fetch)
+            result["data"]["id"] = "changed"
+            return result
+
+        results = await asyncio.gather(
+            lead(), *[flight.call_async("key", fetch) for i in range(3)])
+        self.assertEqual(results[0], {"data": {"id": "changed"}})
+        self.assertEqual(results[1:], [{"data": {"id": "a"}}] * 3)
+
+    async def test_cancelled_leader_does_not_cancel_waiters(self):
+        flight = SingleFlight()
+
+        async def fetch():
+            await asyncio.sleep(0.05)
+            return {"data": {"id": "a"}}
+
+        leader = asyncio.ensure_future(flight.call_async("key", fetch))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(flight.call_async("key", fetch))
+                   for i in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        results = await asyncio.gather(*waiters)
+        self.assertTrue(leader.cancelled())
+        self.assertEqual(results, [{"data": {"id": "a"}}] * 2)
+
+    async def test_call_cancelled_once_every_caller_is(self):
+        flight = SingleFlight()
+        cancelled = asyncio.Event()
+
+        async def fetch():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        callers = [asyncio.ensure_future(flight.call_async("key", fetch))
+                   for i in range(2)]
+        await asyncio.sleep(0)
+        for caller in callers:
+            caller.cancel()
+        await asyncio.wait_for(cancelled.wait(), 5)
+        self.assertEqual(flight._tasks, {})
+
+
+class ClientSingleFlightTestCase(unittest.TestCase):
+
+    def test_identical_gets_share_one_request(self):
+        client = Client(api_key="sometoken", single_flight=SingleFlight())
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def execute(*args, **kwargs):
+            calls.append(kwargs)
+            started.set()
+            release.wait(5)
+            return {"status": "success"}
+
+        results = []
+        with mock.patch.object(KazooRequest, "execute", side_effect=execute):
+            threads = [threading.Thread(
+                target=lambda: results.append(client.get_account("acct")))
+                for i in range(4)]
+            threads[0].start()
+            started.wait(5)
+            for thread in threads[1:]:
+                thread.start()
+            time.sleep(0.05)
+            release.set()
+            for thread in threads:
+                thread.join(5)
+        self.assertEqual(results, [{"status": "success"}] * 4)
+        self.assertEqual(len(calls), 1)
+
+    def test_key_includes_url_and_query(self):
+        client = Client(api_key="sometoken", single_flight=SingleFlight())
+        request = KazooRequest("/accounts/{account_id}")
+        first = client._get_flight_key(
+            request.resolve_url(client.base_url, {"account_id": "a"}), {})
+        second = client._get_flight_key(
+            request.resolve_url(client.base_url,
+                                {"account_id": "a",
+                                 "get_params": {"paginate": "false"}}), {})
+        self.assertNotEqual(first, second)
@@ -0,0 +1,121 @@
+import asyncio
+import base64
+import json
+import mock
+import time
+import unittest
+from kazoo import AsyncClient, Client
+from kazoo.tokenstore import MemoryTokenStore, get_token_expiry
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+def make_jwt(expires):
+    claims = json.dumps({"exp": expires}).encode()
+    payload = base64.urlsafe_b64encode(claims).decode().rstrip("=")
+    return "eyJhbGciOiJSUzI1NiJ9.{0}.c2lnbmF0dXJl".format(payload)
+
+
+def auth_data(token):
+    return {"auth_token": token, "data": {"account_id": "acct"}}
+
+
+class TokenExpiryTestCase(unittest.TestCase):
+
+    def test_expiry_read_from_jwt(self):
+        self.assertEqual(get_token_expiry(make_jwt(1700000000)), 1700000000)
+
+    def test_opaque_token_has_no_expiry(self):
+        self.assertEqual(get_token_expiry("af3d8e0b9c"), None)
+        self.assertEqual(get_token_expiry("a.not-base64!.c"), None)
+        self.assertEqual(get_token_expiry(None), None)
+
+
+class TokenRefreshTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="sometoken")
+        self.addCleanup(self.client.close)
+        patcher = mock.patch("kazoo.client.threading.Timer")
+        self.mock_timer = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_refresh_scheduled_before_expiry(self):
+        self.client._set_auth_data(auth_data(make_jwt(time.time() + 600)))
+        delay, func = self.mock_timer.call_args[0]
+        self.assertAlmostEqual(delay, 540, delta=1)
+        self.assertEqual(func, self.client._refresh_token)
+        self.assertTrue(self.mock_timer.return_value.start.called)
+
+    def test_short_lived_token_refreshed_half_way(self):
+        self.client._set_auth_data(auth_data(make_jwt(time.time() + 60)))
+        self.assertAlmostEqual(self.mock_timer.call_args[0][0], 30, delta=1)
+
+    def test_no_refresh_without_expiry(self):
+        self.client._set_auth_data(auth_data("opaquetoken"))
+        self.assertFalse(self.mock_timer.called)
+
+    def test_no_refresh_when_disabled(self):
+        self.client.token_refresh_margin = None
+        self.client._set_auth_data(auth_data(make_jwt(time.time() + 600)))
+        self.assertFalse(self.mock_timer.called)
+
+    def test_new_token_replaces_previous_timer(self):
+        self.client._set_auth_data(auth_data(make_jwt(time.time() + 600)))
+        self.client._set_auth_data(auth_data(make_jwt(time.time() + 600)))
+        self.assertTrue(self.mock_timer.return_value.cancel.called)
+
+    def test_refresh_replaces_token(self):
+        new_token = make_jwt(time.time() + 600)
+        self.client._set_auth_data(auth_data(make_jwt(time.time() + 30)))
+        with mock.patch.object(self.client.auth_request, "execute",
+                               return_value=auth_data(new_token)):
+            self.client._refresh_token()
+        self.assertEqual(self.client.auth_token, new_token)
+
+    def test_refresh_replaces_stored_token(self):
+        store = MemoryTokenStore()
+        self.client.token_store = store
+        old_token = make_jwt(time.time() + 30)
+        new_token = make_jwt(time.time() + 600)
+        with mock.patch.object(self.client.auth_request, "execute",
+                               side_effect=[auth_data(old_token),
+                                            auth_data(new_token)]):
+            self.client.authenticate()
+            self.client._refresh_token()
+        self.assertEqual(self.client.auth_token, new_token)
+        self.assertEqual(
+            store.fetch(self.client._auth_identity, None)["auth_token"],
+            new_token)
+
+    def test_failed_refresh_keeps_token(self):
+        token = make_jwt(time.time() + 30)
+        self.client._set_auth_data(auth_data(token))
+        with mock.patch.object(self.client.auth_request, "execute",
+                               side_effect=RuntimeError("unavailable")):
+            self.client._refresh_token()
+        self.assertEqual(self.client.auth_token, token)
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncTokenRefreshTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def test_token_refreshed_before_expiry(self):
+        client = AsyncClient(api_key="sometoken", token_refresh_margin=0)
+        new_token = make_jwt(time.time() + 600)
+        refreshed = asyncio.Event()
+
+        async def execute(*args, **kwargs):
+            refreshed.set()
+            return auth_data(new_token)
+
+        with mock.patch.object(client.auth_request, "execute_async",
+                               execute):
+            client._set_auth_data(auth_data(make_jwt(time.time() + 0.1)))
+            await asyncio.wait_for(refreshed.wait(), 5)
+            await asyncio.sleep(0)
+        self.assertEqual(client.auth_token, new_token)
+        await client.close()
@@ -0,0 +1,145 @@
+import mock
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from kazoo import Client, exceptions
+from kazoo.request_objects import KazooRequest
+from kazoo.tokenstore import MemoryTokenStore, FileTokenStore, \
+    SQLiteTokenStore
+from tests.utils import FakeClock
+
+
+def auth_data(token):
+    return {"auth_token": token, "data": {"account_id": "acct"}}
+
+
+class TokenStoreTests(object):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.clock = FakeClock(1000.0)
+        self.store = self.make_store()
+        self.authenticate = mock.Mock(side_effect=[auth_data("first"),
+                                                   auth_data("second")])
+
+    def test_fetch_authenticates_once(self):
+        self.assertEqual(self.store.fetch("me", self.authenticate),
+                         auth_data("first"))
+        self.assertEqual(self.store.fetch("me", self.authenticate),
+                         auth_data("first"))
+        self.assertEqual(self.authenticate.call_count, 1)
+
+    def test_keyed_by_identity(self):
+        self.store.fetch("me", self.authenticate)
+        self.assertEqual(self.store.fetch("you", self.authenticate),
+                         auth_data("second"))
+
+    def test_expired_token_replaced(self):
+        self.store.fetch("me", self.authenticate)
+        self.clock.now += 3600
+        self.assertEqual(self.store.fetch("me", self.authenticate),
+                         auth_data("second"))
+
+    def test_discard_rejected_token(self):
+        self.store.fetch("me", self.authenticate)
+        self.store.discard("me", "first")
+        self.assertEqual(self.store.fetch("me", self.authenticate),
+                         auth_data("second"))
+
+    def test_discard_keeps_newer_token(self):
+        self.store.fetch("me", self.authenticate)
+        self.store.discard("me", "older")
+        self.assertEqual(self.store.fetch("me", self.authenticate),
+                         auth_data("first"))
+
+    def test_concurrent_fetches_authenticate_once(self):
+        results = []
+
+        def fetch():
+            store = self.make_store()
+            results.append(store.fetch("me", self.authenticate))
+
+        threads = [threading.Thread(target=fetch) for i in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results, [auth_data("first")] * 5)
+        self.assertEqual(self.authenticate.call_count, 1)
+
+
+class MemoryTokenStoreTestCase(TokenStoreTests, unittest.TestCase):
+
+    def make_store(self):
+        if not hasattr(self, "store"):
+            self.store = MemoryTokenStore(clock=self.clock)
+        return self.store
+
+
+class FileTokenStoreTestCase(TokenStoreTests, unittest.TestCase):
+
+    def make_store(self):
+        return FileTokenStore(os.path.join(self.directory, "tokens.json"),
+                              clock=self.clock)
+
+    def test_file_only_readable_by_owner(self):
+        self.store.fetch("me", self.authenticate)
+        mode = os.stat(self.store.path).st_mode & 0o777
+        self.assertEqual(mode, 0o600)
+
+
+class SQLiteTokenStoreTestCase(TokenStoreTests, unittest.TestCase):
+
+    def make_store(self):
+        return SQLiteTokenStore(os.path.join(self.directory, "tokens.db"),
+                                clock=self.clock)
+
+
+class ClientTokenStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MemoryTokenStore()
+        patcher = mock.patch("kazoo.client.ApiKeyAuthRequest.execute")
+        self.mock_auth = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mock_auth.side_effect = [auth_data("first"), auth_data("second")]
+
+    def test_clients_share_token(self):
+        first = Client(api_key="sometoken", token_store=self.store)
+        second = Client(api_key="sometoken", token_store=self.store)
+        first.authenticate()
+        second.authenticate()
+        self.assertEqual(second.auth_token, "first")
+        self.assertEqual(second.account_id, "acct")
+        self.assertEqual(self.mock_auth.call_count, 1)
+
+    def test_rejected_token_replaced_in_store(self):
+        client = Client(api_key="sometoken", token_store=self.store)
+        client.authenticate()
+        with mock.patch.object(KazooRequest, "execute") as mock_execute:
+            mock_execute.side_effect = [
+                exceptions.KazooApiAuthenticationError("Invalid credentials"),
+                {"status": "success"}]
+            client.get_account("acct")
+        other = Client(api_key="sometoken", token_store=self.store)
+        other.authenticate()
+        self.assertEqual(other.auth_token, "second")
+
+    def test_different_password_not_shared(self):
+        def client(password):
+            return Client(username="user", password=password,
+                          account_name="acct", token_store=self.store)
+
+        with mock.patch("kazoo.client.UsernamePasswordAuthRequest."
+                        "execute") as mock_auth:
+            mock_auth.side_effect = [auth_data("first"), auth_data("second")]
+            client("right").authenticate()
+            wrong = client("wrong")
+            wrong.authenticate()
+            self.assertEqual(mock_auth.call_count, 2)
+        self.assertEqual(wrong.auth_token, "second")
+        self.assertNotEqual(client("right")._auth_identity,
+                            wrong._auth_identity)
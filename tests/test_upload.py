@@ -0,0 +1,202 @@
+import email.parser
+import io
+import json
+import mock
+import os
+import tempfile
+import unittest
+from kazoo import Client, exceptions
+from kazoo.request_objects import KazooRequest
+from kazoo.upload import FileBody, MultipartBody, guess_content_type
+
+try:
+    import aiohttp
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+except ImportError:
+    aiohttp = None
+
+PAYLOAD = os.urandom(10000)
+
+
+class NonSeekableFile(object):
+
+    def __init__(self, content):
+        self._file = io.BytesIO(content)
+
+    def read(self, size):
+        return self._file.read(size)
+
+
+def parse_multipart(content_type, body):
+    message = email.parser.BytesParser().parsebytes(
+        "Content-Type: {0}\r\n\r\n".format(content_type).encode() + body)
+    return [(part.get_content_type(),
+             part.get_param("name", header="Content-Disposition"),
+             part.get_payload(decode=True))
+            for part in message.get_payload()]
+
+
+class FileBodyTestCase(unittest.TestCase):
+
+    def test_file_read_in_chunks(self):
+        body = FileBody(io.BytesIO(PAYLOAD), chunk_size=4096)
+        chunks = list(body)
+        self.assertEqual([len(chunk) for chunk in chunks], [4096, 4096, 1808])
+        self.assertEqual(b"".join(chunks), PAYLOAD)
+
+    def test_length_of_rest_of_file(self):
+        file_obj = io.BytesIO(PAYLOAD)
+        file_obj.seek(1000)
+        self.assertEqual(FileBody(file_obj).len, 9000)
+
+    def test_length_of_real_file(self):
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as f:
+            f.write(PAYLOAD)
+            f.seek(0)
+            body = FileBody(f)
+            self.assertEqual(body.len, len(PAYLOAD))
+            self.assertEqual(body.content_type, "application/pdf")
+
+    def test_progress_reported(self):
+        progress = []
+        body = FileBody(io.BytesIO(PAYLOAD), chunk_size=4096,
+                        progress=lambda sent, total: progress.append(
+                            (sent, total)))
+        list(body)
+        self.assertEqual(progress, [(4096, 10000), (8192, 10000),
+                                    (10000, 10000)])
+
+    def test_content_type_guessed_from_filename(self):
+        body = FileBody(io.BytesIO(), filename="a.mp3")
+        self.assertEqual(body.content_type, "audio/mpeg")
+        self.assertEqual(guess_content_type(None), "application/octet-stream")
+
+    def test_rewound_when_sent_again(self):
+        body = FileBody(io.BytesIO(PAYLOAD))
+        list(body)
+        self.assertEqual(b"".join(body), PAYLOAD)
+
+    def test_non_seekable_file_can_not_be_sent_again(self):
+        body = FileBody(NonSeekableFile(PAYLOAD))
+        self.assertIsNone(body.len)
+        list(body)
+        with self.assertRaises(exceptions.KazooApiError):
+            list(body)
+
+
+class MultipartBodyTestCase(unittest.TestCase):
+
+    def test_parts_streamed(self):
+        body = MultipartBody([
+            ("content", "application/json", b'{"data": {}}'),
+            ("file", None, FileBody(io.BytesIO(PAYLOAD),
+                                    filename="fax.pdf"))])
+        content = b"".join(body)
+        self.assertEqual(len(content), body.len)
+        self.assertEqual(parse_multipart(body.content_type, content), [
+            ("application/json", "content", b'{"data": {}}'),
+            ("application/pdf", "file", PAYLOAD)])
+
+    def test_unknown_length(self):
+        body = MultipartBody([("file", "application/pdf",
+                               FileBody(NonSeekableFile(PAYLOAD)))])
+        self.assertIsNone(body.len)
+
+
+class RequestUploadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.session = mock.Mock()
+        self.session.post.return_value.status_code = 200
+        self.session.post.return_value.content = b'{"status": "success"}'
+
+    def test_file_sent_as_body(self):
+        body = FileBody(io.BytesIO(PAYLOAD), content_type="audio/mpeg")
+        KazooRequest("/media", method="post").execute(
+            "http://testserver", session=self.session, token="token",
+            body=body)
+        kwargs = self.session.post.call_args[1]
+        self.assertIs(kwargs["data"], body)
+        self.assertEqual(kwargs["headers"]["Content-Type"], "audio/mpeg")
+
+    def test_data_sent_with_file_as_multipart(self):
+        body = FileBody(io.BytesIO(PAYLOAD), content_type="application/pdf")
+        KazooRequest("/faxes", method="post").execute(
+            "http://testserver", session=self.session, token="token",
+            data={"to_number": "1234"}, body=body)
+        kwargs = self.session.post.call_args[1]
+        parts = parse_multipart(kwargs["headers"]["Content-Type"],
+                                b"".join(kwargs["data"]))
+        self.assertEqual(parts[0][0], "application/json")
+        self.assertEqual(json.loads(parts[0][2]),
+                         {"data": {"to_number": "1234"}})
+        self.assertEqual(parts[1], ("application/pdf", "file", PAYLOAD))
+
+
+class ClientUploadTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.client = Client(api_key="sometoken")
+
+    def test_upload_media_file(self):
+        with mock.patch.object(Client, "_execute_request") as mock_exec:
+            self.client.upload_media_file("acct", "media1", "greeting.wav",
+                                          io.BytesIO(PAYLOAD))
+        request, kwargs = mock_exec.call_args[0][0], mock_exec.call_args[1]
+        self.assertEqual(request.method, "post")
+        self.assertEqual(request.path,
+                         "/accounts/{account_id}/media/{media_id}/raw")
+        self.assertEqual((kwargs["account_id"], kwargs["media_id"]),
+                         ("acct", "media1"))
+        self.assertEqual(kwargs["body"].content_type, "audio/x-wav")
+
+    def test_upload_phone_number_file(self):
+        with mock.patch.object(Client, "_execute_request") as mock_exec:
+            self.client.upload_phone_number_file("acct", "+15555555555",
+                                                 "loa.pdf",
+                                                 io.BytesIO(PAYLOAD))
+        request, kwargs = mock_exec.call_args[0][0], mock_exec.call_args[1]
+        self.assertEqual(request.format_path(kwargs),
+                         "/accounts/acct/phone_numbers/+15555555555/docs/"
+                         "loa.pdf")
+        self.assertEqual(kwargs["body"].content_type, "application/pdf")
+
+
+@unittest.skipIf(aiohttp is None, "aiohttp is not installed")
+class AsyncUploadTestCase(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.requests = []
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.session = aiohttp.ClientSession()
+        self.base_url = str(self.server.make_url(""))
+
+    async def asyncTearDown(self):
+        await self.session.close()
+        await self.server.close()
+
+    async def handler(self, request):
+        self.requests.append((request.headers, await request.read()))
+        return web.json_response({"status": "success", "data": {}})
+
+    async def test_file_streamed_with_length(self):
+        body = FileBody(io.BytesIO(PAYLOAD), content_type="audio/mpeg")
+        await KazooRequest("/media", method="post").execute_async(
+            self.base_url, self.session, token="token", body=body)
+        headers, content = self.requests[0]
+        self.assertEqual(content, PAYLOAD)
+        self.assertEqual(headers["Content-Type"], "audio/mpeg")
+        self.assertEqual(headers["Content-Length"], str(len(PAYLOAD)))
+
+    async def test_data_sent_with_file_as_multipart(self):
+        body = FileBody(io.BytesIO(PAYLOAD), content_type="application/pdf")
+        await KazooRequest("/faxes", method="put").execute_async(
+            self.base_url, self.session, token="token",
+            data={"to_number": "1234"}, body=body)
+        headers, content = self.requests[0]
+        parts = parse_multipart(headers["Content-Type"], content)
+        self.assertEqual(parts[1], ("application/pdf", "file", PAYLOAD))
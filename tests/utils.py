@@ -11,3 +11,13 @@ def load_fixture(filename):
 def load_fixture_as_dict(json_filename):
     raw = load_fixture(json_filename)
     return json.loads(raw)
+
+
+class FakeClock(object):
+    """A clock for tests which only moves when 'now' is set"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now